@@ -0,0 +1,2 @@
+#!/bin/bash
+exec ./TinyLlama-1.1B-Chat-v1.0.F16.llamafile --nobrowser --port 8080
\ No newline at end of file
@@ -1,30 +1,161 @@
+import copy
 import json
 import os
+import threading
+from contextlib import contextmanager
 
-# Define the config file path
-CONFIG_DIR = "config"
-CONFIG_FILE = os.path.join(CONFIG_DIR, "config.json")
+# Config used to live in a `config/` directory relative to the working directory.
+LEGACY_CONFIG_FILE = os.path.join("config", "config.json")
+
+
+def config_dir():
+    """Per-user config directory, `~/.config/solo` unless overridden."""
+    if os.environ.get('SOLO_CONFIG_DIR'):
+        return os.environ['SOLO_CONFIG_DIR']
+    config_home = os.environ.get('XDG_CONFIG_HOME') or os.path.join(os.path.expanduser('~'), '.config')
+    return os.path.join(config_home, 'solo')
+
+
+@contextmanager
+def _file_lock(path):
+    """Exclusive advisory lock shared by every solo-cli process."""
+    with open(path, 'a+') as file:
+        if os.name == 'nt':
+            import msvcrt
+            file.seek(0)
+            msvcrt.locking(file.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                file.seek(0)
+                msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+
+
+class ConfigStore:
+    """
+        Cached view of the JSON config file.
+
+        Reads are served from memory until the file's mtime, size or inode
+        changes. Writes happen inside `batch()`, which holds a thread lock and a
+        cross-process file lock, re-reads the file and writes it back atomically
+        via a temporary file and rename, so concurrent updates are never lost.
+    """
+
+    def __init__(self, path=None):
+        self._path = path
+        self._cache = None
+        self._stamp = None
+        self._batch = None
+        self._lock = threading.RLock()
+
+    @property
+    def path(self):
+        return self._path or os.path.join(config_dir(), 'config.json')
+
+    def _read(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            if self._path is None and os.path.exists(LEGACY_CONFIG_FILE):
+                with open(LEGACY_CONFIG_FILE, 'r') as file:
+                    return json.load(file)
+            self._cache, self._stamp = {}, None
+            return self._cache
+        stamp = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+        if stamp != self._stamp:
+            with open(self.path, 'r') as file:
+                self._cache = json.load(file)
+            self._stamp = stamp
+        return self._cache
+
+    def _write(self, config):
+        import tempfile
+
+        directory = os.path.dirname(self.path)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.config.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as file:
+                json.dump(config, file, indent=4)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self._cache, self._stamp = None, None
+
+    def load(self):
+        """Return a copy of the current configuration."""
+        with self._lock:
+            if self._batch is not None:
+                return copy.deepcopy(self._batch)
+            return copy.deepcopy(self._read())
+
+    def get(self, key, default=None):
+        return self.load().get(key, default)
+
+    @contextmanager
+    def batch(self):
+        """
+            Yield the configuration for in-place edits and persist it once on exit.
+            Nested batches share the outermost one.
+        """
+        with self._lock:
+            if self._batch is not None:
+                yield self._batch
+                return
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with _file_lock(f"{self.path}.lock"):
+                self._stamp = None
+                self._batch = copy.deepcopy(self._read())
+                original = copy.deepcopy(self._batch)
+                try:
+                    yield self._batch
+                    if self._batch != original or not os.path.exists(self.path):
+                        self._write(self._batch)
+                finally:
+                    self._batch = None
+
+    def update(self, values):
+        with self.batch() as config:
+            config.update(values)
+
+    def save(self, config):
+        with self.batch() as current:
+            current.clear()
+            current.update(config)
+
+
+_store = ConfigStore()
+
+
+def get_store():
+    return _store
 
-# Ensure the config directory exists
-os.makedirs(CONFIG_DIR, exist_ok=True)
 
 def load_config():
     """Load the configuration file."""
-    if os.path.exists(CONFIG_FILE):
-        with open(CONFIG_FILE, 'r') as file:
-            return json.load(file)
-    else:
-        return {}
+    return _store.load()
 
 
 def save_config(config):
     """Save the configuration file."""
-    with open(CONFIG_FILE, 'w') as file:
-        json.dump(config, file, indent=4)
+    _store.save(config)
 
 
 def update_config(key, value):
     """Update a specific configuration value."""
-    config = load_config()
-    config[key] = value
-    save_config(config)
+    _store.update({key: value})
+
+
+def config_batch():
+    """Context manager to read-modify-write the configuration under a lock."""
+    return _store.batch()
@@ -1,5 +1,8 @@
-API_BASE_URL = "https://huggingface.co/Mozilla/Phi-3-mini-4k-instruct-llamafile"
+# Hugging Face listing the model catalog is built from, and how long a cached copy is fresh.
+CATALOG_URL = "https://huggingface.co/api/models?author=Mozilla&search=llamafile&full=true"
+CATALOG_MAX_AGE = 24 * 3600
 
+# Values are either a download URL or {"url": ..., "sha256": ...} to verify the download.
 MODELS = {
     "llava-v1.5-7b-q4": "https://huggingface.co/Mozilla/llava-v1.5-7b-llamafile/resolve/main/llava-v1.5-7b-q4.llamafile?download=true",
     "TinyLlama-1.1B-Chat-v1.0.F16": "https://huggingface.co/Mozilla/TinyLlama-1.1B-Chat-v1.0-llamafile/resolve/main/TinyLlama-1.1B-Chat-v1.0.F16.llamafile?download=true",
@@ -15,4 +18,14 @@ MODELS = {
     "mxbai-embed-large-v1-f16": "https://huggingface.co/somepath/mxbai-embed-large-v1-f16.llamafile?download=true"
 }
 
-DEFAULT_MODEL = "TinyLlama-1.1B-Chat-v1.0.F16"
\ No newline at end of file
+DEFAULT_MODEL = "TinyLlama-1.1B-Chat-v1.0.F16"
+
+# Parallel HTTP connections per download.
+DEFAULT_CONNECTIONS = 8
+
+# Seconds to wait for a launched llamafile to answer readiness probes.
+DEFAULT_READY_TIMEOUT = 600
+
+# Port `solo-cli mirror` serves the model store on; below 8080 so it never meets
+# the side ports of `serve` replicas (8081 and up) or of `tune` trials (8090).
+MIRROR_PORT = 8070
@@ -1,54 +1,200 @@
-import typer
-import subprocess
-import requests
-import concurrent.futures
 import os
+from typing import List
+
+import typer
 
-from solo_cli.utils.llama_server import download_file, set_permissions, start_ngrok_service, is_server_running,\
-    kill_process_on_port
-from solo_cli.constants import API_BASE_URL, MODELS, DEFAULT_MODEL
-from solo_cli.config import load_config, update_config
-from solo_cli.utils.chat_ui import check_node_installed, install_node, clone_repo, run_npm_install,\
-    run_docker_mongodb, prompt_huggingface_token, create_env_file, run_solo_chat_ui
+from solo_cli.constants import CATALOG_MAX_AGE, MODELS, DEFAULT_MODEL, DEFAULT_CONNECTIONS, DEFAULT_READY_TIMEOUT, \
+    MIRROR_PORT
+from solo_cli.config import config_batch, load_config, update_config
+from solo_cli.utils.profiling import TRACER, span
+
+# Commands import their heavy dependencies (requests, tqdm, the downloader,
+# chat UI helpers) inside the function body so that `solo-cli --help` and
+# other cheap invocations start fast. tests/test_startup.py enforces this.
 
 app = typer.Typer()
 
+@app.callback()
+def main(ctx: typer.Context,
+         profile: str = typer.Option(None, '--profile', help='Write a Chrome trace of the command\'s phases to this file.')):
+    if profile:
+        import atexit
+
+        TRACER.enable()
+        atexit.register(_write_profile, profile)
+        # Registered last so it runs first: close the span covering the whole command.
+        command_span = span(ctx.invoked_subcommand or 'solo-cli')
+        command_span.__enter__()
+        atexit.register(command_span.__exit__, None, None, None)
+
+def _write_profile(path):
+    TRACER.dump(path)
+    typer.echo(f"Profile written to {path} (open in chrome://tracing or ui.perfetto.dev).", err=True)
+    for name, (count, total) in sorted(TRACER.summary().items(), key=lambda item: -item[1][1]):
+        typer.echo(f"  {name:<20} {count:>4}x {total:8.2f}s", err=True)
+
+def _size_option(value):
+    """Typer callback: a size such as 50M or 8GiB as bytes, rejected as a usage error if malformed."""
+    from solo_cli.utils.sizes import parse_size
+
+    if value is None:
+        return None
+    try:
+        return parse_size(value)
+    except ValueError as e:
+        raise typer.BadParameter(str(e))
+
+def _quota_option(value):
+    """Typer callback for --quota: a size, or "none" to remove the limit."""
+    return value.lower() if value is not None and value.lower() == 'none' else _size_option(value)
+
 @app.command()
-def list_models():
+def list_models(query: str = typer.Argument(None, help='Only show models whose name contains this.'),
+                max_size: str = typer.Option(None, '--max-size', callback=_size_option, help='Largest download to show, e.g. 8G.'),
+                quant: str = typer.Option(None, '--quant', help='Quantization prefix, e.g. Q4 or F16.'),
+                kind: str = typer.Option(None, '--kind', help='chat or embedding.'),
+                refresh: bool = typer.Option(False, '--refresh', help='Check the hub for updates now.'),
+                offline: bool = typer.Option(False, '--offline', help='Only use the cached catalog.'),
+                fits: bool = typer.Option(False, '--fits', help='Only show models that fit in the memory available now.')):
     """
-    List available models from the Hugging Face repository.
+    List available models from the cached Hugging Face catalog.
     """
-    response = requests.get(API_BASE_URL)
-    if response.status_code == 200:
-        models = response.json()
-        typer.echo("Available Models:")
-        for model in models:
-            typer.echo(f"- {model['modelId']}")
-    else:
-        typer.echo("Failed to fetch models", err=True)
+    from solo_cli.utils.catalog import get_catalog, search
+    from solo_cli.utils.planner import HEADROOM, available_memory, catalog_estimate, default_ctx, estimate
+    from solo_cli.utils.sizes import format_size
+
+    if kind not in (None, 'chat', 'embedding'):
+        typer.echo("--kind must be chat or embedding", err=True)
+        raise typer.Exit(code=1)
+    catalog = get_catalog(max_age=0 if refresh else CATALOG_MAX_AGE, offline=offline)
+    if catalog.get('stale'):
+        typer.echo(f"Could not refresh the catalog ({catalog['stale']}); showing the cached copy.", err=True)
+    models = search(catalog, query, max_size, quant, kind)
+
+    available = available_memory()
+    typer.echo("Available Models:")
+    for model in models:
+        # Downloaded models are described from their GGUF header, the rest from the catalog.
+        info = _model_info(model['id'])
+        needed = estimate(info, default_ctx(info))['total'] if info else catalog_estimate(model)
+        too_large = needed is not None and available is not None and needed > available * HEADROOM
+        if fits and (needed is None or too_large):
+            continue
+        details = [format_size(model['size']) if model['size'] else '?',
+                   (info and info['quant']) or model['quant'] or '-', model['kind']]
+        if info:
+            details += [f"{info['parameters'] / 1e9:.1f}B params", f"{info['layers']} layers",
+                        f"ctx {info['context_length']}"]
+        if needed is not None:
+            details.append(f"needs ~{format_size(needed)}" + (" (too large for this machine)" if too_large else ""))
+        typer.echo(f"- {model['id']}  {'  '.join(details)}")
 
 @app.command()
-def init():
-    url = MODELS[DEFAULT_MODEL]
+def init(connections: int = typer.Option(DEFAULT_CONNECTIONS, '--connections', help='Number of parallel connections used for the download.')):
+    import requests
+    from solo_cli.utils.downloader import DownloadError
+    from solo_cli.utils.llama_server import download_file, set_permissions
+    from solo_cli.utils.model_store import resolve_model
+
+    url, sha256 = resolve_model(DEFAULT_MODEL)
     filename = f"{DEFAULT_MODEL}.llamafile"
 
-    download_file(url, filename)
+    try:
+        with span('init.download', model=DEFAULT_MODEL):
+            download_file(url, filename, connections=connections, sha256=sha256)
+    except (DownloadError, requests.RequestException):
+        raise typer.Exit(code=1)  # already reported by download_file
+    except OSError as e:
+        typer.echo(f"ERROR: Failed to download {filename}: {e}", err=True)
+        raise typer.Exit(code=1)
     set_permissions(filename)
     update_config('model_name', DEFAULT_MODEL)
 
 
 @app.command()
-def pull(model_name: str):
-    if model_name in MODELS:
-        url = MODELS[model_name]
+def pull(model_names: List[str] = typer.Argument(None, help='Models to download, smallest first.'),
+         all_models: bool = typer.Option(False, '--all', help='Download every model in the catalog.'),
+         connections: int = typer.Option(DEFAULT_CONNECTIONS, '--connections', help='Total number of parallel connections.'),
+         max_bandwidth: str = typer.Option(None, '--max-bandwidth', callback=_size_option, help='Total bandwidth cap, e.g. 50M (bytes/s).')):
+    from tqdm import tqdm
+    from solo_cli.utils.catalog import known_model
+    from solo_cli.utils.llama_server import set_permissions
+    from solo_cli.utils.model_store import fetch_many, resolve_model
+    from solo_cli.utils.split import split_command
+
+    names = list(MODELS) if all_models else (model_names or [])
+    if not names:
+        print("Please provide at least one model name or --all.")
+        raise typer.Exit(code=1)
+    unknown = [name for name in names if not known_model(name)]
+    if unknown:
+        print(f"Model {', '.join(unknown)} not found. Please provide a valid model name.")
+        raise typer.Exit(code=1)
+
+    items = []
+    for model_name in names:
         filename = f"{model_name}.llamafile"
-        download_file(url, filename)
+        if os.path.exists(filename) or split_command(model_name):
+            print(f"{filename} already exists. Skipping download.")
+            continue
+        url, sha256 = resolve_model(model_name)
+        items.append((url, filename, sha256))
+
+    def on_ready(filename):
         set_permissions(filename)
-    else:
-        print(f"Model {model_name} not found. Please provide a valid model name.")
+        tqdm.write(f"{filename} downloaded successfully.")
+
+    with span('pull', models=len(items)):
+        failures = fetch_many(items, connections=connections, max_bandwidth=max_bandwidth, on_ready=on_ready)
+    for filename, error in failures.items():
+        print(f"ERROR: Failed to download {filename}: {error}")
+    if failures:
+        print("Run the same command again to resume the download.")
+        raise typer.Exit(code=1)
 
 @app.command()
-def quickstart(restart: bool = typer.Option(False, '--restart', help='Force restart the server even if it is already running.')):
+def mirror(port: int = typer.Option(MIRROR_PORT, '--port', help='Port to serve the model store on.'),
+           host: str = typer.Option('0.0.0.0', '--host', help='Address to listen on.'),
+           fill: bool = typer.Option(True, '--fill/--no-fill', help='Download requested models this node lacks from upstream.'),
+           add: str = typer.Option(None, '--add', help='Download through the mirror at this URL from now on.'),
+           remove: str = typer.Option(None, '--remove', help='Stop using the mirror at this URL.'),
+           show: bool = typer.Option(False, '--list', help='List the mirrors downloads go through.')):
+    """
+    Serve downloaded models to other nodes, or choose mirrors to download from.
+    """
+    if add or remove or show:
+        with config_batch() as config:
+            mirrors = config.setdefault('mirrors', [])
+            if add and add.rstrip('/') not in mirrors:
+                mirrors.append(add.rstrip('/'))
+            if remove and remove.rstrip('/') in mirrors:
+                mirrors.remove(remove.rstrip('/'))
+        for url in mirrors:
+            typer.echo(url)
+        if not mirrors:
+            typer.echo("No mirrors configured; downloads go straight upstream.")
+        return
+
+    from solo_cli.utils.mirror import Mirror, MirrorServer, stored_models
+    from solo_cli.utils.model_store import store_dir
+
+    server = MirrorServer((host, port), Mirror(fill=fill))
+    typer.echo(f"Serving {len(stored_models())} files from {store_dir()} on http://{host}:{port}/models/"
+               + (", filling missing models from upstream" if fill else "") + ". Press Ctrl+C to stop.")
+    typer.echo(f"On other nodes: solo-cli mirror --add http://<this host>:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+@app.command()
+def quickstart(restart: bool = typer.Option(False, '--restart', help='Force restart the server even if it is already running.'),
+               timeout: int = typer.Option(DEFAULT_READY_TIMEOUT, '--timeout', help='Seconds to wait for the model to load.'),
+               warm: bool = typer.Option(False, '--warm', help='Prefetch the model into the page cache before starting.')):
+    from solo_cli.utils.llama_server import is_server_running, kill_process_on_port, write_launch_script
+
     print("running quickstart...")
 
     if not restart and is_server_running():
@@ -56,87 +202,720 @@ def quickstart(restart: bool = typer.Option(False, '--restart', help='Force rest
         typer.echo("Llama server is already running.")
     else:
         kill_process_on_port(8080)
+        from solo_cli.utils.cache import record_use
+
         config = load_config()
-        llamafile = f"{config.get('model_name', DEFAULT_MODEL)}.llamafile"
+        model_name = config.get('model_name', DEFAULT_MODEL)
+        record_use(model_name)
+        llamafile = f"{model_name}.llamafile"
         shell_script = f"{llamafile}.sh"
 
         root_path = config.get('dir', './')
-        llamafile_path = os.path.join(root_path, llamafile)
+        command = _model_command(model_name, root_path)
+        try:
+            ctx_size = _plan_launch(model_name)
+        except ValueError as e:
+            typer.echo(f"ERROR: {e}", err=True)
+            raise typer.Exit(code=1)
+
+        permitted_file = write_launch_script(shell_script, command[0],
+                                             extra_args=command[1:] + _launch_args(model_name, ctx_size=ctx_size))
+        with config_batch() as config:
+            config.setdefault('file_permissions', {})[permitted_file] = True
+        if warm and _model_path(model_name):
+            _warm_file(_model_path(model_name))
+
+        typer.echo("starting llama server...")
+        _launch(['./' + shell_script], model_name, 8080, timeout)
 
-        with open(shell_script, 'w') as f:
-            f.write(f"#!/bin/bash\n{llamafile_path} --nobrowser")
+def _model_command(model_name, root='.'):
+    """The command that runs a model: its split runtime and weights if it has been split, else the llamafile."""
+    from solo_cli.utils.split import split_command
 
-        permitted_file = set_permissions(shell_script)
-        file_permissions = config.get('file_permissions', {})
-        # file_permissions={}
-        file_permissions[permitted_file] = True
-        update_config('file_permissions', file_permissions)
+    return split_command(model_name) or [os.path.join(root, f"{model_name}.llamafile")]
 
-        typer.echo("starting llama server...")
-        subprocess.run(['./' + shell_script], check=True)
+def _launch_args(model_name, skip=(), ctx_size=None):
+    """
+    Extra llamafile flags: the tuned profile, plus --embedding for embedding
+    models. A planned ctx_size replaces the tuned one.
+    """
+    from solo_cli.utils.catalog import model_kind
+    from solo_cli.utils.tuner import load_profile, profile_args
+
+    if ctx_size:
+        skip = tuple(skip) + ('ctx_size',)
+    args = profile_args(load_profile(model_name), skip=skip)
+    if ctx_size:
+        args += ['--ctx-size', str(ctx_size)]
+    if model_kind(model_name) == 'embedding':
+        args.append('--embedding')
+    return args
+
+def _model_info(model_name):
+    """The GGUF header figures of a downloaded model, or None if it is not on disk or unreadable."""
+    from solo_cli.utils.gguf import model_info
+
+    path = _model_path(model_name)
+    try:
+        return model_info(path) if path else None
+    except (OSError, ValueError):
+        return None
+
+def _plan_launch(model_name, ctx_size=None, replicas=1, force=False, report=typer.echo):
+    """
+    Check that the model fits in the memory available before launching it.
+    Returns the --ctx-size to launch with, or None to keep the configured one;
+    raises ValueError, naming smaller quantizations that would fit, when even
+    the smallest context does not.
+    """
+    from solo_cli.utils.catalog import load_catalog
+    from solo_cli.utils.planner import estimate, plan, available_memory, smaller_quants
+    from solo_cli.utils.sizes import format_size
+    from solo_cli.utils.tuner import load_profile
+
+    info = _model_info(model_name)
+    if info is None:
+        return ctx_size
+    requested = ctx_size or (load_profile(model_name) or {}).get('ctx_size')
+    result = plan(info, available_memory(), requested, replicas)
+    if result['action'] == 'ok':
+        return ctx_size
+    available = format_size(result['available'])
+    wanted = format_size(estimate(info, result['requested_ctx'], replicas)['total'])
+    if result['action'] == 'shrink':
+        report(f"{model_name} needs ~{wanted} at context {result['requested_ctx']} but {available} is available; "
+               f"using --ctx-size {result['ctx_size']} (~{format_size(result['estimate']['total'])}).")
+        return result['ctx_size']
+    message = f"{model_name} needs ~{wanted} but only {available} is available."
+    if force:
+        report(f"WARNING: {message} Launching anyway.")
+        return ctx_size
+    suggestions = smaller_quants(model_name, info, result['available'], load_catalog(), requested, replicas)
+    if suggestions:
+        message += " Smaller quantizations that fit: " + ', '.join(
+            f"{entry['id']} (~{format_size(entry['needed'])})" for entry in suggestions[:3]) + "."
+    raise ValueError(message + " Use --force to launch anyway.")
+
+def _launch(command, model_name, port, timeout):
+    import asyncio
+    from solo_cli.utils.llama_server import launch_server
+    from solo_cli.utils.readiness import LaunchError
+
+    try:
+        process, ready, first_token = launch_server(command, model_name, port=port, timeout=timeout)
+    except LaunchError as e:
+        typer.echo(f"ERROR: {e}", err=True)
+        raise typer.Exit(code=1)
+    except (OSError, asyncio.TimeoutError) as e:
+        typer.echo(f"ERROR: {model_name} failed to start: {e or 'timed out'}", err=True)
+        raise typer.Exit(code=1)
+    typer.echo(f"{model_name} ready on port {port} (pid {process.pid}) after {ready:.1f}s, "
+               f"first token in {first_token * 1000:.0f}ms.")
+
+def _model_path(model):
+    """The weights of a split model, else a model name or path to the llamafile on disk, or None."""
+    from solo_cli.utils.split import split_weights
+
+    candidates = split_weights(model)[:1] + [model, f"{model}.llamafile",
+                                             os.path.join(load_config().get('dir', './'), f"{model}.llamafile")]
+    return next((path for path in candidates if os.path.isfile(path)), None)
+
+def _warm_file(path, report=typer.echo):
+    from solo_cli.utils.sizes import format_size
+    from solo_cli.utils.warm import prefetch, residency
+
+    with span('warm', file=os.path.basename(path)):
+        seconds = prefetch(path)
+    resident, size = residency(path)
+    detail = f", {resident / size:.0%} resident" if resident is not None and size else ""
+    report(f"Warmed {os.path.basename(path)} ({format_size(size)}) in {seconds:.1f}s{detail}.")
+
+@app.command()
+def plan(model_name: str,
+         ctx_size: int = typer.Option(None, '--ctx-size', help='Context size to plan for (default: tuned or 8192).'),
+         replicas: int = typer.Option(1, '--replicas', help='Number of server processes sharing the weights.')):
+    """
+    Estimate a downloaded model's memory use from its GGUF header.
+    """
+    from solo_cli.utils.catalog import load_catalog
+    from solo_cli.utils.planner import available_memory, plan as plan_launch, smaller_quants
+    from solo_cli.utils.sizes import format_size
+    from solo_cli.utils.tuner import load_profile
+
+    info = _model_info(model_name)
+    if info is None:
+        typer.echo(f"No readable GGUF weights found for {model_name}. Run `solo-cli pull {model_name}` first.", err=True)
+        raise typer.Exit(code=1)
+    requested = ctx_size or (load_profile(model_name) or {}).get('ctx_size')
+    result = plan_launch(info, available_memory(), requested, replicas)
+
+    typer.echo(f"{info['name'] or model_name}: {info['architecture']}, {info['parameters'] / 1e9:.2f}B parameters, "
+               f"{info['quant'] or 'unknown quant'}, {info['layers']} layers, trained context {info['context_length']}")
+    estimate = result['estimate']
+    typer.echo(f"At context {result['ctx_size']} x {replicas}: weights {format_size(estimate['weights'])} + "
+               f"KV cache {format_size(estimate['kv_cache'])} + overhead {format_size(estimate['overhead'])} "
+               f"= {format_size(estimate['total'])}")
+    if result['available'] is None:
+        typer.echo("Available memory is unknown on this platform.")
+        return
+    typer.echo(f"Available: {format_size(result['available'])}")
+    if result['action'] == 'ok':
+        typer.echo("Fits.")
+    elif result['action'] == 'shrink':
+        typer.echo(f"Does not fit at context {result['requested_ctx']}; start would use --ctx-size {result['ctx_size']}.")
+    else:
+        typer.echo("Does not fit even at the smallest context.")
+        for entry in smaller_quants(model_name, info, result['available'], load_catalog(), requested, replicas):
+            typer.echo(f"  try {entry['id']} (~{format_size(entry['needed'])})")
+        raise typer.Exit(code=1)
+
+@app.command()
+def warm(model: str = typer.Argument(..., help='Model name or path to a llamafile.'),
+         lock: bool = typer.Option(False, '--lock', help='Lock the file in RAM and hold it until Ctrl+C.'),
+         check: bool = typer.Option(False, '--check', help='Only report how much is already resident.')):
+    """
+    Prefetch a model into the page cache so the first requests skip disk reads.
+    """
+    import time
+    from tqdm import tqdm
+    from solo_cli.utils.sizes import format_size
+    from solo_cli.utils.warm import lock as lock_file, prefetch, residency
+
+    path = _model_path(model)
+    if path is None:
+        typer.echo(f"No llamafile found for {model}. Run `solo-cli pull {model}` first.", err=True)
+        raise typer.Exit(code=1)
+
+    def report_residency():
+        resident, size = residency(path)
+        if resident is None:
+            typer.echo(f"{format_size(size)}; residency is not available on this platform.")
+        else:
+            typer.echo(f"{format_size(resident)} of {format_size(size)} resident "
+                       f"({resident / size if size else 1:.0%}).")
+
+    report_residency()
+    if check:
+        return
+    size = os.path.getsize(path)
+    with tqdm(total=size, unit='B', unit_scale=True, desc=os.path.basename(path)) as bar:
+        with span('warm', file=os.path.basename(path)):
+            seconds = prefetch(path, progress=bar.update)
+    typer.echo(f"Read {format_size(size)} in {seconds:.1f}s ({size / 1e6 / max(seconds, 1e-6):.0f} MB/s).")
+    if not lock:
+        report_residency()
+        return
+
+    try:
+        mapping = lock_file(path)
+    except OSError as e:
+        typer.echo(f"ERROR: {e.strerror or e}", err=True)
+        raise typer.Exit(code=1)
+    report_residency()
+    typer.echo("Holding the model locked in memory. Press Ctrl+C to release it.")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        mapping.close()
+
+@app.command()
+def split(model_names: List[str] = typer.Argument(..., help='Downloaded models to split.'),
+          prune: bool = typer.Option(False, '--prune', help='Delete the bundled llamafile afterwards.')):
+    """
+    Split llamafiles into one shared runtime plus GGUF weights in the model store.
+    """
+    import zipfile
+    from solo_cli.utils.sizes import format_size
+    from solo_cli.utils.split import prune_bundle, split_llamafile
+
+    for model_name in model_names:
+        path = f"{model_name}.llamafile"
+        if not os.path.exists(path):
+            typer.echo(f"{path} not found. Run `solo-cli pull {model_name}` first.", err=True)
+            raise typer.Exit(code=1)
+        try:
+            with span('split', model=model_name):
+                manifest, shared = split_llamafile(path, model_name)
+        except (ValueError, zipfile.BadZipFile) as e:
+            typer.echo(f"ERROR: cannot split {path}: {e}", err=True)
+            raise typer.Exit(code=1)
+        weights = ', '.join(os.path.basename(member) for member in manifest['weights'])
+        typer.echo(f"Split {path} into {weights} and "
+                   + ("the runtime already in the store." if shared else f"runtime {manifest['runtime'][:12]}."))
+        if prune:
+            typer.echo(f"Removed {path}, freeing {format_size(prune_bundle(path))}.")
+    typer.echo("start and quickstart now launch the shared runtime with the extracted weights.")
 
 @app.command()
-def serve(port: int = 8080):
-    start_ngrok_service(port)
+def cache(quota: str = typer.Option(None, '--quota', callback=_quota_option, help='Most disk the model store may use, e.g. 200G; "none" removes the limit.'),
+          run_evict: bool = typer.Option(False, '--evict', help='Remove least recently used models until the store fits the quota.'),
+          dry_run: bool = typer.Option(False, '--dry-run', help='With --evict, only show what would be removed.')):
+    """
+    Show the models in the store, set its disk quota and evict unused models.
+    """
+    import time
+    from solo_cli.utils.cache import cache_quota, cached_models, evict, running_models, store_usage
+    from solo_cli.utils.model_store import store_dir
+    from solo_cli.utils.sizes import format_size
+
+    if quota is not None:
+        update_config('cache_quota', None if quota == 'none' else quota)
+    limit = cache_quota()
+    if run_evict:
+        if limit is None:
+            typer.echo("No cache quota set; use --quota first.", err=True)
+            raise typer.Exit(code=1)
+        evicted = evict(limit, dry_run=dry_run)
+        for name, freed in evicted:
+            typer.echo(f"{'Would evict' if dry_run else 'Evicted'} {name} ({format_size(freed)}).")
+        if not evicted:
+            typer.echo("Nothing to evict.")
+
+    models = cached_models()
+    running = running_models(models)
+    now = time.time()
+    typer.echo(f"Model store {store_dir()}: {format_size(store_usage())} used"
+               + (f" of a {format_size(limit)} quota." if limit is not None else ", no quota."))
+    # Least recently used first: the order eviction would go in.
+    for model in models:
+        days = (now - model['last_used']) / 86400 if model['last_used'] else None
+        used = 'never used' if days is None else 'used today' if days < 1 else f"used {days:.0f} days ago"
+        details = [format_size(model['size']), used] + (['split'] if model['split'] else []) \
+            + (['running'] if model['name'] in running else [])
+        typer.echo(f"- {model['name']}  {'  '.join(details)}")
 
 @app.command()
-def start(model_name: str, port: int):
-    if model_name in MODELS:
+def serve(port: int = 8080,
+          gateway_port: int = typer.Option(8000, '--gateway-port', help='Local port of the admission-control gateway that ngrok exposes.'),
+          gateway: bool = typer.Option(True, '--gateway/--no-gateway', help='Expose the model server directly instead of through the gateway.'),
+          max_inflight: int = typer.Option(4, '--max-inflight', help='Requests in flight per backend; match the server\'s --parallel slots.'),
+          queue_deadline: float = typer.Option(10.0, '--queue-deadline', help='Seconds a request may wait for a slot before a 503.'),
+          rate: float = typer.Option(None, '--rate', help='Requests per second allowed per client address.'),
+          burst: int = typer.Option(None, '--burst', help='Requests a client may send at once before --rate applies.'),
+          trusted_proxies: int = typer.Option(1, '--trusted-proxies', help='Proxies in front of the gateway that append X-Forwarded-For (ngrok is one).'),
+          api_keys: bool = typer.Option(False, '--api-keys', help='Rate-limit per API key; only if the server validates keys (llamafile --api-key).'),
+          affinity: bool = typer.Option(True, '--affinity/--no-affinity', help='Send prompts sharing a prefix to the slot that last evaluated it.')):
+    """
+    Expose the local model server through ngrok, behind an admission-control gateway.
+    """
+    from solo_cli.utils.llama_server import start_ngrok_service
+
+    if not gateway:
+        start_ngrok_service(port)
+        return
+
+    from solo_cli.utils.admission import Gateway
+    from solo_cli.utils.proxy import Backend
+
+    start_ngrok_service(gateway_port)
+    model_name = load_config().get('model_name')
+    proxy = Gateway([Backend('127.0.0.1', port)], max_inflight=max_inflight, deadline=queue_deadline,
+                    rate=rate, burst=burst, trusted_proxies=trusted_proxies, api_keys=api_keys, model_name=model_name,
+                    affinity=_prefix_affinity(model_name) if affinity else None)
+    typer.echo(f"Gateway on port {gateway_port} in front of port {port}: {max_inflight} requests in flight, "
+               f"the rest queued (interactive before `X-Priority: batch`) for up to {queue_deadline:g}s. "
+               f"Press Ctrl+C to stop.")
+    try:
+        proxy.run('127.0.0.1', gateway_port)
+    except KeyboardInterrupt:
+        pass
+
+@app.command()
+def start(model_name: str, port: int = 8080,
+          timeout: int = typer.Option(DEFAULT_READY_TIMEOUT, '--timeout', help='Seconds to wait for the model to load.'),
+          replicas: int = typer.Option(1, '--replicas', help='Number of llamafile processes behind a load-balancing proxy.'),
+          pin: bool = typer.Option(True, '--pin/--no-pin', help='Pin each replica to its own CPU set / NUMA node.'),
+          cache: bool = typer.Option(False, '--cache/--no-cache', help='Cache responses to deterministic (temperature 0) requests.'),
+          cache_entries: int = typer.Option(1024, '--cache-entries', help='Responses kept in memory.'),
+          cache_ttl: int = typer.Option(24 * 3600, '--cache-ttl', help='Seconds a cached response stays valid.'),
+          cache_dir: str = typer.Option(None, '--cache-dir', help='Directory for the persistent cache tier.'),
+          supervise: bool = typer.Option(False, '--supervise', help='Keep the port served across model swaps and restart crashed replicas.'),
+          affinity: bool = typer.Option(True, '--affinity/--no-affinity', help='Send prompts sharing a prefix to the replica and slot that last evaluated it.'),
+          metrics: bool = typer.Option(False, '--metrics', help='Serve Prometheus metrics at /metrics on the proxy port.'),
+          warm: bool = typer.Option(False, '--warm', help='Prefetch the model into the page cache before starting.'),
+          ctx_size: int = typer.Option(None, '--ctx-size', help='Context size; by default the tuned one, shrunk to fit in memory.'),
+          force: bool = typer.Option(False, '--force', help='Launch even if the model does not fit in memory.')):
+    from solo_cli.utils.catalog import known_model
+    from solo_cli.utils.llama_server import write_launch_script
+
+    if known_model(model_name):
+        from solo_cli.utils.cache import record_use
+
         filename = f"{model_name}.llamafile"
         shell_script = f"{filename}.sh"
+        record_use(model_name)
 
-        update_config('model_name', model_name)
+        # The page cache is shared, so warming here also helps a supervisor
+        # that is about to load this model next to the one it serves.
+        if warm and _model_path(model_name):
+            _warm_file(_model_path(model_name))
 
-        with open(shell_script, 'w') as f:
-            f.write(f"#!/bin/bash\n./{filename}")
+        if _swap_supervised(model_name, port, timeout):
+            return
 
-        set_permissions(shell_script)
+        update_config('model_name', model_name)
 
-        subprocess.run(['./' + shell_script], check=True)
+        if replicas > 1 or cache or supervise or metrics:
+            response_cache = None
+            if cache:
+                from solo_cli.utils.model_store import store_dir
+                from solo_cli.utils.response_cache import ResponseCache
+                response_cache = ResponseCache(max_entries=cache_entries, ttl=cache_ttl,
+                                               disk_dir=cache_dir or os.path.join(store_dir(), 'responses'))
+            _start_behind_proxy(model_name, port, replicas, pin, timeout, response_cache, metrics, ctx_size, force,
+                                affinity)
+            return
+
+        try:
+            planned_ctx = _plan_launch(model_name, ctx_size, force=force)
+        except ValueError as e:
+            typer.echo(f"ERROR: {e}", err=True)
+            raise typer.Exit(code=1)
+        command = _model_command(model_name)
+        write_launch_script(shell_script, command[0], port,
+                            extra_args=command[1:] + _launch_args(model_name, ctx_size=planned_ctx))
+
+        _launch(['./' + shell_script], model_name, port, timeout)
     else:
         print(f"Model {model_name} not found. Please provide a valid model name.")
 
-@app.command()
-def initapp(dir: str = './'):
-    if not check_node_installed():
-        install_node()
-    else:
-        print("Node.js is already installed.")
+def _swap_supervised(model_name, port, timeout):
+    """Hand the model to a supervisor already serving this port; False if there is none."""
+    from solo_cli.utils.supervisor import request_swap, running_supervisor
+
+    supervisor = running_supervisor()
+    if supervisor is None or supervisor[0] != port:
+        return False
+    typer.echo(f"Swapping the model served on port {port} to {model_name}...")
+    status, payload = request_swap(port, model_name, timeout)
+    if status != 200:
+        typer.echo(f"ERROR: {payload.get('error', status)}", err=True)
+        raise typer.Exit(code=1)
+    update_config('model_name', model_name)
+    typer.echo(f"{model_name} is now serving on port {port} (ready after {payload['ready_s']:.1f}s).")
+    return True
+
+def _prefix_affinity(model_name):
+    """Prefix routing for a model, pinning llamafile slots when its tuned profile runs several."""
+    from solo_cli.utils.affinity import PrefixAffinity
+    from solo_cli.utils.tuner import load_profile
+
+    return PrefixAffinity(slots=(load_profile(model_name) or {}).get('parallel') if model_name else None)
+
+def _start_behind_proxy(model_name, port, replicas, pin, timeout, response_cache=None, metrics=False,
+                        ctx_size=None, force=False, affinity=True):
+    from solo_cli.utils.catalog import known_model
+    from solo_cli.utils.pool import ReplicaPool, partition_cpus
+    from solo_cli.utils.proxy import ReverseProxy
+    from solo_cli.utils.readiness import LaunchError
+    from solo_cli.utils.supervisor import Supervisor
+
+    cpu_sets = partition_cpus(replicas) if pin and replicas > 1 else None
+
+    def pool_factory(name, ports):
+        command = _model_command(name)
+        if not known_model(name) or not os.path.exists(command[0]):
+            raise ValueError(f"{name}.llamafile not found; run `solo-cli pull {name}` first")
+        planned_ctx = _plan_launch(name, ctx_size, replicas, force)
+        # Pinned replicas size --threads to their CPU set instead of the tuned value.
+        extra = _launch_args(name, skip=('threads',) if cpu_sets else (), ctx_size=planned_ctx)
+        return ReplicaPool(command + ['--nobrowser'] + extra, name, ports, cpu_sets)
+
+    registry = None
+    if metrics:
+        from solo_cli.utils.metrics import Registry, collect_recorded
+        registry = Registry()
+        registry.add_collector(collect_recorded)
+    proxy = ReverseProxy([], cache=response_cache, model_name=model_name, metrics=registry,
+                         affinity=_prefix_affinity(model_name) if affinity else None)
+    supervisor = Supervisor(proxy, pool_factory, port, replicas, timeout, report=typer.echo)
+    if cpu_sets:
+        for index, cpus in enumerate(cpu_sets):
+            typer.echo(f"  replica {index} pinned to CPUs {cpus}")
+    if response_cache is not None:
+        typer.echo(f"Response cache enabled ({response_cache.disk_dir}).")
+    if registry is not None:
+        typer.echo(f"Prometheus metrics at http://127.0.0.1:{port}/metrics")
+    typer.echo(f"Proxy on port {port}; `solo-cli start <model> --port {port}` swaps models "
+               f"without downtime. Press Ctrl+C to stop.")
+    try:
+        supervisor.run(model_name)
+    except (LaunchError, ValueError) as e:
+        typer.echo(f"ERROR: {e}", err=True)
+        raise typer.Exit(code=1)
 
-    if os.path.exists(dir):
-        update_config('dir', dir)
-
-    # chat ui repo
-    clone_repo()
-    # install dependencies in chat ui
-    run_npm_install()
-    # run db instance for chat storage
-    run_docker_mongodb()
+@app.command()
+def tune(model_name: str,
+         budget: int = typer.Option(600, '--budget', help='Maximum seconds to spend tuning.'),
+         port: int = typer.Option(8090, '--port', help='Side port used for trial servers.')):
+    """
+    Find the fastest llamafile launch flags for a model on this machine.
+    """
+    from solo_cli.utils.catalog import known_model
+    from solo_cli.utils.tuner import profile_args, tune as run_tuner
 
-    # Prompt the user for Hugging Face token
-    prompt_huggingface_token()
+    if not known_model(model_name):
+        print(f"Model {model_name} not found. Please provide a valid model name.")
+        raise typer.Exit(code=1)
+    command = _model_command(model_name)
+    if not os.path.exists(command[0]):
+        print(f"{model_name}.llamafile not found. Run `solo-cli pull {model_name}` first.")
+        raise typer.Exit(code=1)
+
+    typer.echo(f"Tuning {model_name} for up to {budget}s...")
+    profile = run_tuner(command + ['--nobrowser'], model_name, port, budget, report=typer.echo)
+    if profile is None:
+        typer.echo("No trial completed; nothing saved.", err=True)
+        raise typer.Exit(code=1)
+    typer.echo(f"Best: {' '.join(profile_args(profile['flags']))} "
+               f"({profile['tokens_per_s']:.1f} tok/s after {profile['trials']} trials). "
+               f"start and quickstart will use it.")
 
-    # get selected model
-    config = load_config()
-    # incase no model selected initiate default model download
+@app.command()
+def chat(port: int = 8080,
+         system: str = typer.Option(None, '--system', help='System prompt for the conversation.'),
+         max_tokens: int = typer.Option(512, '--max-tokens', help='Longest reply, in tokens.'),
+         context: int = typer.Option(None, '--context', help='Context size in tokens; asked from the server otherwise.'),
+         temperature: float = typer.Option(None, '--temperature', help='Sampling temperature; the server default otherwise.'),
+         stats: bool = typer.Option(True, '--stats/--no-stats', help='Show time to first token and tokens/s after each reply.')):
+    """
+    Chat with the running model in the terminal.
+    """
+    import requests
+    from solo_cli.utils.chat import ChatSession
+
+    session = ChatSession(port=port, system=system, max_tokens=max_tokens, context=context,
+                          options={} if temperature is None else {'temperature': temperature})
+    typer.echo(f"Chatting with http://127.0.0.1:{port} ({session.context} tokens of context). "
+               "/reset clears the history, /exit or Ctrl+D quits, Ctrl+C stops a reply.")
+    while True:
+        try:
+            text = input('> ').strip()
+        except (EOFError, KeyboardInterrupt):
+            typer.echo()
+            return
+        if text in ('/exit', '/quit'):
+            return
+        if text == '/reset':
+            session.reset()
+            typer.echo("History cleared.")
+            continue
+        if not text:
+            continue
+
+        reply = session.send(text)
+        try:
+            for piece in reply:
+                typer.echo(piece, nl=False)
+        except KeyboardInterrupt:
+            reply.close()
+            typer.echo(" [stopped]", nl=False)
+        except requests.RequestException as e:
+            typer.echo(f"ERROR: {e}", err=True)
+            continue
+        typer.echo()
+        last = session.last
+        if stats and last is not None and last['ttft'] is not None:
+            speed = f"{last['tokens_per_s']:.1f} tok/s" if last['tokens_per_s'] else f"{last['tokens']} tokens"
+            typer.echo(typer.style(f"[ttft {last['ttft'] * 1000:.0f} ms, {speed}, "
+                                   f"{session.context_tokens()}/{session.budget} context tokens]", dim=True))
 
-    file_permissions = config.get('file_permissions', {})
+@app.command()
+def bench(port: int = 8080,
+          concurrency: str = typer.Option('1,4,8', '--concurrency', help='Comma-separated concurrency levels.'),
+          requests_per_level: int = typer.Option(16, '--requests', help='Requests sent at each concurrency level.'),
+          max_tokens: int = typer.Option(64, '--max-tokens', help='Tokens generated per request.'),
+          endpoint: str = typer.Option('completion', '--endpoint', help='completion or chat.'),
+          prompt: str = typer.Option(None, '--prompt', help='Prompt to send; a fixed default is used otherwise.'),
+          json_path: str = typer.Option(None, '--json', help='Also write results as JSON to this file (- for stdout).'),
+          min_tokens_per_s: float = typer.Option(None, '--min-tokens-per-s', help='Exit non-zero if any level is slower.')):
+    """
+    Load-test the local model server and report throughput and latency.
+    """
+    import json
+    from solo_cli.utils.bench import DEFAULT_PROMPT, ENDPOINTS, format_table, run_bench
+
+    if endpoint not in ENDPOINTS:
+        typer.echo(f"Unknown endpoint {endpoint}, expected one of: {', '.join(ENDPOINTS)}", err=True)
+        raise typer.Exit(code=1)
+    try:
+        levels = [int(level) for level in concurrency.split(',') if level.strip()]
+    except ValueError:
+        levels = []
+    if not levels or min(levels) < 1 or requests_per_level < 1:
+        typer.echo(f"--concurrency must be positive integers separated by commas (got {concurrency!r}) "
+                   f"and --requests at least 1.", err=True)
+        raise typer.Exit(code=1)
+    summaries = run_bench('127.0.0.1', port, levels, requests_per_level, endpoint,
+                          prompt or DEFAULT_PROMPT, max_tokens)
+
+    if json_path == '-':
+        typer.echo(json.dumps(summaries, indent=2))
+    else:
+        typer.echo(format_table(summaries))
+        if json_path:
+            with open(json_path, 'w') as f:
+                json.dump(summaries, f, indent=2)
+
+    if any(summary['errors'] for summary in summaries):
+        typer.echo("Some requests failed.", err=True)
+        raise typer.Exit(code=1)
+    if min_tokens_per_s is not None and any(s['tokens_per_s'] < min_tokens_per_s for s in summaries):
+        typer.echo(f"Throughput fell below {min_tokens_per_s} tokens/s.", err=True)
+        raise typer.Exit(code=1)
 
-    if not file_permissions.get(config.get('model_name', DEFAULT_MODEL), False):
-        init()
+@app.command()
+def batch(input_path: str = typer.Argument(..., metavar='INPUT', help='JSONL file: one prompt, {"prompt": ...} or {"messages": [...]} per line.'),
+          output: str = typer.Argument(..., help='JSONL file results are appended to.'),
+          port: int = 8080,
+          concurrency: int = typer.Option(8, '--concurrency', help='Requests in flight at once.'),
+          endpoint: str = typer.Option('auto', '--endpoint', help='auto, completion or chat.'),
+          max_tokens: int = typer.Option(None, '--max-tokens', help='Default token limit for lines that set none.'),
+          restart: bool = typer.Option(False, '--restart', help='Ignore earlier runs and overwrite OUTPUT.')):
+    """
+    Run every prompt in a JSONL file through the local model, resumably.
+    """
+    from tqdm import tqdm
+    from solo_cli.utils.batch import ENDPOINTS, BatchError, run_batch
+
+    if endpoint != 'auto' and endpoint not in ENDPOINTS:
+        typer.echo(f"Unknown endpoint {endpoint}, expected auto or one of: {', '.join(ENDPOINTS)}", err=True)
+        raise typer.Exit(code=1)
+    defaults = {}
+    if max_tokens is not None:
+        defaults = {'n_predict': max_tokens} if endpoint == 'completion' else {'max_tokens': max_tokens}
+
+    counts = {'done': 0, 'errors': 0}
+    with tqdm(total=os.path.getsize(input_path), unit='B', unit_scale=True, desc='batch') as bar:
+        def progress(size, result):
+            bar.update(size)
+            if result is not None:
+                counts['done'] += 1
+                counts['errors'] += 'error' in result
+                bar.set_postfix(req_s=f"{counts['done'] / max(bar.format_dict['elapsed'], 1e-6):.1f}",
+                                errors=counts['errors'], refresh=False)
+        try:
+            with span('batch', input=input_path):
+                summary = run_batch(input_path, output, port=port, concurrency=concurrency,
+                                    endpoint=endpoint, defaults=defaults, restart=restart, progress=progress)
+        except BatchError as e:
+            typer.echo(f"ERROR: {e}", err=True)
+            raise typer.Exit(code=1)
+        except KeyboardInterrupt:
+            typer.echo("\nInterrupted; run the same command again to resume.", err=True)
+            raise typer.Exit(code=130)
+
+    seconds = max(summary['seconds'], 1e-6)
+    typer.echo(f"{summary['completed']} completed, {summary['errors']} failed"
+               + (f", {summary['skipped']} already done" if summary['skipped'] else "")
+               + f" in {seconds:.1f}s ({summary['completed'] / seconds:.1f} req/s, "
+               f"{summary['tokens'] / seconds:.1f} tok/s).")
+    if summary['errors']:
+        raise typer.Exit(code=1)
 
-    # create env file for chat ui
-    create_env_file()
+@app.command()
+def embed(input_path: str = typer.Argument(..., metavar='INPUT', help='Text file with one text per line, or - for stdin.'),
+          output: str = typer.Argument(..., help='float32 .npy file with one row per text.'),
+          port: int = 8080,
+          batch_size: int = typer.Option(32, '--batch-size', help='Texts per embedding request.'),
+          connections: int = typer.Option(4, '--connections', help='Requests in flight at once.'),
+          model: str = typer.Option(None, '--model', help='Model name used to key the cache (defaults to the configured model).'),
+          cache: str = typer.Option(None, '--cache', help='sqlite cache of computed vectors (default: ~/.cache/solo/embeddings.sqlite).'),
+          no_cache: bool = typer.Option(False, '--no-cache', help='Compute every vector, reading and writing no cache.')):
+    """
+    Embed texts with the running embedding model into a .npy matrix.
+    """
+    import sys
+    from tqdm import tqdm
+    from solo_cli.utils.embed import EmbedError, embed_file
+    from solo_cli.utils.model_store import store_dir
+
+    model = model or load_config().get('model_name', DEFAULT_MODEL)
+    cache_path = None
+    if not no_cache:
+        cache_path = cache or os.path.join(store_dir(), 'embeddings.sqlite')
+        os.makedirs(os.path.dirname(os.path.abspath(cache_path)), exist_ok=True)
+
+    source = sys.stdin.buffer if input_path == '-' else open(input_path, 'rb')
+    try:
+        with tqdm(unit=' rows', desc='embed') as bar, span('embed', model=model):
+            summary = embed_file(source, output, port=port, model=model, batch_size=batch_size,
+                                 connections=connections, cache_path=cache_path, progress=bar.update)
+    except EmbedError as e:
+        typer.echo(f"ERROR: {e}", err=True)
+        raise typer.Exit(code=1)
+    finally:
+        if source is not sys.stdin.buffer:
+            source.close()
+
+    seconds = max(summary['seconds'], 1e-6)
+    typer.echo(f"Wrote {summary['rows']} x {summary['dim'] or 0} float32 matrix to {output}: "
+               f"{summary['computed']} computed, {summary['cached']} from cache "
+               f"in {seconds:.1f}s ({summary['rows'] / seconds:.0f} rows/s).")
 
-    # Run solo_chat_ui and model server start in parallel
-    with concurrent.futures.ThreadPoolExecutor() as executor:
-        future_run_solo_chat_ui = executor.submit(run_solo_chat_ui)
-        future_quickstart = executor.submit(quickstart)
+@app.command()
+def initapp(dir: str = './',
+            force: bool = typer.Option(False, '--force', help='Rerun every setup step, even those already done.')):
+    import time
+    from solo_cli.utils.chat_ui import check_node_installed, install_node, clone_repo, run_npm_install,\
+        run_docker_mongodb, prompt_huggingface_token, create_env_file, run_solo_chat_ui,\
+        node_fingerprint, repo_fingerprint, npm_fingerprint, mongodb_fingerprint
+    from solo_cli.utils.tasks import TaskGraph, format_summary
 
-        # Wait for both to complete
-        concurrent.futures.wait([future_run_solo_chat_ui, future_quickstart])
+    if os.path.exists(dir):
+        update_config('dir', dir)
 
-    print("Both servers have been started.")
+    def ensure_node():
+        if not check_node_installed():
+            install_node()
+
+    def command_step(command, name):
+        """Run another solo-cli command as a task; its typer.Exit becomes a readable failure."""
+        def run():
+            try:
+                command()
+            except typer.Exit as e:
+                if e.exit_code:
+                    raise RuntimeError(f"solo-cli {name} exited with code {e.exit_code}; see its output above")
+        return run
+
+    def download_model():
+        # incase no model selected initiate default model download
+        config = load_config()
+        if not config.get('file_permissions', {}).get(config.get('model_name', DEFAULT_MODEL), False):
+            init(connections=DEFAULT_CONNECTIONS)
+
+    def model_fingerprint():
+        model_name = load_config().get('model_name', DEFAULT_MODEL)
+        path = f"{model_name}.llamafile"
+        return f"{model_name}:{os.path.getsize(path)}" if os.path.exists(path) else None
+
+    # The model download and server only need the model; the chat UI steps
+    # need node, the repo and MongoDB. Both chains run side by side.
+    graph = TaskGraph(state_key='initapp_steps')
+    graph.add('node', ensure_node, fingerprint=node_fingerprint)
+    graph.add('clone', clone_repo, fingerprint=repo_fingerprint)
+    graph.add('npm_install', run_npm_install, deps=['node', 'clone'], fingerprint=npm_fingerprint)
+    graph.add('docker_mongodb', run_docker_mongodb, fingerprint=mongodb_fingerprint)
+    graph.add('hf_token', prompt_huggingface_token)
+    graph.add('env_file', create_env_file, deps=['clone', 'hf_token'])
+    graph.add('download', command_step(download_model, 'init'), fingerprint=model_fingerprint)
+    graph.add('quickstart', command_step(lambda: quickstart(restart=False, timeout=DEFAULT_READY_TIMEOUT, warm=False),
+                                         'quickstart'), deps=['download'])
+
+    started = time.monotonic()
+    results = graph.run(force=force)
+    typer.echo(format_summary(results, time.monotonic() - started))
+
+    if any(result['status'] in ('failed', 'blocked') for result in results.values()):
+        typer.echo("Setup did not finish; fix the failed steps and run initapp again.", err=True)
+        raise typer.Exit(code=1)
+    # npm run dev stays in the foreground.
+    with span('initapp.chat_ui'):
+        run_solo_chat_ui()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,199 @@
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+
+from solo_cli.utils.proxy import ReverseProxy, response_bytes
+
+LANES = ('interactive', 'batch')  # served strictly in this order
+DEFAULT_MAX_INFLIGHT = 4
+QUEUE_DEADLINE = 10.0  # seconds a request may wait for a slot before it is turned away
+SERVICE_SMOOTHING = 0.2  # weight of the newest request in the moving average of service time
+MAX_CLIENTS = 10000
+# Never queued: health checks, the proxy's own endpoints and metrics scrapes.
+UNQUEUED_PATHS = ('/health', '/metrics')
+
+
+class Rejected(Exception):
+    def __init__(self, retry_after):
+        super().__init__(f"retry after {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+class RateLimiter:
+    """Token bucket per client: `rate` requests per second with bursts of up to `burst`."""
+
+    def __init__(self, rate, burst, max_clients=MAX_CLIENTS):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self._buckets = OrderedDict()  # client -> (tokens, updated), least recently seen first
+
+    def check(self, client, now=None):
+        """Take a token for client; returns 0 if it may go ahead, else the seconds until it may."""
+        now = time.monotonic() if now is None else now
+        tokens, updated = self._buckets.pop(client, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        wait = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / self.rate
+        self._buckets[client] = (tokens, now)
+        if len(self._buckets) > self.max_clients:
+            self._buckets.popitem(last=False)
+        return wait
+
+
+class AdmissionController:
+    """
+        At most `capacity` requests in flight; the rest wait in priority lanes.
+
+        A freed slot goes to the oldest waiter of the first non-empty lane. A
+        request whose expected wait, from the queue ahead of it and the moving
+        average of service time, exceeds the deadline is rejected at once
+        instead of queueing; one that does queue gives up at the deadline.
+    """
+
+    def __init__(self, capacity, deadline=QUEUE_DEADLINE):
+        self.capacity = capacity
+        self.deadline = deadline
+        self.inflight = 0
+        self.service_time = None
+        self.queues = {lane: deque() for lane in LANES}
+
+    def queued(self, lane=None):
+        lanes = [lane] if lane else LANES
+        return sum(len(self.queues[name]) for name in lanes)
+
+    def expected_wait(self, lane):
+        """Seconds until a new request in lane would get a slot, or 0 if unknown."""
+        if self.service_time is None:
+            return 0.0
+        ahead = sum(len(self.queues[name]) for name in LANES[:LANES.index(lane) + 1])
+        return (ahead + 1) * self.service_time / max(self.capacity, 1)
+
+    def _dispatch(self):
+        for lane in LANES:
+            queue = self.queues[lane]
+            while queue and self.inflight < self.capacity:
+                future = queue.popleft()
+                if not future.done():
+                    self.inflight += 1
+                    future.set_result(None)
+
+    async def acquire(self, lane='interactive'):
+        """Wait for a slot; raises Rejected with a retry delay when it cannot come in time."""
+        self._dispatch()  # capacity may have grown since the last release
+        if self.inflight < self.capacity and not self.queued():
+            self.inflight += 1
+            return
+        wait = self.expected_wait(lane)
+        if wait > self.deadline:
+            raise Rejected(wait)
+        future = asyncio.get_running_loop().create_future()
+        self.queues[lane].append(future)
+        await asyncio.wait([future], timeout=self.deadline)
+        if future.done():
+            return
+        future.cancel()
+        self.queues[lane].remove(future)
+        raise Rejected(max(self.expected_wait(lane), 1.0))
+
+    def release(self, elapsed):
+        """Free a slot held for elapsed seconds."""
+        if self.service_time is None:
+            self.service_time = elapsed
+        else:
+            self.service_time += SERVICE_SMOOTHING * (elapsed - self.service_time)
+        self.inflight -= 1
+        self._dispatch()
+
+
+def client_key(request, trusted_proxies=0, api_keys=False):
+    """
+        Who a request counts against. Clients can send any header, so this is
+        the address the nearest trusted proxy saw: the X-Forwarded-For entry
+        it appended, trusted_proxies hops from the right, or the socket peer
+        when there are none. The Authorization value is used only with
+        api_keys, when the backend rejects keys it does not know.
+    """
+    if api_keys:
+        authorization = request.header('authorization')
+        if authorization:
+            return f"key:{authorization}"
+    if trusted_proxies:
+        hops = [hop.strip() for hop in (request.header('x-forwarded-for') or '').split(',') if hop.strip()]
+        if len(hops) >= trusted_proxies:
+            return hops[-trusted_proxies]
+    return request.client[0] if request.client else None
+
+
+def request_lane(request):
+    """`X-Priority: batch` marks bulk work; everything else is interactive."""
+    return 'batch' if (request.header('x-priority') or '').strip().lower() == 'batch' else 'interactive'
+
+
+class Gateway(ReverseProxy):
+    """
+        ReverseProxy with admission control: per-client rate limits and at most
+        max_inflight requests per healthy backend, with the excess queued
+        interactive before batch. Requests that would wait past the deadline
+        get a fast 503, rate-limited ones a 429, both with Retry-After.
+        trusted_proxies and api_keys decide who a client is; see client_key().
+    """
+
+    def __init__(self, backends, max_inflight=DEFAULT_MAX_INFLIGHT, deadline=QUEUE_DEADLINE,
+                 rate=None, burst=None, trusted_proxies=0, api_keys=False, **kwargs):
+        super().__init__(backends, **kwargs)
+        self.trusted_proxies = trusted_proxies
+        self.api_keys = api_keys
+        self.max_inflight = max_inflight
+        self.admission = AdmissionController(max_inflight * max(1, len(self.backends)), deadline)
+        self.limiter = RateLimiter(rate, burst or max(1, int(rate))) if rate else None
+        self.rejected = {'rate_limited': 0, 'overloaded': 0}
+        self.admin_handlers['/_solo/admission'] = self._admission_status
+        if self.metrics is not None:
+            self.metrics.add_collector(self._collect_admission)
+
+    async def handle(self, request, writer):
+        path = request.path.split('?', 1)[0]
+        if path.startswith('/_solo/') or path in UNQUEUED_PATHS:
+            return await super().handle(request, writer)
+        if self.limiter is not None:
+            wait = self.limiter.check(client_key(request, self.trusted_proxies, self.api_keys))
+            if wait:
+                return self._reject(request, writer, 429, 'Too Many Requests', 'rate_limited', wait)
+
+        self.admission.capacity = self.max_inflight * max(1, len(self.healthy_backends()))
+        try:
+            await self.admission.acquire(request_lane(request))
+        except Rejected as e:
+            return self._reject(request, writer, 503, 'Service Unavailable', 'overloaded', e.retry_after)
+        started = time.monotonic()
+        try:
+            return await super().handle(request, writer)
+        finally:
+            self.admission.release(time.monotonic() - started)
+
+    def _reject(self, request, writer, status, reason, kind, retry_after):
+        self.rejected[kind] += 1
+        request.status = status
+        writer.write(response_bytes(status, reason, {'error': kind.replace('_', ' ')},
+                                    {'Retry-After': str(max(1, math.ceil(retry_after)))}, request.keep_alive))
+        return request.keep_alive
+
+    async def _admission_status(self, request):
+        admission = self.admission
+        return 200, {'capacity': admission.capacity, 'inflight': admission.inflight,
+                     'queued': {lane: admission.queued(lane) for lane in LANES},
+                     'service_time_s': admission.service_time, 'rejected': dict(self.rejected)}
+
+    def _collect_admission(self, registry):
+        queued = registry.gauge('solo_gateway_queued', 'Requests waiting for a slot, per lane.', ('lane',))
+        for lane in LANES:
+            queued.set(self.admission.queued(lane), lane=lane)
+        registry.gauge('solo_gateway_inflight', 'Requests holding a slot.').set(self.admission.inflight)
+        rejected = registry.counter('solo_gateway_rejected_total', 'Requests turned away, by reason.', ('reason',))
+        for reason, count in self.rejected.items():
+            rejected.set(count, reason=reason)
@@ -0,0 +1,128 @@
+import hashlib
+import json
+from collections import OrderedDict
+
+MAX_ENTRIES = 4096
+PREFIX_BLOCK = 256  # characters of a raw prompt per hashed prefix step
+SPILL_MARGIN = 2  # extra in-flight requests tolerated on the preferred backend
+# Only generation requests are routed by prefix or get cache_prompt and a slot added to their body.
+ROUTED_PATHS = {'/completion', '/v1/completions', '/v1/chat/completions'}
+
+
+def prefix_hashes(body):
+    """
+        Hashes of successively longer prefixes of a request's prompt: one per
+        chat message, or one per PREFIX_BLOCK characters of a raw prompt. The
+        last entry covers the whole prompt. Empty when there is no prompt.
+    """
+    if not isinstance(body, dict):
+        return []
+    if isinstance(body.get('messages'), list):
+        parts = [json.dumps(message, sort_keys=True) for message in body['messages']]
+    elif body.get('prompt'):
+        prompt = body['prompt'] if isinstance(body['prompt'], str) else json.dumps(body['prompt'])
+        parts = [prompt[i:i + PREFIX_BLOCK] for i in range(0, len(prompt), PREFIX_BLOCK)]
+    else:
+        return []
+    digest = hashlib.sha1()
+    hashes = []
+    for part in parts:
+        digest.update(part.encode('utf-8', 'replace'))
+        digest.update(b'\0')
+        hashes.append(digest.hexdigest())
+    return hashes
+
+
+class PrefixAffinity:
+    """
+        Routes requests that share a prompt prefix to the backend, and with
+        `slots`, the llamafile slot, that last evaluated it, so the server can
+        reuse its KV cache instead of re-reading the whole prompt.
+
+        The table maps prefix hashes to (backend address, slot) and keeps the
+        max_entries most recently used. A request goes to the owner of its
+        longest known prefix unless that backend has spill_margin more
+        requests in flight than the least loaded one, or its slot is busy.
+    """
+
+    def __init__(self, slots=None, max_entries=MAX_ENTRIES, spill_margin=SPILL_MARGIN):
+        self.slots = slots if slots and slots > 1 else None
+        self.max_entries = max_entries
+        self.spill_margin = spill_margin
+        self.table = OrderedDict()
+        self._busy = {}  # (address, slot) -> requests using it
+        self._next_slot = {}  # address -> slot handed out last
+        self.stats = {'hits': 0, 'misses': 0, 'spills': 0}
+
+    def lookup(self, hashes):
+        """(address, slot) owning the longest known prefix, or None."""
+        for digest in reversed(hashes):
+            owner = self.table.get(digest)
+            if owner is not None:
+                self.table.move_to_end(digest)
+                return owner
+        return None
+
+    def record(self, hashes, owner):
+        for digest in hashes:
+            self.table[digest] = owner
+            self.table.move_to_end(digest)
+        while len(self.table) > self.max_entries:
+            self.table.popitem(last=False)
+
+    def _free_slot(self, address):
+        """The next idle slot of a backend, round robin; the next one at all if every slot is busy."""
+        start = self._next_slot.get(address, -1) + 1
+        order = [(start + i) % self.slots for i in range(self.slots)]
+        slot = next((slot for slot in order if not self._busy.get((address, slot))), order[0])
+        self._next_slot[address] = slot
+        return slot
+
+    def route(self, request, candidates):
+        """Pick the backend for request from the healthy candidates and pin its slot."""
+        path = request.path.split('?', 1)[0]
+        hashes = prefix_hashes(request.json()) if path in ROUTED_PATHS else []
+        least = min(candidates, key=lambda backend: (backend.inflight, backend.served))
+        if not hashes:
+            return least
+
+        owner = self.lookup(hashes)
+        backend, slot = least, None
+        preferred = next((b for b in candidates if b.address == owner[0]), None) if owner else None
+        if preferred is None:
+            self.stats['misses'] += 1  # never seen, or its backend is gone
+        elif preferred.inflight - least.inflight >= self.spill_margin:
+            self.stats['spills'] += 1
+        elif self.slots is not None and self._busy.get(owner):
+            # Same server, another slot: the prefix may still be in its prompt cache.
+            self.stats['spills'] += 1
+            backend = preferred
+        else:
+            self.stats['hits'] += 1
+            backend, slot = preferred, owner[1]
+
+        # Ask the server to keep the evaluated prompt, unless the client said otherwise.
+        body = dict({'cache_prompt': True}, **request.json())
+        if self.slots is not None:
+            if slot is None:
+                slot = self._free_slot(backend.address)
+            self._busy[(backend.address, slot)] = self._busy.get((backend.address, slot), 0) + 1
+            request.slot = (backend.address, slot)
+            # llama.cpp reads id_slot, older llamafile builds slot_id; both ignore unknown fields.
+            body.update(id_slot=slot, slot_id=slot)
+        request.body = json.dumps(body).encode()
+        request._json = body
+        self.record(hashes, (backend.address, slot))
+        return backend
+
+    def done(self, request):
+        """Release the slot pinned for a finished request."""
+        slot = request.slot
+        if slot is not None:
+            request.slot = None
+            self._busy[slot] -= 1
+            if not self._busy[slot]:
+                del self._busy[slot]
+
+    def status(self):
+        return dict(self.stats, entries=len(self.table), slots=self.slots)
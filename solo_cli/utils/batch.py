@@ -0,0 +1,224 @@
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import requests
+from requests.adapters import HTTPAdapter
+
+ENDPOINTS = {'completion': '/completion', 'chat': '/v1/chat/completions'}
+CHECKPOINT_INTERVAL = 2.0  # seconds between checkpoint writes
+REQUEST_TIMEOUT = 600
+MAX_RETRIES = 3
+# Requests may finish out of order, but never more than this many lines past
+# the oldest unfinished one, which bounds the checkpoint's done set.
+WINDOW_PER_WORKER = 64
+
+
+class BatchError(Exception):
+    pass
+
+
+def checkpoint_path(output):
+    return f"{output}.checkpoint"
+
+
+def load_checkpoint(input_path, output):
+    """The checkpoint for this input/output pair, or None to start over."""
+    path = checkpoint_path(output)
+    if not os.path.exists(path) or not os.path.exists(output):
+        return None
+    with open(path, 'r') as file:
+        checkpoint = json.load(file)
+    stat = os.stat(input_path)
+    if checkpoint['input_size'] != stat.st_size or checkpoint['input_mtime'] != stat.st_mtime_ns:
+        raise BatchError(f"{input_path} changed since the last run; use --restart to start over")
+    return checkpoint
+
+
+def save_checkpoint(output, checkpoint):
+    path = checkpoint_path(output)
+    with open(f"{path}.tmp", 'w') as file:
+        json.dump(checkpoint, file)
+    os.replace(f"{path}.tmp", path)
+
+
+def read_records(file, start_index=0, offset=0):
+    """Yield (index, offset after the line, line) from a binary JSONL file, skipping blank lines."""
+    index = start_index
+    for line in file:
+        offset += len(line)
+        if line.strip():
+            yield index, offset, line
+            index += 1
+
+
+def build_request(line, endpoint, defaults):
+    """(id, path, body) for one input line: a JSON object or a bare prompt string."""
+    try:
+        record = json.loads(line)
+    except ValueError:
+        record = line.decode('utf-8', 'replace').rstrip('\r\n')
+    if not isinstance(record, dict):
+        record = {'prompt': record if isinstance(record, str) else line.decode('utf-8', 'replace').strip()}
+    body = dict(defaults, **{key: value for key, value in record.items() if key != 'id'})
+    kind = endpoint if endpoint != 'auto' else ('chat' if 'messages' in body else 'completion')
+    return record.get('id'), ENDPOINTS[kind], body
+
+
+def response_tokens(payload):
+    if not isinstance(payload, dict):
+        return 0
+    usage = payload.get('usage') or {}
+    return payload.get('tokens_predicted') or usage.get('completion_tokens') or 0
+
+
+class Tracker:
+    """
+        Completed line indexes as a watermark (every index below it is done)
+        plus the set of done indexes above it, with the input offset where
+        the watermark line starts so a resumed run can seek straight to it.
+    """
+
+    def __init__(self, watermark=0, done=(), offset=0):
+        self.watermark = watermark
+        self.done = set(done)
+        self.offset = offset
+        self._ends = {}  # index -> input offset after the line, for lines read so far
+
+    def seen(self, index, end):
+        self._ends[index] = end
+
+    def complete(self, index):
+        self.done.add(index)
+        while self.watermark in self.done:
+            self.done.remove(self.watermark)
+            self.offset = self._ends.pop(self.watermark, self.offset)
+            self.watermark += 1
+
+    def is_done(self, index):
+        return index < self.watermark or index in self.done
+
+
+def run_batch(input_path, output, host='127.0.0.1', port=8080, concurrency=8, endpoint='auto',
+              defaults=None, restart=False, progress=None):
+    """
+        Send every line of input_path to the server and append one JSON result
+        per line to output, as {"index", "id", "response"} or {"index", "id", "error"}.
+
+        Input is read lazily, at most `concurrency` requests are in flight on a
+        pooled keep-alive session, and results are written as they complete.
+        A checkpoint next to the output records what is done and is kept once
+        the run completes; rerunning the same command resumes after it, or
+        sends nothing at all. An existing output without a checkpoint is only
+        overwritten with restart. progress(bytes, result) is called after
+        each line. Returns a summary dict.
+    """
+    checkpoint = None if restart else load_checkpoint(input_path, output)
+    if checkpoint is None and not restart and os.path.exists(output) and os.path.getsize(output):
+        raise BatchError(f"{output} already has results but no checkpoint; use --restart to overwrite it")
+    if checkpoint is not None:
+        tracker = Tracker(checkpoint['watermark'], checkpoint['done'], checkpoint['input_offset'])
+        out = open(output, 'r+b')
+        out.truncate(checkpoint['output_bytes'])  # drop lines written after the checkpoint
+        out.seek(0, os.SEEK_END)
+    else:
+        tracker = Tracker()
+        out = open(output, 'wb')
+    stat = os.stat(input_path)
+
+    def save():
+        out.flush()
+        os.fsync(out.fileno())
+        save_checkpoint(output, {'input_size': stat.st_size, 'input_mtime': stat.st_mtime_ns,
+                                 'watermark': tracker.watermark, 'done': sorted(tracker.done),
+                                 'input_offset': tracker.offset, 'output_bytes': out.tell()})
+
+    session = requests.Session()
+    session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=concurrency))
+    session.headers['X-Priority'] = 'batch'  # queued behind interactive requests by a `serve` gateway
+    base = f"http://{host}:{port}"
+    defaults = defaults or {}
+
+    def send(line):
+        record_id, path, body = build_request(line, endpoint, defaults)
+        for attempt in range(MAX_RETRIES + 1):
+            try:
+                response = session.post(base + path, json=body, timeout=REQUEST_TIMEOUT)
+                if response.status_code < 500 and response.status_code != 429:
+                    break
+            except requests.RequestException as e:
+                if attempt == MAX_RETRIES:
+                    return record_id, None, str(e)
+            if attempt < MAX_RETRIES:
+                time.sleep(min(2 ** attempt, 30))
+        if response.status_code != 200:
+            return record_id, None, f"HTTP {response.status_code}: {response.text[:200]}"
+        try:
+            return record_id, response.json(), None
+        except ValueError:
+            return record_id, None, f"invalid JSON response: {response.text[:200]}"
+
+    summary = {'completed': 0, 'errors': 0, 'tokens': 0, 'skipped': tracker.watermark + len(tracker.done)}
+    started = time.monotonic()
+    last_saved = started
+    window = concurrency * WINDOW_PER_WORKER
+    inflight = {}
+
+    def finish(futures):
+        for future in futures:
+            index, size = inflight.pop(future)
+            record_id, payload, error = future.result()
+            result = {'index': index, 'id': record_id}
+            if error is None:
+                result['response'] = payload
+                summary['completed'] += 1
+                summary['tokens'] += response_tokens(payload)
+            else:
+                result['error'] = error
+                summary['errors'] += 1
+            out.write(json.dumps(result).encode() + b'\n')
+            tracker.complete(index)
+            if progress is not None:
+                progress(size, result)
+
+    # Shut down by hand: leaving a `with` block would wait for every running request, even on Ctrl+C.
+    executor = ThreadPoolExecutor(max_workers=concurrency)
+    try:
+        with open(input_path, 'rb') as file:
+            file.seek(tracker.offset)
+            if progress is not None:
+                progress(tracker.offset, None)
+            for index, end, line in read_records(file, tracker.watermark, tracker.offset):
+                tracker.seen(index, end)
+                if tracker.is_done(index):
+                    if progress is not None:
+                        progress(len(line), None)
+                    continue
+                while len(inflight) >= concurrency or (inflight and index >= tracker.watermark + window):
+                    done, _ = wait(inflight, return_when=FIRST_COMPLETED)
+                    finish(done)
+                inflight[executor.submit(send, line)] = (index, len(line))
+                if time.monotonic() - last_saved >= CHECKPOINT_INTERVAL:
+                    save()
+                    last_saved = time.monotonic()
+            while inflight:
+                done, _ = wait(inflight, return_when=FIRST_COMPLETED)
+                finish(done)
+        # Kept, so running the same command again finds nothing left to do.
+        save()
+        out.close()
+    except BaseException:
+        # Record what did finish so the next run resumes from there.
+        save()
+        out.close()
+        # Then drop the queued requests; ones already sent are abandoned, not waited for.
+        for future in list(inflight):
+            future.cancel()
+        raise
+    finally:
+        executor.shutdown(wait=False)
+        session.close()
+
+    summary['seconds'] = time.monotonic() - started
+    return summary
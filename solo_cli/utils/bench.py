@@ -0,0 +1,125 @@
+import asyncio
+import time
+
+from solo_cli.utils.http_client import request
+
+DEFAULT_PROMPT = "Write a short story about a robot learning to paint."
+ENDPOINTS = {'completion': '/completion', 'chat': '/v1/chat/completions'}
+REQUEST_TIMEOUT = 600
+
+
+def percentile(values, p):
+    """Linear-interpolated percentile of values (p in 0..100); None when empty."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * p / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def request_body(endpoint, prompt, max_tokens):
+    if endpoint == 'chat':
+        return {'messages': [{'role': 'user', 'content': prompt}], 'max_tokens': max_tokens,
+                'stream': True, 'temperature': 0}
+    return {'prompt': prompt, 'n_predict': max_tokens, 'stream': True, 'temperature': 0,
+            'cache_prompt': False}
+
+
+def event_text(endpoint, event):
+    if endpoint == 'chat':
+        choices = event.get('choices') or [{}]
+        return (choices[0].get('delta') or {}).get('content') or ''
+    return event.get('content') or ''
+
+
+async def timed_request(host, port, endpoint, prompt, max_tokens):
+    """
+        Send one streamed request and return a dict with ttft, the inter-token
+        gaps, end-to-end latency and token count (or an error).
+    """
+    started = time.monotonic()
+    result = {'ttft': None, 'itl': [], 'e2e': None, 'tokens': 0, 'error': None}
+    last = None
+    try:
+        response = await request(host, port, 'POST', ENDPOINTS[endpoint],
+                                 body=request_body(endpoint, prompt, max_tokens), timeout=REQUEST_TIMEOUT)
+        try:
+            if response.status != 200:
+                raise ConnectionError(f"HTTP {response.status}")
+            async for event in response.iter_events():
+                if not event_text(endpoint, event):
+                    continue
+                now = time.monotonic()
+                if last is None:
+                    result['ttft'] = now - started
+                else:
+                    result['itl'].append(now - last)
+                last = now
+                result['tokens'] += 1
+        finally:
+            response.close()
+    except (OSError, EOFError, asyncio.TimeoutError, ValueError) as e:  # EOFError: asyncio.IncompleteReadError
+        result['error'] = str(e) or type(e).__name__
+    result['e2e'] = time.monotonic() - started
+    return result
+
+
+async def run_level(host, port, concurrency, total, endpoint='completion', prompt=DEFAULT_PROMPT, max_tokens=64):
+    """Run `total` requests with at most `concurrency` in flight and summarise them."""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            return await timed_request(host, port, endpoint, prompt, max_tokens)
+
+    started = time.monotonic()
+    results = await asyncio.gather(*[one() for _ in range(total)])
+    return summarize(concurrency, results, time.monotonic() - started)
+
+
+def summarize(concurrency, results, wall):
+    ok = [result for result in results if result['error'] is None]
+    ttft = [result['ttft'] for result in ok if result['ttft'] is not None]
+    itl = [gap for result in ok for gap in result['itl']]
+    e2e = [result['e2e'] for result in ok]
+    tokens = sum(result['tokens'] for result in ok)
+    summary = {
+        'concurrency': concurrency,
+        'requests': len(results),
+        'errors': len(results) - len(ok),
+        'tokens': tokens,
+        'wall_s': wall,
+        'tokens_per_s': tokens / wall if wall > 0 else 0.0,
+        'requests_per_s': len(ok) / wall if wall > 0 else 0.0,
+    }
+    for name, values in (('ttft', ttft), ('itl', itl), ('e2e', e2e)):
+        for p in (50, 95, 99):
+            summary[f"{name}_p{p}_s"] = percentile(values, p)
+    return summary
+
+
+def run_bench(host, port, levels, total, endpoint='completion', prompt=DEFAULT_PROMPT, max_tokens=64):
+    async def main():
+        return [await run_level(host, port, concurrency, total, endpoint, prompt, max_tokens)
+                for concurrency in levels]
+    return asyncio.run(main())
+
+
+def format_table(summaries):
+    def ms(value):
+        return '-' if value is None else f"{value * 1000:.0f}"
+
+    header = ['conc', 'reqs', 'err', 'tok/s', 'req/s', 'ttft p50', 'ttft p99',
+              'itl p50', 'itl p99', 'e2e p50', 'e2e p95', 'e2e p99']
+    rows = [header]
+    for s in summaries:
+        rows.append([str(s['concurrency']), str(s['requests']), str(s['errors']),
+                     f"{s['tokens_per_s']:.1f}", f"{s['requests_per_s']:.2f}",
+                     ms(s['ttft_p50_s']), ms(s['ttft_p99_s']), ms(s['itl_p50_s']), ms(s['itl_p99_s']),
+                     ms(s['e2e_p50_s']), ms(s['e2e_p95_s']), ms(s['e2e_p99_s'])])
+    widths = [max(len(row[i]) for row in rows) for i in range(len(header))]
+    lines = ['  '.join(cell.rjust(width) for cell, width in zip(row, widths)) for row in rows]
+    lines.insert(1, '  '.join('-' * width for width in widths))
+    return '\n'.join(lines) + '\n(latencies in ms)'
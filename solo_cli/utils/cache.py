@@ -0,0 +1,276 @@
+import json
+import os
+import shutil
+import threading
+import time
+
+from solo_cli.config import load_config
+from solo_cli.utils.downloader import DownloadError
+from solo_cli.utils.model_store import object_path, ref_path, store_dir
+from solo_cli.utils.split import load_manifest, manifest_path, model_dir, split_dir
+
+SUFFIX = '.llamafile'
+_usage_lock = threading.Lock()  # concurrent fetches record their use from several threads
+
+
+def usage_path():
+    return os.path.join(store_dir(), 'usage.json')
+
+
+def load_usage():
+    """
+        {model name: {last_used, links, stats}} for the models the store has
+        seen used or linked; stats maps each link to the identity of the file
+        placed there (see _identity).
+    """
+    try:
+        with open(usage_path(), 'r') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_usage(usage):
+    path = usage_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(f"{path}.tmp", 'w') as file:
+        json.dump(usage, file)
+    os.replace(f"{path}.tmp", path)
+
+
+def _identity(path):
+    """[device, inode, size, mtime] of path, or None if it is not a regular file."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return [stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns] if os.path.isfile(path) else None
+
+
+def model_name(filename):
+    return filename[:-len(SUFFIX)] if filename.endswith(SUFFIX) else filename
+
+
+def record_use(name, link=None):
+    """Mark a model as used now, and remember a path it was linked to outside the store."""
+    with _usage_lock:
+        usage = load_usage()
+        entry = usage.setdefault(model_name(name), {'links': []})
+        entry['last_used'] = time.time()
+        if link is not None:
+            link = os.path.abspath(link)
+            if link not in entry['links']:
+                entry['links'].append(link)
+            # Remembered so eviction can tell this copy from a file that later replaced it.
+            entry.setdefault('stats', {})[link] = _identity(link)
+        _save_usage(usage)
+
+
+def cache_quota():
+    """Bytes the model store may use (`solo-cli cache --quota`), or None for no limit."""
+    return load_config().get('cache_quota')
+
+
+def _object_size(digest):
+    try:
+        return os.path.getsize(object_path(digest))
+    except OSError:
+        return 0
+
+
+def cached_models():
+    """
+        The models in the store, least recently used first, as dicts with the
+        store objects they own, their size, last use and the paths linking to them.
+    """
+    usage = load_usage()
+    models = {}
+
+    def model(name):
+        entry = usage.get(name, {})
+        return models.setdefault(name, {'name': name, 'refs': [], 'objects': set(), 'split': False,
+                                        'links': list(entry.get('links', [])),
+                                        'stats': dict(entry.get('stats', {})),
+                                        'last_used': entry.get('last_used')})
+
+    refs = os.path.dirname(ref_path('x'))
+    for entry in sorted(os.listdir(refs)) if os.path.isdir(refs) else []:
+        if not entry.endswith('.json'):
+            continue
+        try:
+            with open(os.path.join(refs, entry), 'r') as file:
+                digest = json.load(file)['sha256']
+        except (OSError, ValueError, KeyError):
+            continue
+        current = model(model_name(entry[:-len('.json')]))
+        current['refs'].append(entry[:-len('.json')])
+        current['objects'].add(digest)
+        if current['last_used'] is None:
+            current['last_used'] = os.path.getmtime(os.path.join(refs, entry))
+
+    for entry in sorted(os.listdir(split_dir())) if os.path.isdir(split_dir()) else []:
+        manifest = load_manifest(entry[:-len('.json')]) if entry.endswith('.json') else None
+        if manifest is None:
+            continue
+        current = model(entry[:-len('.json')])
+        current['split'] = True
+        current['objects'].update([manifest['runtime'], *manifest['weights'].values()])
+        if current['last_used'] is None:
+            current['last_used'] = os.path.getmtime(manifest_path(current['name']))
+
+    for current in models.values():
+        current['objects'] = {digest for digest in current['objects'] if os.path.exists(object_path(digest))}
+        current['size'] = sum(_object_size(digest) for digest in current['objects'])
+    return sorted(models.values(), key=lambda current: (current['last_used'] or 0, current['name']))
+
+
+def store_usage():
+    """Bytes held by objects in the store."""
+    directory = os.path.dirname(object_path('x'))
+    total = 0
+    for entry in os.listdir(directory) if os.path.isdir(directory) else []:
+        try:
+            total += os.path.getsize(os.path.join(directory, entry))
+        except OSError:
+            pass
+    return total
+
+
+def _process_args():
+    """(working directory, arguments) of every process that can be inspected."""
+    try:
+        import psutil
+    except ImportError:
+        psutil = None
+    if psutil is not None:
+        for process in psutil.process_iter():
+            try:
+                yield process.cwd(), process.cmdline()
+            except (psutil.Error, OSError):
+                continue
+        return
+    for pid in os.listdir('/proc') if os.path.isdir('/proc') else []:
+        if not pid.isdigit():
+            continue
+        try:
+            with open(f"/proc/{pid}/cmdline", 'rb') as file:
+                args = file.read().decode('utf-8', 'replace').split('\0')
+            yield os.readlink(f"/proc/{pid}/cwd"), [arg for arg in args if arg]
+        except OSError:
+            continue
+
+
+def running_models(models):
+    """
+        Names of the models whose files a running process was started with,
+        matched by inode so hardlinked copies anywhere on disk count, or by
+        the `<model>.llamafile` and launch script names.
+    """
+    owners = {}
+    for current in models:
+        for digest in current['objects']:
+            stat = os.stat(object_path(digest))
+            owners.setdefault((stat.st_dev, stat.st_ino), set()).add(current['name'])
+    names = {f"{current['name']}{SUFFIX}": current['name'] for current in models}
+    running = set()
+    for cwd, args in _process_args():
+        for arg in args:
+            base = os.path.basename(arg)
+            if base.endswith('.sh'):
+                base = base[:-len('.sh')]
+            if base in names:
+                running.add(names[base])
+            try:
+                stat = os.stat(os.path.join(cwd, arg))
+            except (OSError, ValueError):
+                continue
+            running.update(owners.get((stat.st_dev, stat.st_ino), ()))
+    return running
+
+
+def _same_file(path, source):
+    try:
+        return os.path.samefile(path, source)
+    except OSError:
+        return False
+
+
+def remove_model(current, others, dry_run=False):
+    """
+        Delete a model from the store: its refs, split links and manifest,
+        the copies it was linked to, and every object no other model uses.
+        Returns the bytes freed.
+    """
+    shared = set().union(*[other['objects'] for other in others])
+    owned = [object_path(digest) for digest in current['objects'] if digest not in shared]
+    if dry_run:
+        return sum(os.path.getsize(path) for path in owned)
+
+    config_dir = load_config().get('dir', './')
+    candidates = current['links'] + [os.path.join(config_dir, f"{current['name']}{SUFFIX}")]
+    for path in dict.fromkeys(candidates):
+        # A reflinked or copied link is only removed while it is still the very
+        # file that was put there; anything else must be the object itself.
+        placed = current['stats'].get(path)
+        if (placed is not None and _identity(path) == placed) or any(_same_file(path, source) for source in owned):
+            os.remove(path)
+    if current['split']:
+        shutil.rmtree(model_dir(current['name']), ignore_errors=True)
+        os.remove(manifest_path(current['name']))
+    for ref in current['refs']:
+        os.remove(ref_path(ref))
+    freed = 0
+    for path in owned:
+        stat = os.stat(path)
+        # A hardlink the store does not know about keeps the data on disk.
+        freed += stat.st_size if stat.st_nlink == 1 else 0
+        os.remove(path)
+
+    with _usage_lock:
+        usage = load_usage()
+        if usage.pop(current['name'], None) is not None:
+            _save_usage(usage)
+    return freed
+
+
+def evict(target, keep=(), dry_run=False):
+    """
+        Remove least recently used models until the store holds at most target
+        bytes. Models named in keep and models a process is running are never
+        removed. Returns [(model name, bytes freed)].
+    """
+    usage = store_usage()
+    if usage <= target:
+        return []
+    models = cached_models()
+    running = running_models(models)
+    evicted = []
+    for current in list(models):
+        if usage <= target:
+            break
+        if current['name'] in keep or current['name'] in running:
+            continue
+        models.remove(current)
+        freed = remove_model(current, models, dry_run)
+        usage -= freed
+        evicted.append((current['name'], freed))
+    return evicted
+
+
+def make_room(size, keep=()):
+    """
+        Evict least recently used models so that size more bytes fit in the
+        cache quota. Raises DownloadError if they cannot. Returns what evict() did.
+    """
+    quota = cache_quota()
+    if quota is None:
+        return []
+    from solo_cli.utils.sizes import format_size
+
+    evicted = evict(quota - size, keep)
+    for name, freed in evicted:
+        print(f"Evicted {name} ({format_size(freed)}) to stay within the {format_size(quota)} cache quota.")
+    if store_usage() + size > quota:
+        raise DownloadError(f"{format_size(size)} does not fit in the {format_size(quota)} cache quota, even after "
+                            f"evicting every model that is not running; raise it with `solo-cli cache --quota`")
+    return evicted
@@ -0,0 +1,176 @@
+import json
+import os
+import re
+import time
+from urllib.parse import quote, urlsplit
+
+from solo_cli.constants import CATALOG_MAX_AGE, CATALOG_URL, MODELS
+
+REQUEST_TIMEOUT = 10
+QUANT_PATTERN = re.compile(r'(?:^|[._-])((?:I?Q\d(?:_[A-Z0-9]+)*)|BF16|F16|F32)(?=$|[._-])', re.IGNORECASE)
+EMBEDDING_PATTERN = re.compile(r'embed|(?:^|[._-])(?:e5|bge|gte|minilm|nomic)(?:[._-]|$)', re.IGNORECASE)
+
+
+def catalog_path():
+    from solo_cli.utils.model_store import store_dir
+
+    return os.path.join(store_dir(), 'catalog.json')
+
+
+def parse_quant(name):
+    """Quantization tag in a model file name, e.g. `Q4_K_M` or `F16`, or None."""
+    match = QUANT_PATTERN.search(name)
+    return match.group(1).upper() if match else None
+
+
+def model_kind(name):
+    return 'embedding' if EMBEDDING_PATTERN.search(name) else 'chat'
+
+
+def make_entry(name, url, size=None, sha256=None, repo=None):
+    return {'id': name, 'repo': repo, 'url': url, 'size': size, 'sha256': sha256,
+            'quant': parse_quant(name), 'kind': model_kind(name)}
+
+
+def seed_entries():
+    """Catalog entries for the models built into constants.MODELS."""
+    entries = {}
+    for name, value in MODELS.items():
+        url, sha256 = (value['url'], value.get('sha256')) if isinstance(value, dict) else (value, None)
+        entries[name] = make_entry(name, url, sha256=sha256)
+    return entries
+
+
+def load_catalog():
+    """The catalog on disk, or one built from MODELS when there is none yet."""
+    try:
+        with open(catalog_path(), 'r') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {'models': seed_entries(), 'repos': {}, 'fetched_at': None}
+
+
+def save_catalog(catalog):
+    import tempfile
+
+    path = catalog_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.catalog-')
+    with os.fdopen(fd, 'w') as file:
+        json.dump(catalog, file)
+    os.replace(tmp, path)
+
+
+def repo_entries(detail, site):
+    """Entries for every .llamafile in one repository's API detail."""
+    repo = detail['id']
+    entries = {}
+    for sibling in detail.get('siblings', []):
+        filename = sibling.get('rfilename', '')
+        if not filename.endswith('.llamafile'):
+            continue
+        lfs = sibling.get('lfs') or {}
+        url = f"{site}/{repo}/resolve/main/{quote(filename)}?download=true"
+        name = os.path.basename(filename)[:-len('.llamafile')]
+        entries[name] = make_entry(name, url, sibling.get('size') or lfs.get('size'), lfs.get('sha256'), repo)
+    return entries
+
+
+def refresh(catalog=None, url=CATALOG_URL, session=None):
+    """
+        Bring the catalog up to date with one conditional request.
+
+        The listing is requested with the stored ETag / Last-Modified, so an
+        unchanged catalog costs a single 304. When it did change, only the
+        repositories whose revision moved are fetched again for file sizes and
+        digests. Returns the saved catalog; network errors propagate.
+    """
+    import requests
+
+    catalog = catalog if catalog is not None else load_catalog()
+    session = session or requests.Session()
+    parts = urlsplit(url)
+    site = f"{parts.scheme}://{parts.netloc}"
+
+    headers = {}
+    if catalog.get('etag'):
+        headers['If-None-Match'] = catalog['etag']
+    if catalog.get('last_modified'):
+        headers['If-Modified-Since'] = catalog['last_modified']
+    response = session.get(url, headers=headers, timeout=REQUEST_TIMEOUT)
+    if response.status_code == 304:
+        catalog['fetched_at'] = time.time()
+        save_catalog(catalog)
+        return catalog
+    response.raise_for_status()
+
+    old_repos = catalog.get('repos', {})
+    models = seed_entries()
+    repos = {}
+    for listing in response.json():
+        repo = listing.get('id') or listing.get('modelId')
+        revision = listing.get('sha') or listing.get('lastModified')
+        cached = old_repos.get(repo)
+        if cached and revision and cached['revision'] == revision:
+            entries = {name: catalog['models'][name] for name in cached['models'] if name in catalog['models']}
+        else:
+            detail = session.get(f"{site}/api/models/{repo}", params={'blobs': 'true'}, timeout=REQUEST_TIMEOUT)
+            detail.raise_for_status()
+            entries = repo_entries(detail.json(), site)
+        for name, entry in entries.items():
+            # Keep a pinned digest from MODELS when the hub does not publish one.
+            if not entry.get('sha256') and name in models:
+                entry['sha256'] = models[name]['sha256']
+            models[name] = entry
+        repos[repo] = {'revision': revision, 'models': sorted(entries)}
+
+    catalog = {'models': models, 'repos': repos, 'fetched_at': time.time(),
+               'etag': response.headers.get('ETag'), 'last_modified': response.headers.get('Last-Modified')}
+    save_catalog(catalog)
+    return catalog
+
+
+def get_catalog(max_age=CATALOG_MAX_AGE, offline=False, url=CATALOG_URL):
+    """
+        The catalog, refreshed first when it is older than max_age seconds.
+        Falls back to the copy on disk when the hub cannot be reached; the
+        error is then reported under the 'stale' key.
+    """
+    catalog = load_catalog()
+    fetched_at = catalog.get('fetched_at')
+    if offline or (fetched_at is not None and time.time() - fetched_at < max_age):
+        return catalog
+    try:
+        return refresh(catalog, url)
+    except Exception as e:
+        catalog['stale'] = str(e) or type(e).__name__
+        return catalog
+
+
+def search(catalog, query=None, max_size=None, quant=None, kind=None):
+    """
+        Catalog entries matching every given filter, sorted by name. `quant`
+        matches as a prefix, so `Q4` selects Q4_0 and Q4_K_M. Entries of
+        unknown size never satisfy `max_size`.
+    """
+    results = []
+    for entry in catalog['models'].values():
+        if query and query.lower() not in entry['id'].lower():
+            continue
+        if max_size is not None and (entry['size'] is None or entry['size'] > max_size):
+            continue
+        if quant and not (entry['quant'] or '').startswith(quant.upper()):
+            continue
+        if kind and entry['kind'] != kind:
+            continue
+        results.append(entry)
+    return sorted(results, key=lambda entry: entry['id'].lower())
+
+
+def lookup(name):
+    """The catalog entry for name from disk (never the network), or None."""
+    return load_catalog()['models'].get(name) or seed_entries().get(name)
+
+
+def known_model(name):
+    return name in MODELS or lookup(name) is not None
@@ -0,0 +1,152 @@
+import json
+import time
+
+import requests
+
+CHAT_PATH = '/v1/chat/completions'
+DEFAULT_CONTEXT = 4096  # used when the server does not report its context size
+MESSAGE_OVERHEAD = 4  # tokens the chat template adds around each message
+TRIM_TARGET = 0.75  # fraction of the budget history is trimmed down to once it overflows
+REQUEST_TIMEOUT = 600
+
+
+def estimate_tokens(text):
+    """Rough token count for when the server cannot tokenize: about four characters per token."""
+    return len(text) // 4 + 1
+
+
+def trim_history(messages, counts, budget, target=None):
+    """
+        Indexes of the messages to send so their token counts fit in budget.
+        Leading system messages and the last message are always kept; the
+        oldest turns go first. Once over budget, history is cut down to target
+        rather than to just under budget, so the kept prefix stays the same for
+        several turns and the server can reuse its cached prompt.
+    """
+    total = sum(counts)
+    if total <= budget:
+        return list(range(len(messages)))
+    target = budget if target is None else min(target, budget)
+    first = 0
+    while first < len(messages) and messages[first]['role'] == 'system':
+        first += 1
+    kept = list(range(len(messages)))
+    for index in range(first, len(messages) - 1):
+        if total <= target:
+            break
+        kept.remove(index)
+        total -= counts[index]
+    # Never start the conversation with an assistant reply.
+    while len(kept) > first + 1 and messages[kept[first]]['role'] == 'assistant':
+        total -= counts[kept.pop(first)]
+    return kept
+
+
+class ChatSession:
+    """
+        A conversation with a llamafile server over one keep-alive connection.
+
+        send() streams the reply as it is generated and records time to first
+        token and decode speed in `last`. History is trimmed to the server's
+        context minus the tokens reserved for the reply, using the server's
+        own tokenizer when it has one.
+    """
+
+    def __init__(self, host='127.0.0.1', port=8080, system=None, max_tokens=512, context=None, options=None):
+        self.base = f"http://{host}:{port}"
+        self.http = requests.Session()
+        self.max_tokens = max_tokens
+        self.options = options or {}
+        self.system = system
+        self.context = context or self.server_context()
+        self.messages = []
+        self.counts = []
+        self.sent = []  # indexes of the messages in the last request
+        self.last = None
+        self.reset()
+
+    def server_context(self):
+        """The server's context size in tokens, from /props when it has one."""
+        try:
+            props = self.http.get(self.base + '/props', timeout=5).json()
+            settings = props.get('default_generation_settings') or {}
+            return int(settings.get('n_ctx') or props.get('n_ctx') or DEFAULT_CONTEXT)
+        except (requests.RequestException, ValueError, TypeError, AttributeError):
+            return DEFAULT_CONTEXT
+
+    @property
+    def budget(self):
+        return max(self.context - self.max_tokens, MESSAGE_OVERHEAD)
+
+    def count_tokens(self, text):
+        try:
+            response = self.http.post(self.base + '/tokenize', json={'content': text}, timeout=30)
+            if response.status_code == 200:
+                return len(response.json()['tokens']) + MESSAGE_OVERHEAD
+        except (requests.RequestException, ValueError, KeyError):
+            pass
+        return estimate_tokens(text) + MESSAGE_OVERHEAD
+
+    def reset(self):
+        self.messages, self.counts = [], []
+        if self.system:
+            self.add('system', self.system)
+
+    def add(self, role, content):
+        self.messages.append({'role': role, 'content': content})
+        self.counts.append(self.count_tokens(content))
+
+    def context_tokens(self):
+        return sum(self.counts[i] for i in self.sent)
+
+    def send(self, text):
+        """
+            Add a user message and yield the reply's text as it streams in. The
+            reply joins the history when the stream ends, including when the
+            caller stops early.
+        """
+        self.add('user', text)
+        self.sent = trim_history(self.messages, self.counts, self.budget, int(self.budget * TRIM_TARGET))
+        body = dict(self.options, messages=[self.messages[i] for i in self.sent],
+                    max_tokens=self.max_tokens, stream=True, cache_prompt=True)
+        started = time.monotonic()
+        stats = {'ttft': None, 'tokens': 0, 'seconds': None, 'tokens_per_s': None}
+        first = None
+        pieces = []
+        try:
+            response = self.http.post(self.base + CHAT_PATH, json=body, stream=True, timeout=REQUEST_TIMEOUT)
+            if response.status_code != 200:
+                message = f"HTTP {response.status_code}: {response.text[:200]}"
+                response.close()
+                raise requests.HTTPError(message, response=response)
+        except requests.RequestException:
+            self.messages.pop()
+            self.counts.pop()
+            raise
+        try:
+            for line in response.iter_lines():
+                payload = line[5:].strip() if line.startswith(b'data:') else b''
+                # Read on past [DONE] to the end of the body so the connection can be reused.
+                if not payload or payload == b'[DONE]':
+                    continue
+                event = json.loads(payload)
+                choices = event.get('choices') or [{}]
+                piece = (choices[0].get('delta') or {}).get('content')
+                if not piece:
+                    continue
+                now = time.monotonic()
+                if first is None:
+                    first = now
+                    stats['ttft'] = now - started
+                stats['tokens'] += 1
+                pieces.append(piece)
+                yield piece
+        finally:
+            response.close()
+            end = time.monotonic()
+            stats['seconds'] = end - started
+            if stats['tokens'] > 1 and end > first:
+                # The first token's wait is prompt processing, not decoding.
+                stats['tokens_per_s'] = (stats['tokens'] - 1) / (end - first)
+            self.add('assistant', ''.join(pieces))
+            self.last = stats
@@ -1,3 +1,4 @@
+import hashlib
 import os
 import platform
 import subprocess
@@ -50,7 +51,7 @@ def clone_repo():
 
     if not os.path.exists(repo_dir):
         print(f"Cloning repository from {repo_url}...")
-        subprocess.run(['git', 'clone', repo_url])
+        subprocess.run(['git', 'clone', repo_url], check=True)
     else:
         print(f"Repository {repo_dir} already exists.")
 
@@ -60,7 +61,40 @@ def run_npm_install(repo_dir="solo-chat-ui"):
         Run npm install in the specified directory.
     """
     print(f"Running npm install in {repo_dir}...")
-    subprocess.run(['npm', 'install'], cwd=repo_dir)
+    subprocess.run(['npm', 'install'], cwd=repo_dir, check=True)
+
+
+# Fingerprints of the setup steps' results, used by initapp to skip steps
+# that are already done. Each returns None when the result is missing.
+
+def node_fingerprint():
+    result = subprocess.run(['node', '--version'], capture_output=True, text=True)
+    return result.stdout.strip() if result.returncode == 0 else None
+
+
+def repo_fingerprint(repo_dir="solo-chat-ui"):
+    if not os.path.isdir(os.path.join(repo_dir, '.git')):
+        return None
+    result = subprocess.run(['git', '-C', repo_dir, 'rev-parse', 'HEAD'], capture_output=True, text=True)
+    return result.stdout.strip() if result.returncode == 0 else None
+
+
+def npm_fingerprint(repo_dir="solo-chat-ui"):
+    """Digest of the lockfile, valid only while node_modules exists."""
+    if not os.path.isdir(os.path.join(repo_dir, 'node_modules')):
+        return None
+    for name in ('package-lock.json', 'package.json'):
+        path = os.path.join(repo_dir, name)
+        if os.path.exists(path):
+            with open(path, 'rb') as file:
+                return f"{name}:{hashlib.sha256(file.read()).hexdigest()}"
+    return None
+
+
+def mongodb_fingerprint():
+    result = subprocess.run(['docker', 'inspect', '--format', '{{.State.Running}}', 'mongo-chatui'],
+                            capture_output=True, text=True)
+    return 'running' if result.stdout.strip() == 'true' else None
 
 
 def run_solo_chat_ui(repo_dir="solo-chat-ui"):
@@ -118,9 +152,10 @@ def run_docker_mongodb(repo_dir="solo-chat-ui"):
         # If the container doesn't exist, create and run it
         print("MongoDB Docker container not found. Creating and starting it...")
         try:
-            subprocess.run(['docker', 'run', '-d', '-p', '27017:27017', '--name', 'mongo-chatui', 'mongo:latest'], cwd=repo_dir, check=True)
+            subprocess.run(['docker', 'run', '-d', '-p', '27017:27017', '--name', 'mongo-chatui', 'mongo:latest'], check=True)
         except subprocess.CalledProcessError as e:
             print(f"Failed to run MongoDB Docker container: {e}")
+            raise
 
 
 def prompt_huggingface_token():
@@ -0,0 +1,257 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+
+import requests
+from tqdm import tqdm
+
+from solo_cli.config import config_batch
+from solo_cli.constants import DEFAULT_CONNECTIONS
+from solo_cli.utils.profiling import span
+
+MIN_SEGMENT_SIZE = 16 * 1024 * 1024  # 16 MiB
+CHUNK_SIZE = 1024 * 1024  # 1 MiB
+WINDOW_SIZE = 64 * 1024 * 1024  # bytes per request when sharing a scheduler
+CHECKPOINT_INTERVAL = 2.0  # seconds between checkpoint writes
+MAX_RETRIES = 5
+REQUEST_TIMEOUT = 30
+
+
+class DownloadError(RuntimeError):
+    pass
+
+
+def part_path(filename):
+    return f"{filename}.part"
+
+
+def checkpoint_path(filename):
+    return f"{filename}.part.json"
+
+
+def probe(url, session):
+    """
+        Return (size, accepts_ranges, validator) for the resource behind url.
+    """
+    response = session.get(url, headers={'Range': 'bytes=0-0'}, stream=True,
+                           allow_redirects=True, timeout=REQUEST_TIMEOUT)
+    try:
+        response.raise_for_status()
+        validator = response.headers.get('ETag') or response.headers.get('Last-Modified')
+        if response.status_code == 206:
+            content_range = response.headers.get('Content-Range', '')
+            total = content_range.rsplit('/', 1)[-1]
+            if total.isdigit():
+                return int(total), True, validator
+        size = int(response.headers.get('content-length', 0))
+        return size, False, validator
+    finally:
+        response.close()
+
+
+def plan_segments(size, connections):
+    """
+        Split [0, size) into at most `connections` contiguous segments.
+        Each segment is [start, end, position] with an inclusive end.
+    """
+    if size <= 0:
+        return []
+    count = max(1, min(connections, size // MIN_SEGMENT_SIZE or 1))
+    step = -(-size // count)
+    segments = []
+    for start in range(0, size, step):
+        end = min(start + step, size) - 1
+        segments.append([start, end, start])
+    return segments
+
+
+def load_checkpoint(filename, url, size, validator):
+    """Load a checkpoint if it matches the remote resource and the partial file."""
+    path = checkpoint_path(filename)
+    if not os.path.exists(path) or not os.path.exists(part_path(filename)):
+        return None
+    try:
+        with open(path, 'r') as file:
+            checkpoint = json.load(file)
+    except (OSError, ValueError):
+        return None
+    # Without validators two sources of the same size would look alike, so the url must match too.
+    if checkpoint.get('url') != url or checkpoint.get('size') != size or checkpoint.get('validator') != validator:
+        return None
+    if os.path.getsize(part_path(filename)) != size:
+        return None
+    return checkpoint
+
+
+def save_checkpoint(filename, checkpoint):
+    """Atomically write the checkpoint next to the partial file."""
+    path = checkpoint_path(filename)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as file:
+        json.dump(checkpoint, file)
+    os.replace(tmp_path, path)
+
+
+def preallocate(path, size):
+    with open(path, 'wb') as file:
+        if hasattr(os, 'posix_fallocate'):
+            try:
+                os.posix_fallocate(file.fileno(), 0, size)
+                return
+            except OSError:
+                pass
+        file.truncate(size)
+
+
+class _SegmentedDownload:
+    def __init__(self, url, filename, session, checkpoint, progress, hasher=None,
+                 scheduler=None, priority=0):
+        self.url = url
+        self.filename = filename
+        self.session = session
+        self.checkpoint = checkpoint
+        self.progress = progress
+        self.hasher = hasher
+        self.scheduler = scheduler
+        self.priority = priority
+        self.lock = threading.Lock()
+        self.last_saved = time.monotonic()
+
+    def _advance(self, segment, written):
+        with self.lock:
+            segment[2] += written
+            self.progress.update(written)
+            if time.monotonic() - self.last_saved >= CHECKPOINT_INTERVAL:
+                save_checkpoint(self.filename, self.checkpoint)
+                self.last_saved = time.monotonic()
+
+    def fetch(self, segment):
+        start, end, _ = segment
+        attempt = 0
+        while segment[2] <= end:
+            position = segment[2]
+            # With a shared scheduler, connections are handed back after every
+            # window so that higher priority downloads can take them over.
+            stop = end if self.scheduler is None else min(end, position + WINDOW_SIZE - 1)
+            headers = {'Range': f"bytes={position}-{stop}"}
+            slot = nullcontext() if self.scheduler is None else self.scheduler.connection(self.priority)
+            try:
+                with span('range', 'download', bytes=f"{position}-{stop}"), slot, self.session.get(self.url, headers=headers, stream=True,
+                                            timeout=REQUEST_TIMEOUT) as response:
+                    if response.status_code != 206:
+                        raise DownloadError(f"Server ignored range request (HTTP {response.status_code})")
+                    with open(part_path(self.filename), 'r+b', buffering=0) as file:
+                        file.seek(position)
+                        for data in response.iter_content(CHUNK_SIZE):
+                            data = data[:stop + 1 - segment[2]]
+                            if not data:
+                                break
+                            if self.scheduler is not None:
+                                self.scheduler.throttle(len(data))
+                            file.write(data)
+                            if self.hasher is not None:
+                                self.hasher.update_at(segment[2], data)
+                            self._advance(segment, len(data))
+                if segment[2] <= stop and segment[2] == position:
+                    raise DownloadError(f"Segment {start}-{end} stalled at byte {position}")
+                attempt = 0
+            except (requests.RequestException, OSError, DownloadError) as e:
+                attempt += 1
+                if attempt > MAX_RETRIES:
+                    raise DownloadError(f"Segment {start}-{end} failed: {e}") from e
+                time.sleep(min(2 ** attempt, 30))
+
+    def run(self, connections):
+        pending = [segment for segment in self.checkpoint['segments'] if segment[2] <= segment[1]]
+        try:
+            with ThreadPoolExecutor(max_workers=max(1, min(connections, len(pending)))) as executor:
+                for future in [executor.submit(self.fetch, segment) for segment in pending]:
+                    future.result()
+        finally:
+            with self.lock:
+                save_checkpoint(self.filename, self.checkpoint)
+
+
+def record_download(name, transferred, elapsed):
+    """Keep the last transfer of each file in the config for `/metrics`."""
+    with config_batch() as config:
+        config.setdefault('downloads', {})[name] = {'bytes': transferred, 'seconds': round(elapsed, 3),
+                                                    'timestamp': time.time()}
+
+
+def default_progress(total, initial=0):
+    return tqdm(total=total, initial=initial, unit='iB', unit_scale=True)
+
+
+def _download_stream(url, filename, session, hasher=None, scheduler=None, priority=0,
+                     progress=default_progress):
+    """Single-stream fallback for servers without range support."""
+    slot = nullcontext() if scheduler is None else scheduler.connection(priority)
+    with slot, session.get(url, stream=True, timeout=REQUEST_TIMEOUT) as response:
+        response.raise_for_status()
+        total_size = int(response.headers.get('content-length', 0))
+        with progress(total_size) as t:
+            with open(part_path(filename), 'wb') as file:
+                for data in response.iter_content(CHUNK_SIZE):
+                    if scheduler is not None:
+                        scheduler.throttle(len(data))
+                    file.write(data)
+                    if hasher is not None:
+                        hasher.update_at(t.n, data)
+                    t.update(len(data))
+            received = t.n
+    if total_size != 0 and received != total_size:
+        raise DownloadError(f"Expected {total_size} bytes but received {received}")
+    return received
+
+
+def download(url, filename, connections=DEFAULT_CONNECTIONS, session=None, hasher=None,
+             scheduler=None, priority=0, progress=default_progress):
+    """
+        Download url to filename using parallel HTTP range requests.
+
+        Data is written into a preallocated `<filename>.part` file and progress is
+        recorded in `<filename>.part.json`, so an interrupted download resumes from
+        where it stopped. The final file only appears once every byte has arrived.
+        If a hasher is given it is fed every written block as (offset, data).
+        A shared scheduler caps connections and bandwidth across downloads;
+        requests with a lower priority value are served first.
+        Returns the number of bytes transferred by this call.
+    """
+    session = session or requests.Session()
+    started = time.monotonic()
+
+    size, accepts_ranges, validator = probe(url, session)
+    if not accepts_ranges or size == 0:
+        transferred = _download_stream(url, filename, session, hasher, scheduler, priority, progress)
+    else:
+        checkpoint = load_checkpoint(filename, url, size, validator)
+        if checkpoint is None:
+            preallocate(part_path(filename), size)
+            checkpoint = {'url': url, 'size': size, 'validator': validator,
+                          'segments': plan_segments(size, connections)}
+            save_checkpoint(filename, checkpoint)
+        done = sum(segment[2] - segment[0] for segment in checkpoint['segments'])
+        if hasher is not None:
+            for start, _, position in checkpoint['segments']:
+                hasher.mark_written(start, position)
+        if done:
+            tqdm.write(f"Resuming {os.path.basename(filename)} at {done / size:.1%}")
+
+        with progress(size, done) as bar:
+            _SegmentedDownload(url, filename, session, checkpoint, bar, hasher,
+                               scheduler, priority).run(connections)
+        transferred = size - done
+
+    os.replace(part_path(filename), filename)
+    if os.path.exists(checkpoint_path(filename)):
+        os.remove(checkpoint_path(filename))
+
+    elapsed = max(time.monotonic() - started, 1e-6)
+    tqdm.write(f"Transferred {transferred / 1e6:.1f} MB of {os.path.basename(filename)} in {elapsed:.1f}s "
+               f"({transferred / 1e6 / elapsed:.1f} MB/s)")
+    record_download(os.path.basename(filename), transferred, elapsed)
+    return transferred
@@ -0,0 +1,217 @@
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import time
+from array import array
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import requests
+from requests.adapters import HTTPAdapter
+
+NPY_HEADER_SIZE = 128  # reserved up front; the shape is filled in once all rows are known
+REQUEST_TIMEOUT = 300
+MAX_RETRIES = 3
+
+
+class EmbedError(Exception):
+    pass
+
+
+def npy_header(rows, dim):
+    """A version 1.0 .npy header for a C-ordered little-endian float32 matrix."""
+    header = f"{{'descr': '<f4', 'fortran_order': False, 'shape': ({rows}, {dim}), }}"
+    header = header.ljust(NPY_HEADER_SIZE - 10 - 1) + '\n'
+    return b'\x93NUMPY\x01\x00' + len(header).to_bytes(2, 'little') + header.encode('latin-1')
+
+
+def read_texts(file):
+    """Texts from a binary stream: one per non-empty line, as raw text, a JSON string or {"text": ...}."""
+    for line in file:
+        line = line.strip()
+        if not line:
+            continue
+        text = line.decode('utf-8', 'replace')
+        if line[:1] in (b'"', b'{'):
+            try:
+                value = json.loads(line)
+            except ValueError:
+                value = None
+            if isinstance(value, str):
+                text = value
+            elif isinstance(value, dict) and isinstance(value.get('text'), str):
+                text = value['text']
+        yield text
+
+
+class VectorCache:
+    """sqlite table of float32 vectors keyed by sha256(model, text)."""
+
+    def __init__(self, path, model):
+        self.model = model
+        self.db = sqlite3.connect(path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("CREATE TABLE IF NOT EXISTS vectors (key TEXT PRIMARY KEY, vector BLOB)")
+
+    def key(self, text):
+        return hashlib.sha256(f"{self.model}\0{text}".encode()).hexdigest()
+
+    def get(self, key):
+        row = self.db.execute("SELECT vector FROM vectors WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def put_many(self, items):
+        self.db.executemany("INSERT OR REPLACE INTO vectors (key, vector) VALUES (?, ?)", items)
+        self.db.commit()
+
+    def close(self):
+        self.db.close()
+
+
+def pack(vector):
+    """float32 little-endian bytes of a vector."""
+    values = array('f', vector)
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values.tobytes()
+
+
+class NpyWriter:
+    """
+        Writes rows of a float32 .npy file in any order with positional writes.
+        Rows go to a temporary file next to path, which only replaces path once
+        it is complete, so a failed run never leaves a valid-looking matrix.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.fd = os.open(f"{path}.tmp", os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+        self.dim = None
+        self.rows = 0
+
+    def _pwrite(self, data, offset):
+        if hasattr(os, 'pwrite'):
+            os.pwrite(self.fd, data, offset)
+        else:
+            os.lseek(self.fd, offset, os.SEEK_SET)
+            os.write(self.fd, data)
+
+    def write_row(self, row, data):
+        dim = len(data) // 4
+        if self.dim is None:
+            self.dim = dim
+        elif dim != self.dim:
+            raise EmbedError(f"Embedding size changed from {self.dim} to {dim} at row {row}")
+        self._pwrite(data, NPY_HEADER_SIZE + row * dim * 4)
+        self.rows = max(self.rows, row + 1)
+
+    def close(self, complete=True):
+        """Finish the file at path, or with complete=False discard what was written."""
+        if complete:
+            self._pwrite(npy_header(self.rows, self.dim or 0), 0)
+        os.close(self.fd)
+        if complete:
+            os.replace(f"{self.path}.tmp", self.path)
+        else:
+            os.remove(f"{self.path}.tmp")
+
+
+def embed_file(source, output, host='127.0.0.1', port=8080, model=None, batch_size=32, connections=4,
+               cache_path=None, progress=None):
+    """
+        Embed every text in the binary stream `source` into the float32 .npy
+        file `output`, one row per text in input order.
+
+        Texts are sent to /v1/embeddings in micro-batches of `batch_size`, with
+        up to `connections` batches in flight. With a cache, texts already
+        embedded by the same model are copied from it instead of recomputed.
+        Only the batches in flight are held in memory. progress(rows) is
+        called as rows are written. Returns a summary dict.
+    """
+    cache = VectorCache(cache_path, model or '') if cache_path else None
+    writer = NpyWriter(output)
+    session = requests.Session()
+    session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=connections))
+    session.headers['X-Priority'] = 'batch'  # queued behind interactive requests by a `serve` gateway
+    url = f"http://{host}:{port}/v1/embeddings"
+    summary = {'rows': 0, 'cached': 0, 'computed': 0}
+
+    def send(texts):
+        body = {'input': texts}
+        if model:
+            body['model'] = model
+        for attempt in range(MAX_RETRIES + 1):
+            try:
+                response = session.post(url, json=body, timeout=REQUEST_TIMEOUT)
+                if response.status_code == 200:
+                    data = sorted(response.json()['data'], key=lambda item: item['index'])
+                    return [pack(item['embedding']) for item in data]
+                if response.status_code < 500 and response.status_code != 429:
+                    raise EmbedError(f"HTTP {response.status_code} from {url}: {response.text[:200]}")
+            except requests.RequestException as e:
+                if attempt == MAX_RETRIES:
+                    raise EmbedError(f"Embedding request failed: {e}") from e
+            time.sleep(min(2 ** attempt, 30))
+        raise EmbedError(f"HTTP {response.status_code} from {url} after {MAX_RETRIES} retries")
+
+    inflight = {}  # future -> [(key, [rows]) for each unique text]
+
+    def finish(futures):
+        for future in futures:
+            entries = inflight.pop(future)
+            vectors = future.result()
+            if len(vectors) != len(entries):
+                raise EmbedError(f"Asked for {len(entries)} embeddings, got {len(vectors)}")
+            for (_, rows), data in zip(entries, vectors):
+                for row in rows:
+                    writer.write_row(row, data)
+            if cache is not None:
+                cache.put_many([(key, data) for (key, _), data in zip(entries, vectors)])
+            written = sum(len(rows) for _, rows in entries)
+            summary['computed'] += written
+            if progress is not None:
+                progress(written)
+
+    batch = {}  # key -> (text, [rows]); identical texts share one request slot
+    started = time.monotonic()
+    complete = False
+    try:
+        with ThreadPoolExecutor(max_workers=connections) as executor:
+            def submit():
+                while len(inflight) >= connections:
+                    done, _ = wait(inflight, return_when=FIRST_COMPLETED)
+                    finish(done)
+                entries = list(batch.items())
+                future = executor.submit(send, [text for _, (text, _) in entries])
+                inflight[future] = [(key, rows) for key, (_, rows) in entries]
+                batch.clear()
+
+            for row, text in enumerate(read_texts(source)):
+                summary['rows'] += 1
+                key = cache.key(text) if cache is not None else hashlib.sha256(text.encode()).hexdigest()
+                vector = cache.get(key) if cache is not None else None
+                if vector is not None:
+                    writer.write_row(row, vector)
+                    summary['cached'] += 1
+                    if progress is not None:
+                        progress(1)
+                    continue
+                batch.setdefault(key, (text, []))[1].append(row)
+                if len(batch) >= batch_size:
+                    submit()
+            if batch:
+                submit()
+            while inflight:
+                done, _ = wait(inflight, return_when=FIRST_COMPLETED)
+                finish(done)
+        complete = True
+    finally:
+        writer.close(complete)
+        session.close()
+        if cache is not None:
+            cache.close()
+    summary['dim'] = writer.dim
+    summary['seconds'] = time.monotonic() - started
+    return summary
@@ -0,0 +1,190 @@
+import json
+import os
+import struct
+import zipfile
+from collections import namedtuple
+from contextlib import contextmanager
+
+GGUF_MAGIC = b'GGUF'
+# Arrays longer than this (token lists, scores) are skipped and only counted.
+MAX_KEPT_ARRAY = 64
+
+# GGUF metadata value types -> struct format; 8 is a string and 9 an array.
+SCALAR_FORMATS = {0: 'B', 1: 'b', 2: 'H', 3: 'h', 4: 'I', 5: 'i', 6: 'f', 7: '?', 10: 'Q', 11: 'q', 12: 'd'}
+STRING, ARRAY = 8, 9
+
+# llama_ftype values stored as general.file_type.
+FILE_TYPES = {
+    0: 'F32', 1: 'F16', 2: 'Q4_0', 3: 'Q4_1', 7: 'Q8_0', 8: 'Q5_0', 9: 'Q5_1', 10: 'Q2_K',
+    11: 'Q3_K_S', 12: 'Q3_K_M', 13: 'Q3_K_L', 14: 'Q4_K_S', 15: 'Q4_K_M', 16: 'Q5_K_S',
+    17: 'Q5_K_M', 18: 'Q6_K', 19: 'IQ2_XXS', 20: 'IQ2_XS', 21: 'Q2_K_S', 22: 'IQ3_XS',
+    23: 'IQ3_XXS', 24: 'IQ1_S', 25: 'IQ4_NL', 26: 'IQ3_S', 27: 'IQ3_M', 28: 'IQ2_S',
+    29: 'IQ2_M', 30: 'IQ4_XS', 31: 'IQ1_M', 32: 'BF16',
+}
+
+SkippedArray = namedtuple('SkippedArray', 'count')
+
+
+class GGUFReader:
+    """Sequential little-endian reads of GGUF header fields from a binary stream."""
+
+    def __init__(self, stream, version=3):
+        self.stream = stream
+        self.version = version
+
+    def read(self, size):
+        data = self.stream.read(size)
+        if len(data) != size:
+            raise ValueError("GGUF header is truncated")
+        return data
+
+    def skip(self, size):
+        while size:
+            size -= len(self.read(min(size, 1 << 20)))
+
+    def unpack(self, fmt):
+        return struct.unpack(f"<{fmt}", self.read(struct.calcsize(fmt)))[0]
+
+    def count(self):
+        # Version 1 used 32-bit counts and lengths.
+        return self.unpack('I' if self.version == 1 else 'Q')
+
+    def string(self):
+        return self.read(self.count()).decode('utf-8', 'replace')
+
+    def value(self, value_type):
+        if value_type in SCALAR_FORMATS:
+            return self.unpack(SCALAR_FORMATS[value_type])
+        if value_type == STRING:
+            return self.string()
+        if value_type != ARRAY:
+            raise ValueError(f"Unknown GGUF value type {value_type}")
+        item_type, length = self.unpack('I'), self.count()
+        if length <= MAX_KEPT_ARRAY:
+            return [self.value(item_type) for _ in range(length)]
+        if item_type in SCALAR_FORMATS:
+            self.skip(length * struct.calcsize(SCALAR_FORMATS[item_type]))
+        else:
+            for _ in range(length):
+                self.value(item_type)
+        return SkippedArray(length)
+
+
+def read_header(stream):
+    """
+        Parse the metadata and tensor table at the start of a GGUF stream,
+        without touching the tensor data. Returns (metadata, parameter count).
+    """
+    if stream.read(4) != GGUF_MAGIC:
+        raise ValueError("not a GGUF file")
+    reader = GGUFReader(stream)
+    reader.version = reader.unpack('I')
+    tensors, entries = reader.count(), reader.count()
+    metadata = {}
+    for _ in range(entries):
+        key = reader.string()
+        metadata[key] = reader.value(reader.unpack('I'))
+    parameters = 0
+    for _ in range(tensors):
+        reader.string()
+        elements = 1
+        for _ in range(reader.unpack('I')):
+            elements *= reader.count()
+        reader.skip(12)  # ggml type and data offset
+        parameters += elements
+    return metadata, parameters
+
+
+@contextmanager
+def open_gguf(path):
+    """
+        A stream positioned at the GGUF data in path and its size: the file
+        itself, or for a llamafile its main (largest) .gguf zip member.
+    """
+    with open(path, 'rb') as file:
+        if file.read(4) == GGUF_MAGIC:
+            file.seek(0)
+            yield file, os.path.getsize(path)
+            return
+    try:
+        archive = zipfile.ZipFile(path)
+    except zipfile.BadZipFile:
+        raise ValueError(f"{path} is neither a GGUF file nor a llamafile")
+    with archive:
+        members = [info for info in archive.infolist() if info.filename.endswith('.gguf')]
+        if not members:
+            raise ValueError(f"{path} has no GGUF weights inside")
+        member = max(members, key=lambda info: info.file_size)
+        with archive.open(member) as stream:
+            yield stream, member.file_size
+
+
+def _largest(value, default=None):
+    """Per-layer values are stored as arrays; plan for the largest layer."""
+    if isinstance(value, list):
+        return max(value) if value else default
+    return default if value is None or isinstance(value, SkippedArray) else value
+
+
+def read_info(path):
+    """
+        The figures the memory planner needs from a model's GGUF header:
+        architecture, parameters, quant, layers, context length, attention
+        shape, vocabulary size and the size of the weights.
+    """
+    with open_gguf(path) as (stream, size):
+        metadata, parameters = read_header(stream)
+    arch = metadata.get('general.architecture', 'llama')
+
+    def field(key, default=None):
+        return _largest(metadata.get(f"{arch}.{key}"), default)
+
+    embedding = field('embedding_length', 0)
+    heads = field('attention.head_count', 0)
+    heads_kv = field('attention.head_count_kv', heads)
+    head_dim = embedding // heads if heads else 0
+    tokens = metadata.get('tokenizer.ggml.tokens')
+    return {
+        'name': metadata.get('general.name'),
+        'architecture': arch,
+        'parameters': parameters,
+        'quant': FILE_TYPES.get(metadata.get('general.file_type')),
+        'layers': field('block_count', 0),
+        'context_length': field('context_length', 0),
+        'embedding_length': embedding,
+        'head_count': heads,
+        'head_count_kv': heads_kv,
+        'key_length': field('attention.key_length', head_dim),
+        'value_length': field('attention.value_length', head_dim),
+        'vocab_size': tokens.count if isinstance(tokens, SkippedArray) else len(tokens or []),
+        'weights_bytes': size,
+    }
+
+
+def info_cache_path():
+    from solo_cli.utils.model_store import store_dir
+
+    return os.path.join(store_dir(), 'gguf-info.json')
+
+
+def model_info(path):
+    """read_info(path), cached in the store until the file's size or mtime changes."""
+    stat = os.stat(path)
+    key = os.path.realpath(path)
+    cache_path = info_cache_path()
+    try:
+        with open(cache_path, 'r') as file:
+            cache = json.load(file)
+    except (OSError, ValueError):
+        cache = {}
+    entry = cache.get(key)
+    if entry and entry['size'] == stat.st_size and entry['mtime'] == stat.st_mtime_ns:
+        return entry['info']
+
+    info = read_info(path)
+    cache[key] = {'size': stat.st_size, 'mtime': stat.st_mtime_ns, 'info': info}
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    with open(f"{cache_path}.tmp", 'w') as file:
+        json.dump(cache, file)
+    os.replace(f"{cache_path}.tmp", cache_path)
+    return info
@@ -0,0 +1,113 @@
+import asyncio
+import json
+
+
+class Response:
+    """A streamed HTTP/1.1 response read from an asyncio connection."""
+
+    def __init__(self, status, reason, headers, reader, writer):
+        self.status = status
+        self.reason = reason
+        self.headers = headers
+        self._reader = reader
+        self._writer = writer
+
+    async def iter_chunks(self):
+        """
+            Yield the body as it arrives, undoing chunked transfer encoding.
+            Raises ConnectionError if the server closes before the body is complete.
+        """
+        if self.headers.get('transfer-encoding', '').lower() == 'chunked':
+            while True:
+                size_line = await self._reader.readline()
+                if not size_line.endswith(b'\n'):
+                    raise ConnectionError("Server closed the connection mid-response")
+                size = int(size_line.split(b';', 1)[0].strip() or b'0', 16)
+                if size == 0:
+                    await self._reader.readline()
+                    return
+                try:
+                    data = await self._reader.readexactly(size)
+                except asyncio.IncompleteReadError:
+                    raise ConnectionError("Server closed the connection mid-response")
+                await self._reader.readline()
+                yield data
+        elif 'content-length' in self.headers:
+            remaining = int(self.headers['content-length'])
+            while remaining:
+                data = await self._reader.read(min(remaining, 65536))
+                if not data:
+                    raise ConnectionError(f"Server closed the connection with {remaining} bytes of the body missing")
+                remaining -= len(data)
+                yield data
+        else:
+            while True:
+                data = await self._reader.read(65536)
+                if not data:
+                    return
+                yield data
+
+    async def iter_lines(self):
+        buffer = b''
+        async for data in self.iter_chunks():
+            buffer += data
+            *lines, buffer = buffer.split(b'\n')
+            for line in lines:
+                yield line.rstrip(b'\r')
+        if buffer:
+            yield buffer
+
+    async def iter_events(self):
+        """Yield decoded JSON payloads of server-sent `data:` events."""
+        async for line in self.iter_lines():
+            if not line.startswith(b'data:'):
+                continue
+            payload = line[5:].strip()
+            if payload == b'[DONE]':
+                return
+            if payload:
+                yield json.loads(payload)
+
+    async def read(self):
+        return b''.join([data async for data in self.iter_chunks()])
+
+    async def json(self):
+        return json.loads(await self.read())
+
+    def close(self):
+        self._writer.close()
+
+
+async def request(host, port, method, path, body=None, headers=None, timeout=None):
+    """
+        Send a single request on a fresh connection and return the Response once
+        the status line and headers have arrived. The caller must close() it.
+    """
+    if isinstance(body, (dict, list)):
+        body = json.dumps(body).encode()
+        headers = dict(headers or {}, **{'Content-Type': 'application/json'})
+    body = body or b''
+    connect = asyncio.open_connection(host, port)
+    reader, writer = await asyncio.wait_for(connect, timeout)
+    try:
+        lines = [f"{method} {path} HTTP/1.1", f"Host: {host}:{port}",
+                 f"Content-Length: {len(body)}", "Connection: close"]
+        lines += [f"{key}: {value}" for key, value in (headers or {}).items()]
+        writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode() + body)
+        await writer.drain()
+
+        status_line = await asyncio.wait_for(reader.readline(), timeout)
+        if not status_line:
+            raise ConnectionError("Server closed the connection without a response")
+        _, status, reason = (status_line.decode('latin-1').rstrip('\r\n').split(' ', 2) + [''])[:3]
+        response_headers = {}
+        while True:
+            line = await asyncio.wait_for(reader.readline(), timeout)
+            if line in (b'\r\n', b'\n', b''):
+                break
+            key, _, value = line.decode('latin-1').partition(':')
+            response_headers[key.strip().lower()] = value.strip()
+    except BaseException:
+        writer.close()
+        raise
+    return Response(int(status), reason, response_headers, reader, writer)
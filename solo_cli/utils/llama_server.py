@@ -1,27 +1,30 @@
+import asyncio
 import os
 import platform
 import requests
 import subprocess
-from tqdm import tqdm
+import time
 
+from solo_cli.config import config_batch
+from solo_cli.utils import model_store
+from solo_cli.utils.downloader import DEFAULT_CONNECTIONS, DownloadError
+from solo_cli.utils.profiling import span
+from solo_cli.utils.readiness import DEFAULT_READY_TIMEOUT, first_token_latency, wait_until_ready
 
-def download_file(url, filename):
+MAX_LOAD_TIME_SAMPLES = 20
+
+
+def download_file(url, filename, connections=DEFAULT_CONNECTIONS, sha256=None):
     if os.path.exists(filename):
         print(f"{filename} already exists. Skipping download.")
         return
-    response = requests.get(url, stream=True)
-    total_size = int(response.headers.get('content-length', 0))
-    block_size = 1024  # 1 Kibibyte
-    t = tqdm(total=total_size, unit='iB', unit_scale=True)
-    with open(filename, 'wb') as file:
-        for data in response.iter_content(block_size):
-            t.update(len(data))
-            file.write(data)
-    t.close()
-    if total_size != 0 and t.n != total_size:
-        print("ERROR: Something went wrong")
-    else:
-        print(f"{filename} downloaded successfully.")
+    try:
+        model_store.fetch(url, filename, sha256=sha256, connections=connections)
+    except (DownloadError, requests.RequestException) as e:
+        print(f"ERROR: Failed to download {filename}: {e}")
+        print("Run the same command again to resume the download.")
+        raise
+    print(f"{filename} downloaded successfully.")
 
 def set_permissions(filename):
     if platform.system() in ['Linux', 'Darwin', 'BSD']:
@@ -74,13 +77,65 @@ def start_model():
     # Placeholder for start model functionality
     print("Starting model...")
 
-def is_server_running(url = "http://localhost:8080"):
+def is_server_running(url = "http://localhost:8080", timeout=2):
     try:
-        response = requests.get(url)
+        response = requests.get(url, timeout=timeout)
         return response.status_code == 200
-    except requests.ConnectionError:
+    except requests.RequestException:
         return False
 
+def write_launch_script(shell_script, llamafile_path, port=8080, extra_args=()):
+    """Write the launcher script; `exec` keeps the server's PID equal to the script's."""
+    args = ''.join(f" {arg}" for arg in extra_args)
+    with open(shell_script, 'w') as f:
+        f.write(f"#!/bin/bash\nexec {llamafile_path} --nobrowser --port {port}{args}")
+    return set_permissions(shell_script)
+
+def spawn_server(command, log_path, cpus=None):
+    """Start a server process detached from the terminal, optionally pinned to cpus."""
+    preexec_fn = None
+    if cpus and hasattr(os, 'sched_setaffinity'):
+        preexec_fn = lambda: os.sched_setaffinity(0, cpus)
+    with open(log_path, 'ab') as log:
+        return subprocess.Popen(command, stdout=log, stderr=subprocess.STDOUT,
+                                start_new_session=os.name != 'nt', preexec_fn=preexec_fn)
+
+def launch_server(command, model_name, port=8080, timeout=DEFAULT_READY_TIMEOUT, log_path=None):
+    """
+        Start the llamafile server in the background and return once it answers
+        readiness probes. Records spawn-to-ready and first-token latency for the
+        model in the config and returns (process, ready_seconds, first_token_seconds).
+    """
+    log_path = log_path or f"{model_name}.log"
+    with span('spawn', 'serve', model=model_name):
+        process = spawn_server(command, log_path)
+    try:
+        with span('wait_ready', 'serve', model=model_name):
+            ready = asyncio.run(wait_until_ready('127.0.0.1', port, timeout, process))
+        with span('first_token', 'serve', model=model_name):
+            first_token = asyncio.run(first_token_latency('127.0.0.1', port, timeout=timeout))
+    except Exception:
+        print(f"Server did not become ready, see {log_path}")
+        if process.poll() is None:
+            process.terminate()
+        raise
+    record_load_time(model_name, ready, first_token)
+    return process, ready, first_token
+
+def record_load_time(model_name, ready, first_token):
+    """Append a cold-start sample to `load_times` in the config, keyed by model."""
+    source = model_store.lookup(f"{model_name}.llamafile")
+    sample = {
+        'timestamp': time.time(),
+        'sha256': os.path.basename(source) if source else None,
+        'spawn_to_ready_s': round(ready, 3),
+        'first_token_s': round(first_token, 3),
+    }
+    with config_batch() as config:
+        samples = config.setdefault('load_times', {}).setdefault(model_name, [])
+        samples.append(sample)
+        del samples[:-MAX_LOAD_TIME_SAMPLES]
+
 def kill_process_on_port(port):
     try:
         result = subprocess.run(['lsof', '-ti', f':{port}', '-sTCP:LISTEN'], stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
@@ -0,0 +1,194 @@
+import os
+import threading
+
+from solo_cli.config import load_config
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+
+def _labels(names, values):
+    if not names:
+        return ''
+    pairs = []
+    for name, value in zip(names, values):
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(f'{name}="{value}"')
+    return '{' + ','.join(pairs) + '}'
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = 'untyped'
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.values = {}  # label values tuple -> value
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(labels[name] for name in self.labels)
+
+    def samples(self):
+        for key, value in sorted(self.values.items()):
+            yield self.name, _labels(self.labels, key), value
+
+    def clear(self):
+        self.values = {}
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def set(self, value, **labels):
+        """For collectors copying a running total kept elsewhere, which only ever grows."""
+        self.values[self._key(labels)] = value
+
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        self.values[self._key(labels)] = value
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets) + (float('inf'),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self.values.get(key, ([0] * len(self.buckets), 0.0))
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+            self.values[key] = (counts, total + value)
+
+    def samples(self):
+        for key, (counts, total) in sorted(self.values.items()):
+            for bound, count in zip(self.buckets, counts):
+                yield f"{self.name}_bucket", _labels(self.labels + ('le',), key + (_number(bound),)), count
+            yield f"{self.name}_sum", _labels(self.labels, key), total
+            yield f"{self.name}_count", _labels(self.labels, key), counts[-1]
+
+
+class Registry:
+    """
+        Metrics rendered in the Prometheus text exposition format.
+
+        Counters and histograms are updated as events happen; collectors are
+        called on every scrape to refresh values that are cheaper to sample
+        than to track, such as process memory, or totals other objects keep.
+        Totals are counters named `*_total`, whichever way they are updated.
+    """
+
+    def __init__(self):
+        self.metrics = {}
+        self.collectors = []
+
+    def _get(self, cls, name, help, labels, **options):
+        if name not in self.metrics:
+            self.metrics[name] = cls(name, help, labels, **options)
+        return self.metrics[name]
+
+    def counter(self, name, help, labels=()):
+        return self._get(Counter, name, help, labels)
+
+    def gauge(self, name, help, labels=()):
+        return self._get(Gauge, name, help, labels)
+
+    def histogram(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        return self._get(Histogram, name, help, labels, buckets=buckets)
+
+    def add_collector(self, collector):
+        """Register collector(registry), called before every render."""
+        self.collectors.append(collector)
+
+    def render(self):
+        for collector in self.collectors:
+            collector(self)
+        lines = []
+        for metric in self.metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines += [f"{name}{labels} {_number(value)}" for name, labels, value in metric.samples()]
+        return '\n'.join(lines) + '\n'
+
+
+def process_stats(pid):
+    """(resident bytes, CPU seconds) of a process, or None if it is gone."""
+    try:
+        import psutil
+    except ImportError:
+        psutil = None
+    if psutil is not None:
+        try:
+            process = psutil.Process(pid)
+            times = process.cpu_times()
+            return process.memory_info().rss, times.user + times.system
+        except psutil.Error:
+            return None
+    try:
+        with open(f"/proc/{pid}/stat") as file:
+            # The command name may contain spaces; fields resume after its ')'.
+            fields = file.read().rpartition(')')[2].split()
+        with open(f"/proc/{pid}/statm") as file:
+            resident_pages = int(file.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    ticks = os.sysconf('SC_CLK_TCK')
+    return resident_pages * os.sysconf('SC_PAGE_SIZE'), (int(fields[11]) + int(fields[12])) / ticks
+
+
+def collect_recorded(registry):
+    """Gauges for the download and model-load samples other commands saved in the config."""
+    config = load_config()
+    ready = registry.gauge('solo_model_ready_seconds', 'Spawn-to-ready time of the last launch.', ('model',))
+    first_token = registry.gauge('solo_model_first_token_seconds',
+                                 'First-token latency measured after the last launch.', ('model',))
+    for model, samples in config.get('load_times', {}).items():
+        if samples:
+            ready.set(samples[-1]['spawn_to_ready_s'], model=model)
+            first_token.set(samples[-1]['first_token_s'], model=model)
+
+    throughput = registry.gauge('solo_download_throughput_bytes_per_second',
+                                'Average throughput of the last download of each file.', ('file',))
+    downloaded = registry.gauge('solo_download_bytes', 'Bytes transferred by the last download.', ('file',))
+    for name, sample in config.get('downloads', {}).items():
+        downloaded.set(sample['bytes'], file=name)
+        throughput.set(sample['bytes'] / max(sample['seconds'], 1e-6), file=name)
+
+
+def collect_processes(registry, processes):
+    """
+        Memory and CPU metrics for launched llamafiles; processes is an
+        iterable of (labels dict, subprocess.Popen).
+    """
+    up = registry.gauge('solo_replica_up', 'Whether the llamafile process is running.', ('model', 'port'))
+    rss = registry.gauge('solo_replica_resident_memory_bytes', 'Resident memory of the llamafile process.',
+                         ('model', 'port'))
+    cpu = registry.counter('solo_replica_cpu_seconds_total', 'CPU time used by the llamafile process.',
+                           ('model', 'port'))
+    for metric in (up, rss, cpu):
+        metric.clear()
+    for labels, process in processes:
+        stats = process_stats(process.pid) if process.poll() is None else None
+        up.set(int(stats is not None), **labels)
+        if stats is not None:
+            rss.set(stats[0], **labels)
+            cpu.set(stats[1], **labels)
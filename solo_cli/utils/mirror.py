@@ -0,0 +1,242 @@
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from solo_cli.utils.downloader import checkpoint_path, part_path
+from solo_cli.utils.model_store import fetch, lookup, ref_path, store_dir
+
+POLL_INTERVAL = 0.5  # seconds between checks on a file that is still filling
+FILL_START_TIMEOUT = 60  # seconds to wait for an on-demand download to begin writing
+PREFIX = '/models/'
+
+
+def parse_range(header, size):
+    """
+        (start, end) with an inclusive end for a single `bytes=` range header,
+        or None for the whole file. Raises ValueError if it cannot be satisfied.
+    """
+    if not header or not header.startswith('bytes='):
+        return None
+    first, _, last = header[len('bytes='):].split(',', 1)[0].strip().partition('-')
+    if not first:
+        start, end = max(0, size - int(last)), size - 1
+    else:
+        start, end = int(first), min(int(last), size - 1) if last else size - 1
+    if start > end or start >= size:
+        raise ValueError(header)
+    return start, end
+
+
+def stored_models():
+    """{file name: {size, sha256}} for every file in the store that can be served."""
+    refs = os.path.dirname(ref_path('x'))
+    models = {}
+    for entry in sorted(os.listdir(refs)) if os.path.isdir(refs) else []:
+        if not entry.endswith('.json'):
+            continue
+        try:
+            with open(os.path.join(refs, entry), 'r') as file:
+                ref = json.load(file)
+        except (OSError, ValueError):
+            continue
+        if lookup(entry[:-len('.json')]) is not None:
+            models[entry[:-len('.json')]] = {'size': ref.get('size'), 'sha256': ref.get('sha256')}
+    return models
+
+
+class Fill:
+    """
+        An upstream download the mirror started because a client asked for a
+        file it did not have. Clients read the bytes that have already arrived
+        from the partial file while the download carries on.
+    """
+
+    def __init__(self, name, url, sha256=None):
+        self.name = name
+        self.url = url
+        self.sha256 = sha256
+        self.tmp_path = os.path.join(store_dir(), 'tmp', name)
+        self.done = threading.Event()
+        self.error = None
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        dest = os.path.join(store_dir(), 'mirror', self.name)
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        try:
+            # Never through another mirror: mirrors pointing at each other would loop.
+            fetch(self.url, dest, self.sha256, mirrors=[])
+        except Exception as e:
+            self.error = e
+        finally:
+            self.done.set()
+
+    @property
+    def failed(self):
+        return self.done.is_set() and self.error is not None
+
+    def progress(self):
+        """(total size or None, [(start, end)] byte ranges written so far, end exclusive)."""
+        if self.done.is_set() and self.error is None:
+            size = os.path.getsize(lookup(self.name))
+            return size, [(0, size)]
+        try:
+            with open(checkpoint_path(self.tmp_path), 'r') as file:
+                checkpoint = json.load(file)
+            return checkpoint['size'], [(start, position) for start, _, position in checkpoint['segments']]
+        except (OSError, ValueError, KeyError):
+            pass
+        try:
+            # Servers without range support are fetched in one sequential stream.
+            return None, [(0, os.path.getsize(part_path(self.tmp_path)))]
+        except OSError:
+            return None, []
+
+    def available(self, position):
+        """Offset up to which bytes from position are already written."""
+        _, written = self.progress()
+        return max([end for start, end in written if start <= position < end], default=position)
+
+    def open(self):
+        """The partial file, opened as soon as the download creates it; None if it failed first."""
+        deadline = time.monotonic() + FILL_START_TIMEOUT
+        while time.monotonic() < deadline:
+            if self.done.is_set():
+                return None if self.error else open(lookup(self.name), 'rb')
+            if os.path.exists(checkpoint_path(self.tmp_path)) or os.path.exists(part_path(self.tmp_path)):
+                try:
+                    # The open file survives the renames that complete the download.
+                    return open(part_path(self.tmp_path), 'rb')
+                except OSError:
+                    pass  # finished between the two checks
+            time.sleep(POLL_INTERVAL)
+        return None
+
+
+class Mirror:
+    """The files a mirror serves: the local store, plus on-demand fills from upstream."""
+
+    def __init__(self, fill=True):
+        self.fill = fill
+        self.fills = {}
+        self._lock = threading.Lock()
+
+    def upstream(self, name):
+        """(url, sha256) to fill name from, or None for files the catalog does not know."""
+        from solo_cli.utils.model_store import resolve_model
+
+        if not self.fill or not name.endswith('.llamafile'):
+            return None
+        try:
+            return resolve_model(name[:-len('.llamafile')])
+        except KeyError:
+            return None
+
+    def open(self, name, url=None):
+        """
+            (file, size or None, sha256 or None, Fill or None) for name, or None
+            if it cannot be served. With url, only a file downloaded from that
+            upstream URL will do, so a same-named file from elsewhere is never
+            passed off as it.
+        """
+        path = lookup(name, url)
+        if path is not None:
+            return open(path, 'rb'), os.path.getsize(path), os.path.basename(path), None
+        source = self.upstream(name)
+        if source is None or (url is not None and source[0] != url):
+            return None
+        with self._lock:
+            fill = self.fills.get(name)
+            if fill is None or fill.failed:
+                fill = self.fills[name] = Fill(name, *source)
+        file = fill.open()
+        if file is None:
+            return None
+        return file, fill.progress()[0], fill.sha256, fill
+
+
+class MirrorHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_HEAD(self):
+        self._serve(head=True)
+
+    def do_GET(self):
+        if urlsplit(self.path).path.rstrip('/') == PREFIX.rstrip('/'):
+            self._send_json(200, stored_models())
+        else:
+            self._serve()
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _serve(self, head=False):
+        parts = urlsplit(self.path)
+        path = unquote(parts.path)
+        name = path[len(PREFIX):] if path.startswith(PREFIX) else ''
+        url = parse_qs(parts.query).get('url', [None])[0]
+        opened = self.server.mirror.open(name, url) if name and '/' not in name and not name.startswith('.') else None
+        if opened is None:
+            self._send_json(404, {'error': f"{name or path} is not available"})
+            return
+        file, size, digest, fill = opened
+        with file:
+            while size is None and not fill.failed:
+                time.sleep(POLL_INTERVAL)  # a streamed fill only knows its size at the end
+                size = fill.progress()[0]
+            if fill is not None and fill.failed:
+                self._send_json(502, {'error': f"upstream download failed: {fill.error}"})
+                return
+            try:
+                byte_range = parse_range(self.headers.get('Range'), size)
+            except ValueError:
+                self.send_response(416)
+                self.send_header('Content-Range', f"bytes */{size}")
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            start, end = byte_range or (0, size - 1)
+            self.send_response(206 if byte_range else 200)
+            if byte_range:
+                self.send_header('Content-Range', f"bytes {start}-{end}/{size}")
+            self.send_header('Accept-Ranges', 'bytes')
+            self.send_header('Content-Length', str(end - start + 1))
+            self.send_header('Content-Type', 'application/octet-stream')
+            if digest:
+                self.send_header('ETag', f'"{digest}"')
+            self.end_headers()
+            if not head:
+                self._send_file(file, start, end, fill)
+
+    def _send_file(self, file, start, end, fill):
+        """Copy [start, end] to the client with sendfile, waiting for bytes a fill has not written yet."""
+        position = start
+        while position <= end:
+            available = end + 1 if fill is None else min(end + 1, fill.available(position))
+            if available > position:
+                position += self.connection.sendfile(file, position, available - position)
+            elif fill.failed:
+                self.close_connection = True
+                return
+            else:
+                time.sleep(POLL_INTERVAL)
+
+
+class MirrorServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, mirror):
+        super().__init__(address, MirrorHandler)
+        self.mirror = mirror
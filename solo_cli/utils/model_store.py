@@ -0,0 +1,323 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+
+from solo_cli.config import load_config
+from solo_cli.constants import MODELS
+from solo_cli.utils.downloader import DEFAULT_CONNECTIONS, DownloadError, download, part_path, probe
+from solo_cli.utils.profiling import span
+
+READ_SIZE = 4 * 1024 * 1024
+FICLONE = 0x40049409  # linux/fs.h
+
+
+def store_dir():
+    """Root of the shared model store, `~/.cache/solo` unless overridden."""
+    if os.environ.get('SOLO_CACHE_DIR'):
+        return os.environ['SOLO_CACHE_DIR']
+    cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(cache_home, 'solo')
+
+
+def object_path(digest):
+    return os.path.join(store_dir(), 'objects', 'sha256', digest)
+
+
+def ref_path(name):
+    return os.path.join(store_dir(), 'refs', f"{name}.json")
+
+
+def resolve_model(model_name):
+    """
+        Return (url, sha256) for an entry of MODELS. Entries are either a plain
+        URL or a dict with `url` and an optional expected `sha256`. Names that
+        are not built in are looked up in the cached catalog.
+    """
+    if model_name not in MODELS:
+        from solo_cli.utils.catalog import lookup
+
+        entry = lookup(model_name)
+        if entry is None:
+            raise KeyError(model_name)
+        return entry['url'], entry.get('sha256')
+    entry = MODELS[model_name]
+    if isinstance(entry, dict):
+        return entry['url'], entry.get('sha256')
+    return entry, None
+
+
+class StreamingHasher:
+    """
+        SHA-256 over a file that is written out of order by several segments.
+
+        Blocks that arrive at the current hash offset are hashed straight from
+        memory. Blocks further ahead are only recorded; once the hashed prefix
+        reaches them they are read back from the (still hot) page cache.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.offset = 0
+        self._hash = hashlib.sha256()
+        self._ready = {}  # start -> end of written but not yet hashed ranges
+        self._ends = {}  # end -> start, for extending ranges in place
+        self._busy = False
+        self._lock = threading.Lock()
+
+    def _record(self, start, end):
+        if start in self._ends:
+            previous = self._ends.pop(start)
+            start = previous
+        self._ready[start] = end
+        self._ends[end] = start
+
+    def mark_written(self, start, end):
+        """Account for bytes that were already on disk, e.g. from a resumed download."""
+        if end > start:
+            with self._lock:
+                self._record(start, end)
+            self.update_at(self.offset, b'')
+
+    def update_at(self, offset, data):
+        with self._lock:
+            if self._busy or offset != self.offset:
+                if data:
+                    self._record(offset, offset + len(data))
+                return
+            self._busy = True
+        self._hash.update(data)
+        with self._lock:
+            self.offset += len(data)
+        self._drain()
+
+    def _drain(self):
+        while True:
+            with self._lock:
+                end = self._ready.pop(self.offset, None)
+                if end is None:
+                    self._busy = False
+                    return
+                del self._ends[end]
+            with open(self.path, 'rb') as file:
+                file.seek(self.offset)
+                remaining = end - self.offset
+                while remaining:
+                    data = file.read(min(READ_SIZE, remaining))
+                    if not data:
+                        raise DownloadError(f"{self.path} is shorter than its recorded progress")
+                    self._hash.update(data)
+                    remaining -= len(data)
+            with self._lock:
+                self.offset = end
+
+    def hexdigest(self):
+        return self._hash.hexdigest()
+
+
+def _reflink(source, dest):
+    import fcntl
+
+    with open(source, 'rb') as src, open(dest, 'wb') as dst:
+        try:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+        except OSError:
+            dst.close()
+            os.remove(dest)
+            raise
+
+
+def link_into(source, dest):
+    """
+        Materialise a store object at dest without copying where possible:
+        hardlink, then reflink, then symlink, and only copy as a last resort.
+    """
+    if os.path.lexists(dest):
+        os.remove(dest)
+    try:
+        os.link(source, dest)
+        return 'hardlink'
+    except OSError:
+        pass
+    try:
+        _reflink(source, dest)
+        return 'reflink'
+    except (ImportError, OSError):
+        pass
+    try:
+        os.symlink(os.path.abspath(source), dest)
+        return 'symlink'
+    except OSError:
+        pass
+    shutil.copyfile(source, dest)
+    return 'copy'
+
+
+def lookup(name, url=None):
+    """Return the store object recorded for name, if it exists and matches url."""
+    try:
+        with open(ref_path(name), 'r') as file:
+            ref = json.load(file)
+    except (OSError, ValueError):
+        return None
+    if url is not None and ref.get('url') != url:
+        return None
+    path = object_path(ref['sha256'])
+    return path if os.path.exists(path) else None
+
+
+def write_ref(name, url, digest, size):
+    path = ref_path(name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(f"{path}.tmp", 'w') as file:
+        json.dump({'url': url, 'sha256': digest, 'size': size}, file)
+    os.replace(f"{path}.tmp", path)
+
+
+def configured_mirrors():
+    """Base URLs of the LAN mirrors (`solo-cli mirror --add`) to try before upstream."""
+    return load_config().get('mirrors', [])
+
+
+def mirror_url(mirror, name, url=None):
+    """Where a mirror serves name; with url, only if it was downloaded from there."""
+    from urllib.parse import quote
+
+    query = f"?url={quote(url, safe='')}" if url else ''
+    return f"{mirror.rstrip('/')}/models/{quote(name)}{query}"
+
+
+def fetch(url, dest, sha256=None, connections=DEFAULT_CONNECTIONS, mirrors=None, size=None, **download_options):
+    """
+        Ensure the file behind url is in the store and link it to dest.
+
+        With a cache quota set, least recently used models are evicted first
+        to make room for size bytes (probed from url when not given).
+
+        The file is taken from the first mirror that has it (the configured
+        ones unless `mirrors` is given), falling back to url itself. The SHA-256
+        is computed while the file streams in. A mismatch against the expected
+        digest discards the download; from a mirror the next source is tried,
+        from url it raises DownloadError.
+        Extra keyword arguments (scheduler, priority, progress) go to download().
+        Returns the path of the store object.
+    """
+    import requests
+    from solo_cli.utils.cache import cache_quota, make_room, model_name, record_use
+
+    name = os.path.basename(dest)
+    source = lookup(name, url)
+    if source is not None and (sha256 is None or source == object_path(sha256.lower())):
+        print(f"Using cached {name} from {os.path.dirname(source)}")
+        link_into(source, dest)
+        record_use(name, dest)
+        return source
+
+    if cache_quota() is not None:
+        if size is None:
+            try:
+                size = probe(url, requests.Session())[0]
+            except requests.RequestException:
+                size = 0  # the download itself will report the failure
+        make_room(size or 0, keep=[model_name(name)])
+
+    tmp_dir = os.path.join(store_dir(), 'tmp')
+    os.makedirs(tmp_dir, exist_ok=True)
+    tmp_path = os.path.join(tmp_dir, name)
+    mirrors = configured_mirrors() if mirrors is None else mirrors
+    sources = [mirror_url(mirror, name, url) for mirror in mirrors] + [url]
+    for source_url in sources:
+        hasher = StreamingHasher(part_path(tmp_path))
+        try:
+            with span('download', 'download', file=name, source=source_url):
+                download(source_url, tmp_path, connections=connections, hasher=hasher, **download_options)
+            with span('verify', 'download', file=name):
+                digest = hasher.hexdigest()
+            if sha256 is not None and digest != sha256.lower():
+                os.remove(tmp_path)
+                raise DownloadError(f"Checksum mismatch for {name}: expected {sha256}, got {digest}")
+            break
+        except (DownloadError, OSError, requests.RequestException) as e:
+            if source_url == url:
+                raise
+            print(f"Mirror {source_url} failed ({e}); trying the next source.")
+
+    source = object_path(digest)
+    os.makedirs(os.path.dirname(source), exist_ok=True)
+    if os.path.exists(source):
+        os.remove(tmp_path)
+    else:
+        os.replace(tmp_path, source)
+    os.chmod(source, 0o755)
+    write_ref(name, url, digest, os.path.getsize(source))
+    link_into(source, dest)
+    record_use(name, dest)
+    return source
+
+
+def fetch_many(items, connections=DEFAULT_CONNECTIONS, max_bandwidth=None, on_ready=None):
+    """
+        Fetch several (url, dest, sha256) items concurrently under one scheduler.
+
+        Items already in the store are linked right away. The rest are ordered by
+        size so the smallest finish first; on_ready(dest) is called as each one
+        completes. Returns a dict of dest -> exception for the failed items.
+    """
+    import requests
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+    from solo_cli.utils.cache import make_room, model_name, record_use
+    from solo_cli.utils.scheduler import CombinedProgress, TransferScheduler
+
+    pending = []
+    for url, dest, sha256 in items:
+        source = lookup(os.path.basename(dest), url)
+        if source is not None and (sha256 is None or source == object_path(sha256.lower())):
+            link_into(source, dest)
+            record_use(os.path.basename(dest), dest)
+            if on_ready is not None:
+                on_ready(dest)
+        else:
+            pending.append((url, dest, sha256))
+    if not pending:
+        return {}
+
+    session = requests.Session()
+
+    def size_of(item):
+        try:
+            return probe(item[0], session)[0]
+        except requests.RequestException:
+            return 0
+
+    with ThreadPoolExecutor(max_workers=connections) as executor:
+        sizes = list(executor.map(size_of, pending))
+    pending = sorted(zip(sizes, pending), key=lambda entry: entry[0])
+    try:
+        # Room for all of them at once: each fetch alone would only check its own size.
+        make_room(sum(sizes), keep=[model_name(os.path.basename(dest)) for _, (_, dest, _) in pending])
+    except DownloadError as e:
+        return {dest: e for _, (_, dest, _) in pending}
+
+    scheduler = TransferScheduler(connections, max_bandwidth)
+    progress = CombinedProgress(sum(sizes))
+    failures = {}
+    try:
+        with ThreadPoolExecutor(max_workers=len(pending)) as executor:
+            futures = {
+                executor.submit(fetch, url, dest, sha256, connections, size=size or None, scheduler=scheduler,
+                                priority=size, progress=progress.factory(os.path.basename(dest))): dest
+                for size, (url, dest, sha256) in pending
+            }
+            for future in as_completed(futures):
+                dest = futures[future]
+                try:
+                    future.result()
+                except Exception as e:
+                    failures[dest] = e
+                    continue
+                if on_ready is not None:
+                    on_ready(dest)
+    finally:
+        progress.close()
+    return failures
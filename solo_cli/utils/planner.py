@@ -0,0 +1,105 @@
+import os
+
+DEFAULT_CTX = 8192  # llamafile's server default context size
+MIN_CTX = 512
+KV_BYTES = 2  # the KV cache holds f16 keys and values
+RUNTIME_OVERHEAD = 512 * 1024 ** 2  # runtime, compute buffers and logits, roughly
+HEADROOM = 0.9  # plan for at most this share of the available memory
+
+
+def available_memory():
+    """Bytes of memory available to a new process without swapping, or None if unknown."""
+    try:
+        import psutil
+    except ImportError:
+        psutil = None
+    if psutil is not None:
+        return psutil.virtual_memory().available
+    try:
+        with open('/proc/meminfo') as file:
+            for line in file:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        return os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE')
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def kv_cache_bytes(info, ctx_size):
+    """Keys and values for ctx_size tokens across every layer."""
+    per_token = info['head_count_kv'] * (info['key_length'] + info['value_length']) * KV_BYTES
+    return ctx_size * info['layers'] * per_token
+
+
+def estimate(info, ctx_size, replicas=1):
+    """
+        Resident memory of `replicas` servers of the model at ctx_size. The
+        weights are memory-mapped, so replicas share them through the page
+        cache; each replica has its own KV cache and compute buffers.
+    """
+    kv_cache = kv_cache_bytes(info, ctx_size) * replicas
+    overhead = (RUNTIME_OVERHEAD + ctx_size * info['embedding_length'] * 4) * replicas
+    return {'weights': info['weights_bytes'], 'kv_cache': kv_cache, 'overhead': overhead,
+            'total': info['weights_bytes'] + kv_cache + overhead}
+
+
+def default_ctx(info, ctx_size=None):
+    """The requested context size, else the server default; never past what the model was trained on."""
+    ctx_size = ctx_size or DEFAULT_CTX
+    return min(ctx_size, info['context_length']) if info['context_length'] else ctx_size
+
+
+def plan(info, available, ctx_size=None, replicas=1):
+    """
+        Decide how to launch the model in `available` bytes of memory.
+
+        Returns a dict with `action`: 'ok' when it fits at the requested
+        context size, 'shrink' with the largest smaller power-of-two
+        `ctx_size` that fits, or 'refuse' when even MIN_CTX does not fit.
+        An unknown amount of available memory is always 'ok'.
+    """
+    ctx_size = default_ctx(info, ctx_size)
+    result = {'action': 'ok', 'ctx_size': ctx_size, 'requested_ctx': ctx_size, 'available': available,
+              'estimate': estimate(info, ctx_size, replicas)}
+    if available is None or result['estimate']['total'] <= available * HEADROOM:
+        return result
+
+    ctx = 1 << (ctx_size.bit_length() - 1)
+    if ctx == ctx_size:
+        ctx //= 2
+    while ctx >= MIN_CTX:
+        needed = estimate(info, ctx, replicas)
+        if needed['total'] <= available * HEADROOM:
+            return dict(result, action='shrink', ctx_size=ctx, estimate=needed)
+        ctx //= 2
+    return dict(result, action='refuse')
+
+
+def smaller_quants(name, info, available, catalog, ctx_size=None, replicas=1):
+    """
+        Catalog entries of the same model in smaller quantizations that would
+        fit at the requested context size, best quality (largest) first.
+        Their weights are estimated from the download size.
+    """
+    from solo_cli.utils.catalog import QUANT_PATTERN
+
+    family = QUANT_PATTERN.sub('', name).lower()
+    ctx_size = default_ctx(info, ctx_size)
+    fitting = []
+    for entry in catalog['models'].values():
+        if entry['id'] == name or not entry['size'] or entry['size'] >= info['weights_bytes']:
+            continue
+        if QUANT_PATTERN.sub('', entry['id']).lower() != family:
+            continue
+        needed = estimate(dict(info, weights_bytes=entry['size']), ctx_size, replicas)
+        if available is None or needed['total'] <= available * HEADROOM:
+            fitting.append(dict(entry, needed=needed['total']))
+    return sorted(fitting, key=lambda entry: -entry['size'])
+
+
+def catalog_estimate(entry):
+    """Rough memory need of a model known only from the catalog: its download plus overhead."""
+    return entry['size'] + RUNTIME_OVERHEAD if entry.get('size') else None
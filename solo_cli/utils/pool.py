@@ -0,0 +1,136 @@
+import asyncio
+import glob
+import os
+import re
+import subprocess
+
+from solo_cli.constants import DEFAULT_READY_TIMEOUT
+from solo_cli.utils.llama_server import record_load_time, spawn_server
+from solo_cli.utils.readiness import first_token_latency, wait_until_ready
+
+NODE_PATH = '/sys/devices/system/node'
+
+
+def parse_cpulist(text):
+    """Parse a kernel cpulist such as `0-3,8,10-11`."""
+    cpus = []
+    for part in text.strip().split(','):
+        if '-' in part:
+            first, last = part.split('-')
+            cpus.extend(range(int(first), int(last) + 1))
+        elif part:
+            cpus.append(int(part))
+    return cpus
+
+
+def available_cpus():
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def numa_nodes():
+    """CPU lists of the NUMA nodes, or [] when the topology is not exposed."""
+    nodes = []
+    paths = glob.glob(os.path.join(NODE_PATH, 'node[0-9]*', 'cpulist'))
+    for path in sorted(paths, key=lambda p: int(re.search(r'node(\d+)', p).group(1))):
+        with open(path) as file:
+            nodes.append(parse_cpulist(file.read()))
+    return nodes
+
+
+def partition_cpus(replicas, cpus=None, nodes=None):
+    """
+        Split the usable CPUs into one disjoint set per replica.
+
+        With at least as many NUMA nodes as replicas every replica gets whole
+        nodes; otherwise CPUs are cut into contiguous runs in node order so a set
+        crosses as few node boundaries as possible. Sets are only shared when
+        there are more replicas than CPUs.
+    """
+    cpus = available_cpus() if cpus is None else cpus
+    usable = set(cpus)
+    nodes = numa_nodes() if nodes is None else nodes
+    nodes = [[cpu for cpu in node if cpu in usable] for node in nodes]
+    nodes = [node for node in nodes if node] or [sorted(usable)]
+
+    if replicas <= len(nodes):
+        return [sorted(cpu for node in nodes[i::replicas] for cpu in node) for i in range(replicas)]
+
+    ordered = [cpu for node in nodes for cpu in node]
+    if replicas >= len(ordered):
+        return [[ordered[i % len(ordered)]] for i in range(replicas)]
+    size, extra = divmod(len(ordered), replicas)
+    sets, start = [], 0
+    for i in range(replicas):
+        end = start + size + (1 if i < extra else 0)
+        sets.append(ordered[start:end])
+        start = end
+    return sets
+
+
+class ReplicaPool:
+    """
+        N llamafile processes for one model on consecutive ports, each with its
+        own CPU set and a matching `--threads` count.
+    """
+
+    def __init__(self, command, model_name, ports, cpu_sets=None, log_dir='.'):
+        self.command = list(command)
+        self.model_name = model_name
+        self.ports = list(ports)
+        self.cpu_sets = cpu_sets or [None] * len(self.ports)
+        self.log_dir = log_dir
+        self.processes = []
+
+    def replica_command(self, port, cpus):
+        command = self.command + ['--port', str(port)]
+        if cpus:
+            command += ['--threads', str(len(cpus))]
+        return command
+
+    def _spawn(self, index):
+        port, cpus = self.ports[index], self.cpu_sets[index]
+        log_path = os.path.join(self.log_dir, f"{self.model_name}.{index}.log")
+        return spawn_server(self.replica_command(port, cpus), log_path, cpus)
+
+    def start(self, timeout=DEFAULT_READY_TIMEOUT):
+        """Spawn every replica, wait until all are ready and return the slowest load time."""
+        self.processes = [self._spawn(index) for index in range(len(self.ports))]
+
+        async def wait_all():
+            waits = [wait_until_ready('127.0.0.1', port, timeout, process)
+                     for port, process in zip(self.ports, self.processes)]
+            ready = max(await asyncio.gather(*waits))
+            return ready, await first_token_latency('127.0.0.1', self.ports[0], timeout=timeout)
+
+        try:
+            ready, first_token = asyncio.run(wait_all())
+        except BaseException:
+            self.stop()
+            raise
+        record_load_time(self.model_name, ready, first_token)
+        return ready, first_token
+
+    def restart(self, index, timeout=DEFAULT_READY_TIMEOUT):
+        """Respawn one replica that died and wait until it is ready again."""
+        process = self.processes[index]
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+        self.processes[index] = self._spawn(index)
+        return asyncio.run(wait_until_ready('127.0.0.1', self.ports[index], timeout, self.processes[index]))
+
+    def exited(self):
+        """Indexes of replicas whose process is no longer running."""
+        return [index for index, process in enumerate(self.processes) if process.poll() is not None]
+
+    def stop(self, timeout=10):
+        for process in self.processes:
+            if process.poll() is None:
+                process.terminate()
+        for process in self.processes:
+            try:
+                process.wait(timeout)
+            except subprocess.TimeoutExpired:
+                process.kill()
@@ -0,0 +1,463 @@
+import asyncio
+import json
+import time
+
+from solo_cli.utils.readiness import probe
+from solo_cli.utils.response_cache import cache_key, is_complete, replay
+
+HEALTH_INTERVAL = 2.0
+CONNECT_TIMEOUT = 5
+MAX_HEADER_SIZE = 64 * 1024
+MAX_BODY_SIZE = 64 * 1024 * 1024
+HOP_BY_HOP = {'connection', 'keep-alive', 'proxy-connection', 'transfer-encoding', 'upgrade'}
+# Paths reported individually in /metrics; everything else is counted as 'other'.
+METRIC_PATHS = {'/completion', '/v1/completions', '/v1/chat/completions', '/embedding', '/v1/embeddings',
+                '/tokenize', '/detokenize', '/health', '/metrics'}
+
+
+class Backend:
+    """One llamafile server behind the proxy."""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.inflight = 0
+        self.served = 0
+        self.healthy = True
+
+    @property
+    def address(self):
+        return f"{self.host}:{self.port}"
+
+    def __repr__(self):
+        return f"Backend({self.address}, inflight={self.inflight}, healthy={self.healthy})"
+
+
+class ChunkedBody:
+    """
+        Follows chunked transfer-encoding framing across reads, so the end of
+        a body is its zero-size last chunk and not any data that happens to
+        look like one.
+    """
+
+    def __init__(self):
+        self.pending = b''  # the start of a size or trailer line not yet complete
+        self.skip = 0  # bytes of chunk data and its CRLF still to come
+        self.trailers = False
+        self.done = False
+
+    def feed(self, data):
+        """Consume the next bytes of the body; True once the whole body has arrived."""
+        data, self.pending, position = self.pending + data, b'', 0
+        while not self.done:
+            if self.skip:
+                step = min(self.skip, len(data) - position)
+                self.skip -= step
+                position += step
+                if self.skip:
+                    return False
+            end = data.find(b'\r\n', position)
+            if end < 0:
+                self.pending += data[position:]
+                return False
+            line, position = data[position:end], end + 2
+            if self.trailers:
+                self.done = not line
+                continue
+            try:
+                size = int(line.split(b';', 1)[0].strip(), 16)
+            except ValueError:
+                # Not framing we understand; the body then ends when the backend closes.
+                self.skip = float('inf')
+                return False
+            if size:
+                self.skip = size + 2
+            else:
+                self.trailers = True
+        return True
+
+
+class ProxyRequest:
+    def __init__(self, method, path, version, headers, body, client):
+        self.method = method
+        self.path = path
+        self.version = version
+        self.headers = headers  # list of (name, value) in arrival order
+        self.body = body
+        self.client = client
+        self.status = None  # status of the response sent for this request
+        self.slot = None  # (backend address, slot) pinned by PrefixAffinity
+        self._json = None
+
+    def header(self, name, default=None):
+        name = name.lower()
+        for key, value in self.headers:
+            if key.lower() == name:
+                return value
+        return default
+
+    @property
+    def keep_alive(self):
+        connection = (self.header('connection') or '').lower()
+        if self.version == 'HTTP/1.0':
+            return connection == 'keep-alive'
+        return connection != 'close'
+
+    def json(self):
+        """The body parsed as a JSON object, or None if it is not one."""
+        if self._json is None and self.body:
+            try:
+                parsed = json.loads(self.body)
+            except ValueError:
+                parsed = None
+            self._json = parsed if isinstance(parsed, dict) else False
+        return self._json or None
+
+
+class HTTPError(Exception):
+    def __init__(self, status, reason, headers=None):
+        super().__init__(reason)
+        self.status = status
+        self.reason = reason
+        self.headers = headers or {}
+
+
+async def read_request(reader, client=None):
+    """Read one request from a client connection; None once the client is done."""
+    try:
+        head = await reader.readuntil(b'\r\n\r\n')
+    except asyncio.IncompleteReadError:
+        return None
+    except asyncio.LimitOverrunError:
+        raise HTTPError(431, 'Request Header Fields Too Large')
+    lines = head.decode('latin-1').split('\r\n')
+    try:
+        method, path, version = lines[0].split(' ', 2)
+    except ValueError:
+        raise HTTPError(400, 'Bad Request')
+    headers = []
+    for line in lines[1:]:
+        if line:
+            key, _, value = line.partition(':')
+            headers.append((key.strip(), value.strip()))
+    request = ProxyRequest(method, path, version, headers, b'', client)
+
+    if (request.header('transfer-encoding') or '').lower() == 'chunked':
+        chunks = []
+        total = 0
+        while True:
+            try:
+                line = await reader.readline()
+            except ValueError:  # longer than the reader's limit
+                raise HTTPError(400, 'Bad Request')
+            if not line.endswith(b'\n'):
+                raise asyncio.IncompleteReadError(line, None)  # the client went away mid-body
+            try:
+                size = int(line.split(b';', 1)[0].strip(), 16)
+            except ValueError:
+                raise HTTPError(400, 'Bad Request')
+            if size < 0:
+                raise HTTPError(400, 'Bad Request')
+            total += size
+            if total > MAX_BODY_SIZE:
+                raise HTTPError(413, 'Payload Too Large')
+            if size == 0:
+                await reader.readline()
+                break
+            chunks.append(await reader.readexactly(size))
+            await reader.readline()
+        request.body = b''.join(chunks)
+    elif request.header('content-length'):
+        try:
+            length = int(request.header('content-length'))
+        except ValueError:
+            raise HTTPError(400, 'Bad Request')
+        if length < 0:
+            raise HTTPError(400, 'Bad Request')
+        if length > MAX_BODY_SIZE:
+            raise HTTPError(413, 'Payload Too Large')
+        request.body = await reader.readexactly(length)
+    return request
+
+
+def response_bytes(status, reason, body=b'', headers=None, keep_alive=True):
+    if isinstance(body, (dict, list)):
+        body = json.dumps(body).encode()
+        headers = dict(headers or {}, **{'Content-Type': 'application/json'})
+    lines = [f"HTTP/1.1 {status} {reason}", f"Content-Length: {len(body)}",
+             f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+    lines += [f"{key}: {value}" for key, value in (headers or {}).items()]
+    return ('\r\n'.join(lines) + '\r\n\r\n').encode() + body
+
+
+class ReverseProxy:
+    """
+        asyncio HTTP reverse proxy in front of one or more llamafile servers.
+
+        Each request goes to the healthy backend with the fewest requests in
+        flight. Subclasses change routing by overriding `select_backend` and can
+        intercept requests in `handle`. With a ResponseCache, deterministic
+        completion requests are answered from the cache when possible; with a
+        PrefixAffinity, prompts go where their prefix was last evaluated.
+    """
+
+    def __init__(self, backends, health_interval=HEALTH_INTERVAL, cache=None, model_name=None, metrics=None,
+                 affinity=None):
+        self.backends = list(backends)
+        self.health_interval = health_interval
+        self.cache = cache
+        self.affinity = affinity
+        self.model_name = model_name
+        self.metrics = metrics
+        if metrics is not None:
+            self._requests = metrics.counter('solo_proxy_requests_total', 'Requests answered by the proxy.',
+                                             ('path', 'status'))
+            self._latency = metrics.histogram('solo_proxy_request_seconds',
+                                              'Time to answer a request, including streaming.', ('path',))
+            metrics.add_collector(self._collect_metrics)
+        self._server = None
+        self._health_task = None
+        self._clients = set()
+        # Extra /_solo/ endpoints: path -> async fn(request) returning (status, payload).
+        self.admin_handlers = {}
+
+    def healthy_backends(self):
+        return [backend for backend in self.backends if backend.healthy]
+
+    def select_backend(self, request):
+        candidates = self.healthy_backends()
+        if not candidates:
+            return None
+        if self.affinity is not None and request.method == 'POST':
+            return self.affinity.route(request, candidates)
+        return min(candidates, key=lambda backend: (backend.inflight, backend.served))
+
+    async def check_health(self):
+        backends = list(self.backends)
+        results = await asyncio.gather(*[probe(backend.host, backend.port) for backend in backends])
+        for backend, healthy in zip(backends, results):
+            backend.healthy = healthy
+
+    async def _health_loop(self):
+        while True:
+            await asyncio.sleep(self.health_interval)
+            await self.check_health()
+
+    async def handle_client(self, reader, writer):
+        client = writer.get_extra_info('peername')
+        self._clients.add(writer)
+        try:
+            while True:
+                try:
+                    request = await read_request(reader, client)
+                except HTTPError as e:
+                    writer.write(response_bytes(e.status, e.reason, {'error': e.reason}, e.headers, False))
+                    break
+                if request is None:
+                    break
+                started = time.monotonic()
+                keep_alive = await self.handle(request, writer)
+                await writer.drain()
+                if self.metrics is not None:
+                    self._observe(request, time.monotonic() - started)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._clients.discard(writer)
+            writer.close()
+
+    async def handle(self, request, writer):
+        """Serve one request; return whether the client connection stays open."""
+        if request.path.startswith('/_solo/'):
+            return await self.handle_admin(request, writer)
+        if request.path == '/metrics' and self.metrics is not None:
+            request.status = 200
+            writer.write(response_bytes(200, 'OK', self.metrics.render().encode(),
+                                        {'Content-Type': 'text/plain; version=0.0.4'}, request.keep_alive))
+            return request.keep_alive
+        key = None
+        if self.cache is not None and request.method == 'POST':
+            key = cache_key(request.path, request.json(), self.model_name)
+        if key is None:
+            return await self.forward(request, writer)
+
+        cached = await self.cache.lookup(key)
+        if cached is not None:
+            request.status = 200
+            writer.write(replay(cached, request.keep_alive))
+            return request.keep_alive
+        captured = []
+        keep_alive = await self.forward(request, writer, on_chunk=captured.append)
+        response = b''.join(captured)
+        if is_complete(response):
+            await self.cache.store(key, response)
+        return keep_alive
+
+    def admin_status(self):
+        status = {'backends': [{'address': backend.address, 'healthy': backend.healthy,
+                                'inflight': backend.inflight, 'served': backend.served}
+                               for backend in self.backends]}
+        if self.cache is not None:
+            status['cache'] = self.cache.stats()
+        if self.affinity is not None:
+            status['affinity'] = self.affinity.status()
+        return status
+
+    def _observe(self, request, elapsed):
+        path = request.path.split('?', 1)[0]
+        path = path if path in METRIC_PATHS or path.startswith('/_solo/') else 'other'
+        self._requests.inc(path=path, status=request.status or 0)
+        self._latency.observe(elapsed, path=path)
+
+    def _collect_metrics(self, registry):
+        inflight = registry.gauge('solo_backend_inflight', 'Requests in flight per backend.', ('backend',))
+        healthy = registry.gauge('solo_backend_healthy', 'Whether the backend passes health checks.', ('backend',))
+        served = registry.counter('solo_backend_served_total', 'Requests completed per backend.', ('backend',))
+        for metric in (inflight, healthy, served):
+            metric.clear()
+        for backend in list(self.backends):
+            inflight.set(backend.inflight, backend=backend.address)
+            healthy.set(int(backend.healthy), backend=backend.address)
+            served.set(backend.served, backend=backend.address)
+        if self.cache is not None:
+            stats = self.cache.stats()
+            cache = registry.counter('solo_cache_lookups_total', 'Response cache lookups by result.', ('result',))
+            cache.set(stats['hits'], result='hit')
+            cache.set(stats['misses'], result='miss')
+            registry.gauge('solo_cache_bytes', 'Bytes held by the in-memory response cache.').set(stats['bytes'])
+        if self.affinity is not None:
+            routed = registry.counter('solo_prefix_routes_total', 'Prompt-prefix routing decisions by result.',
+                                      ('result',))
+            for result in ('hits', 'misses', 'spills'):
+                routed.set(self.affinity.stats[result], result=result[:-1])
+
+    async def handle_admin(self, request, writer):
+        """Answer the proxy's own /_solo/ endpoints."""
+        handler = self.admin_handlers.get(request.path)
+        if request.path == '/_solo/status':
+            status, payload = 200, self.admin_status()
+        elif handler is not None:
+            status, payload = await handler(request)
+        else:
+            status, payload = 404, {'error': 'unknown endpoint'}
+        request.status = status
+        reason = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 409: 'Conflict'}.get(status, 'Error')
+        writer.write(response_bytes(status, reason, payload, keep_alive=request.keep_alive))
+        return request.keep_alive
+
+    async def forward(self, request, writer, on_chunk=None):
+        """
+            Relay request to a backend and stream the response to the client.
+            on_chunk, if given, sees every raw response byte string as it passes.
+        """
+        tried = set()
+        while True:
+            backend = self.select_backend(request)
+            if backend is None or backend in tried:
+                backend = next((b for b in self.healthy_backends() if b not in tried), None)
+            if backend is None:
+                request.status = 503
+                writer.write(response_bytes(503, 'Service Unavailable', {'error': 'no healthy backend'},
+                                            {'Retry-After': '1'}, request.keep_alive))
+                return request.keep_alive
+            tried.add(backend)
+            # Count the request as in flight from the moment it is routed, so a
+            # backend being drained never looks idle while we are connecting.
+            backend.inflight += 1
+            try:
+                connect = asyncio.open_connection(backend.host, backend.port)
+                upstream_reader, upstream_writer = await asyncio.wait_for(connect, CONNECT_TIMEOUT)
+            except (OSError, asyncio.TimeoutError):
+                backend.inflight -= 1
+                backend.healthy = False
+                if self.affinity is not None:
+                    self.affinity.done(request)
+                continue
+            break
+
+        try:
+            return await self._relay(backend, request, writer, upstream_reader, upstream_writer, on_chunk)
+        finally:
+            backend.inflight -= 1
+            backend.served += 1
+            if self.affinity is not None:
+                self.affinity.done(request)
+            upstream_writer.close()
+
+    async def _relay(self, backend, request, writer, upstream_reader, upstream_writer, on_chunk):
+        lines = [f"{request.method} {request.path} HTTP/1.1"]
+        lines += [f"{key}: {value}" for key, value in request.headers
+                  if key.lower() not in HOP_BY_HOP and key.lower() != 'content-length']
+        lines += [f"Content-Length: {len(request.body)}", "Connection: close"]
+        try:
+            upstream_writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode() + request.body)
+            await upstream_writer.drain()
+
+            # The backend closes the connection after its response, so everything up
+            # to EOF belongs to this request and can be relayed verbatim.
+            head = await upstream_reader.readuntil(b'\r\n\r\n')
+            head_lines = head.decode('latin-1').split('\r\n')
+            status = int(head_lines[0].split(' ', 2)[1])
+            remaining = next((int(line.split(':', 1)[1]) for line in head_lines[1:]
+                              if line.lower().startswith('content-length:')), None)
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError, IndexError):
+            # Nothing has reached the client yet, so it can still get a proper answer.
+            backend.healthy = False
+            request.status = 502
+            writer.write(response_bytes(502, 'Bad Gateway', {'error': 'backend closed without a valid response'},
+                                        keep_alive=request.keep_alive))
+            return request.keep_alive
+        request.status = status
+        framed = any(line.lower().startswith(('content-length:', 'transfer-encoding:'))
+                     for line in head_lines[1:])
+        chunked = any(line.lower().startswith('transfer-encoding:') and 'chunked' in line.lower()
+                      for line in head_lines[1:])
+        body = ChunkedBody() if chunked else None
+        keep_alive = request.keep_alive and framed
+        head_lines = [line for line in head_lines[:-2] if not line.lower().startswith('connection:')]
+        head_lines.append(f"Connection: {'keep-alive' if keep_alive else 'close'}")
+        head = ('\r\n'.join(head_lines) + '\r\n\r\n').encode()
+        writer.write(head)
+        if on_chunk is not None:
+            on_chunk(head)
+        while True:
+            data = await upstream_reader.read(65536)
+            if not data:
+                break
+            if remaining is not None:
+                remaining -= len(data)
+            # The client may send its next request as soon as it has this
+            # response, before the backend closes; free the slot first.
+            complete = body.feed(data) if body is not None else remaining is not None and remaining <= 0
+            if self.affinity is not None and complete:
+                self.affinity.done(request)
+            writer.write(data)
+            if on_chunk is not None:
+                on_chunk(data)
+            await writer.drain()
+        return keep_alive
+
+    async def start(self, host, port):
+        await self.check_health()
+        self._server = await asyncio.start_server(self.handle_client, host, port, limit=MAX_HEADER_SIZE)
+        self._health_task = asyncio.ensure_future(self._health_loop())
+        return self._server
+
+    async def stop(self):
+        if self._health_task is not None:
+            self._health_task.cancel()
+        if self._server is not None:
+            self._server.close()
+            for writer in list(self._clients):
+                writer.close()
+            await self._server.wait_closed()
+
+    def run(self, host, port):
+        """Serve forever in the current thread."""
+        async def main():
+            server = await self.start(host, port)
+            async with server:
+                await server.serve_forever()
+        asyncio.run(main())
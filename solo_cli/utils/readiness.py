@@ -0,0 +1,79 @@
+import asyncio
+import time
+
+from solo_cli.constants import DEFAULT_READY_TIMEOUT
+from solo_cli.utils.http_client import request
+
+PROBE_TIMEOUT = 2
+INITIAL_BACKOFF = 0.05
+MAX_BACKOFF = 1.0
+
+
+class LaunchError(RuntimeError):
+    pass
+
+
+async def probe(host, port, timeout=PROBE_TIMEOUT):
+    """
+        True once the llamafile server answers /health with 200. Older servers
+        without /health count as ready as soon as / answers.
+    """
+    try:
+        response = await request(host, port, 'GET', '/health', timeout=timeout)
+        response.close()
+        if response.status == 404:
+            response = await request(host, port, 'GET', '/', timeout=timeout)
+            response.close()
+        return response.status == 200
+    except (OSError, asyncio.TimeoutError, ValueError):
+        return False
+
+
+async def wait_until_ready(host, port, timeout=DEFAULT_READY_TIMEOUT, process=None):
+    """
+        Poll the server with exponential backoff until it is ready and return the
+        elapsed seconds. Raises LaunchError if the deadline passes or the process
+        exits first.
+    """
+    started = time.monotonic()
+    deadline = started + timeout
+    backoff = INITIAL_BACKOFF
+    while True:
+        if process is not None and process.poll() is not None:
+            raise LaunchError(f"Server exited with code {process.returncode} before it was ready")
+        if await probe(host, port):
+            return time.monotonic() - started
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise LaunchError(f"Server on port {port} was not ready after {timeout}s")
+        await asyncio.sleep(min(backoff, remaining))
+        backoff = min(backoff * 2, MAX_BACKOFF)
+
+
+async def first_token_latency(host, port, prompt="Hello", timeout=DEFAULT_READY_TIMEOUT):
+    """
+        Seconds from sending a streamed completion request until the first token
+        arrives. Servers started with --embedding refuse completions; for them
+        the time to answer one embedding request is returned instead.
+    """
+    started = time.monotonic()
+    body = {'prompt': prompt, 'n_predict': 1, 'stream': True, 'cache_prompt': False}
+    response = await request(host, port, 'POST', '/completion', body=body, timeout=timeout)
+    try:
+        if response.status == 200:
+            async for _ in response.iter_events():
+                return time.monotonic() - started
+            raise LaunchError("Completion probe returned no tokens")
+        status = response.status
+    finally:
+        response.close()
+
+    started = time.monotonic()
+    response = await request(host, port, 'POST', '/embedding', body={'content': prompt}, timeout=timeout)
+    try:
+        if response.status != 200:
+            raise LaunchError(f"Completion probe failed with HTTP {status}")
+        await response.read()
+    finally:
+        response.close()
+    return time.monotonic() - started
@@ -0,0 +1,212 @@
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+CACHEABLE_PATHS = {'/completion', '/v1/completions', '/v1/chat/completions'}
+# Request fields that do not change the generated tokens.
+IGNORED_FIELDS = {'cache_prompt', 'id_slot', 'slot_id', 'user'}
+DEFAULT_MAX_ENTRIES = 1024
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_MAX_DISK_BYTES = 1024 * 1024 * 1024
+DEFAULT_TTL = 24 * 3600
+
+
+def is_deterministic(body):
+    """Only greedy sampling (temperature 0 or top_k 1) yields repeatable output."""
+    temperature = body.get('temperature')
+    if isinstance(temperature, (int, float)) and temperature <= 0:
+        return True
+    return body.get('top_k') == 1
+
+
+def cache_key(path, body, model_name=None):
+    """Key for a request, or None when the request must not be cached."""
+    if path not in CACHEABLE_PATHS or not isinstance(body, dict) or not is_deterministic(body):
+        return None
+    # Keyed on the model actually served: llamafile ignores the client's `model`
+    # field, which stays part of the body below but cannot tell models apart.
+    normalized = {key: value for key, value in body.items() if key not in IGNORED_FIELDS}
+    payload = json.dumps(normalized, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(f"{model_name or ''}\0{path}\0{payload}".encode()).hexdigest()
+
+
+class ResponseCache:
+    """
+        Two-tier cache of complete HTTP responses.
+
+        A bounded in-memory LRU sits in front of an optional directory of files
+        that survives restarts, itself bounded to max_disk_bytes by dropping the
+        least recently used files. Entries older than `ttl` seconds are dropped
+        on lookup. Values are raw response bytes, so streamed (SSE) responses
+        are replayed exactly as the server produced them.
+
+        lookup() and store() are coroutines that hand disk I/O to a worker
+        thread, so the proxy's event loop never blocks on it.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES, ttl=DEFAULT_TTL,
+                 disk_dir=None, max_disk_bytes=DEFAULT_MAX_DISK_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.disk_dir = disk_dir
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()  # key -> (created, data)
+        self._bytes = 0
+        self._disk = None  # key -> file size, least recently used first; scanned on first use
+        self._disk_bytes = 0
+        self._disk_lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.stores = 0
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, key[:2], key)
+
+    def _expired(self, created):
+        return self.ttl is not None and time.time() - created > self.ttl
+
+    def _remember(self, key, created, data):
+        if key in self._memory:
+            self._bytes -= len(self._memory.pop(key)[1])
+        if len(data) > self.max_bytes:
+            return
+        self._memory[key] = (created, data)
+        self._bytes += len(data)
+        while len(self._memory) > self.max_entries or self._bytes > self.max_bytes:
+            _, (_, evicted) = self._memory.popitem(last=False)
+            self._bytes -= len(evicted)
+
+    def _from_memory(self, key):
+        entry = self._memory.get(key)
+        if entry is not None and self._expired(entry[0]):
+            self._bytes -= len(self._memory.pop(key)[1])
+            entry = None
+        if entry is None:
+            return None
+        self._memory.move_to_end(key)
+        return entry[1]
+
+    def _disk_index(self):
+        """The files already on disk, oldest first. Call with _disk_lock held."""
+        if self._disk is None:
+            files = []
+            for root, _, names in os.walk(self.disk_dir):
+                for name in names:
+                    if not name.endswith('.tmp'):
+                        stat = os.stat(os.path.join(root, name))
+                        files.append((stat.st_mtime, name, stat.st_size))
+            self._disk = OrderedDict((name, size) for _, name, size in sorted(files))
+            self._disk_bytes = sum(self._disk.values())
+        return self._disk
+
+    def _forget_disk(self, key):
+        """Remove a file and its accounting. Call with _disk_lock held."""
+        self._disk_bytes -= self._disk_index().pop(key, 0)
+        try:
+            os.remove(self._disk_path(key))
+        except OSError:
+            pass
+
+    def _read_disk(self, key):
+        if self.disk_dir is None:
+            return None
+        path = self._disk_path(key)
+        try:
+            with open(path, 'rb') as file:
+                created = float(file.readline())
+                data = file.read()
+        except (OSError, ValueError):
+            return None
+        with self._disk_lock:
+            if self._expired(created):
+                self._forget_disk(key)
+                return None
+            if key in self._disk_index():
+                self._disk.move_to_end(key)
+        return created, data
+
+    def _write_disk(self, key, created, data):
+        path = self._disk_path(key)
+        record = f"{created}\n".encode() + data
+        if len(record) > self.max_disk_bytes:
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(f"{path}.tmp", 'wb') as file:
+            file.write(record)
+        with self._disk_lock:
+            index = self._disk_index()
+            os.replace(f"{path}.tmp", path)
+            self._disk_bytes += len(record) - index.pop(key, 0)
+            index[key] = len(record)
+            while self._disk_bytes > self.max_disk_bytes:
+                self._forget_disk(next(iter(index)))
+
+    def _found(self, key, entry):
+        if entry is None:
+            self.misses += 1
+            return None
+        self._remember(key, *entry)
+        self.hits += 1
+        self.disk_hits += 1
+        return entry[1]
+
+    async def lookup(self, key):
+        """The cached response for key, or None; a disk read runs in the default executor."""
+        data = self._from_memory(key)
+        if data is not None:
+            self.hits += 1
+            return data
+        entry = None
+        if self.disk_dir is not None:
+            entry = await asyncio.get_running_loop().run_in_executor(None, self._read_disk, key)
+        return self._found(key, entry)
+
+    async def store(self, key, data):
+        """Cache a response; the disk write runs in the default executor."""
+        created = time.time()
+        self._remember(key, created, data)
+        self.stores += 1
+        if self.disk_dir is not None:
+            await asyncio.get_running_loop().run_in_executor(None, self._write_disk, key, created, data)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {'hits': self.hits, 'disk_hits': self.disk_hits, 'misses': self.misses,
+                'stores': self.stores, 'entries': len(self._memory), 'bytes': self._bytes,
+                'hit_ratio': self.hits / lookups if lookups else 0.0}
+
+
+def split_response(data):
+    """Split raw response bytes into (head lines without Connection, body)."""
+    head, _, body = data.partition(b'\r\n\r\n')
+    lines = [line for line in head.split(b'\r\n') if not line.lower().startswith(b'connection:')]
+    return lines, body
+
+
+def is_complete(data):
+    """True for a 200 response whose body is fully framed."""
+    lines, body = split_response(data)
+    if not lines or b' 200 ' not in lines[0] + b' ':
+        return False
+    for line in lines[1:]:
+        key, _, value = line.partition(b':')
+        key, value = key.strip().lower(), value.strip().lower()
+        if key == b'content-length':
+            return len(body) == int(value)
+        if key == b'transfer-encoding' and value == b'chunked':
+            return body.endswith(b'0\r\n\r\n')
+    return False
+
+
+def replay(data, keep_alive):
+    """Cached response bytes with Connection and X-Solo-Cache headers for this client."""
+    lines, body = split_response(data)
+    lines.append(f"Connection: {'keep-alive' if keep_alive else 'close'}".encode())
+    lines.append(b'X-Solo-Cache: HIT')
+    return b'\r\n'.join(lines) + b'\r\n\r\n' + body
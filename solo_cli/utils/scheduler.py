@@ -0,0 +1,100 @@
+import heapq
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+
+from tqdm import tqdm
+
+
+class TransferScheduler:
+    """
+        Shared limits for concurrent downloads.
+
+        At most `max_connections` transfers run at once and, if `max_bandwidth`
+        (bytes/s) is set, their combined rate is capped by a token bucket. Free
+        connections go to the waiter with the lowest priority value first, so
+        passing the model size as priority makes small models finish first.
+    """
+
+    def __init__(self, max_connections, max_bandwidth=None):
+        self.max_connections = max_connections
+        self.max_bandwidth = max_bandwidth
+        self._active = 0
+        self._waiting = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._tokens = float(max_bandwidth or 0)
+        self._refilled = time.monotonic()
+        self._bucket_lock = threading.Lock()
+
+    @contextmanager
+    def connection(self, priority=0):
+        with self._condition:
+            ticket = (priority, next(self._sequence))
+            heapq.heappush(self._waiting, ticket)
+            while self._active >= self.max_connections or self._waiting[0] != ticket:
+                self._condition.wait()
+            heapq.heappop(self._waiting)
+            self._active += 1
+            self._condition.notify_all()
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._active -= 1
+                self._condition.notify_all()
+
+    def throttle(self, nbytes):
+        if not self.max_bandwidth:
+            return
+        with self._bucket_lock:
+            now = time.monotonic()
+            self._tokens = min(self.max_bandwidth,
+                               self._tokens + (now - self._refilled) * self.max_bandwidth)
+            self._refilled = now
+            self._tokens -= nbytes
+            deficit = -self._tokens
+        if deficit > 0:
+            time.sleep(deficit / self.max_bandwidth)
+
+
+class CombinedProgress:
+    """One overall bar plus one bar per download, all updated together."""
+
+    def __init__(self, total):
+        self.total = tqdm(total=total, unit='iB', unit_scale=True, desc='total', position=0)
+        self._positions = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def factory(self, name):
+        def progress(size, initial=0):
+            with self._lock:
+                position = next(self._positions)
+                self.total.update(initial)
+            return _ChildBar(self.total, tqdm(total=size, initial=initial, unit='iB',
+                                              unit_scale=True, desc=name, position=position))
+        return progress
+
+    def close(self):
+        self.total.close()
+
+
+class _ChildBar:
+    def __init__(self, parent, bar):
+        self.parent = parent
+        self.bar = bar
+
+    def update(self, n):
+        self.bar.update(n)
+        self.parent.update(n)
+
+    @property
+    def n(self):
+        return self.bar.n
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.bar.close()
@@ -0,0 +1,20 @@
+import re
+
+UNITS = {'': 1, 'K': 1000, 'M': 1000 ** 2, 'G': 1000 ** 3, 'T': 1000 ** 4,
+         'KI': 1024, 'MI': 1024 ** 2, 'GI': 1024 ** 3, 'TI': 1024 ** 4}
+
+
+def parse_size(text):
+    """Parse sizes such as `512`, `50M`, `1.5GB` or `8GiB` into bytes."""
+    match = re.fullmatch(r'\s*(\d+(?:\.\d*)?|\.\d+)\s*([KMGT]I?)?B?\s*', str(text).upper())
+    if not match:
+        raise ValueError(f"Invalid size: {text}")
+    return int(float(match.group(1)) * UNITS[match.group(2) or ''])
+
+
+def format_size(size):
+    for unit in ['B', 'KB', 'MB', 'GB']:
+        if abs(size) < 1000:
+            return f"{size:.1f} {unit}" if unit != 'B' else f"{size} B"
+        size /= 1000
+    return f"{size:.1f} TB"
@@ -0,0 +1,226 @@
+import hashlib
+import json
+import os
+import shutil
+import zipfile
+
+from solo_cli.utils.model_store import READ_SIZE, link_into, lookup, object_path, ref_path, store_dir
+
+ARGS_MEMBER = '.args'
+RUNTIME_NAME = 'llamafile'
+
+
+def split_dir():
+    return os.path.join(store_dir(), 'split')
+
+
+def manifest_path(name):
+    return os.path.join(split_dir(), f"{name}.json")
+
+
+def model_dir(name):
+    """Directory holding the runtime and weight links of a split model."""
+    return os.path.join(split_dir(), name)
+
+
+def load_manifest(name):
+    try:
+        with open(manifest_path(name), 'r') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def _store(tmp_path, digest):
+    """Move a finished temporary file into the store under its digest."""
+    path = object_path(digest)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if os.path.exists(path):
+        os.remove(tmp_path)
+    else:
+        os.replace(tmp_path, path)
+    return path
+
+
+def _extract(archive, info, tmp_path):
+    """Stream one member out of the archive, hashing it on the way. Returns its digest."""
+    digest = hashlib.sha256()
+    with archive.open(info) as src, open(tmp_path, 'wb') as dst:
+        while True:
+            data = src.read(READ_SIZE)
+            if not data:
+                break
+            digest.update(data)
+            dst.write(data)
+    return digest.hexdigest()
+
+
+def _file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for data in iter(lambda: file.read(READ_SIZE), b''):
+            digest.update(data)
+    return digest.hexdigest()
+
+
+def _write_runtime(path, archive, keep, tmp_path):
+    """
+        Copy the executable part of the llamafile (everything before the first
+        zip entry) and re-append the zip with only the `keep` members. Zip
+        offsets are absolute, as in the original, so the runtime still finds
+        its embedded assets.
+    """
+    prefix = min((info.header_offset for info in archive.infolist()), default=os.path.getsize(path))
+    with open(path, 'rb') as src, open(tmp_path, 'wb') as dst:
+        remaining = prefix
+        while remaining:
+            data = src.read(min(READ_SIZE, remaining))
+            if not data:
+                break
+            dst.write(data)
+            remaining -= len(data)
+    with zipfile.ZipFile(tmp_path, 'a') as out:
+        for info in keep:
+            copy = zipfile.ZipInfo(info.filename, info.date_time)
+            copy.compress_type = info.compress_type
+            copy.external_attr = info.external_attr
+            out.writestr(copy, archive.read(info))
+    os.chmod(tmp_path, 0o755)
+    return _file_digest(tmp_path)
+
+
+def _member(arg):
+    return arg[len('/zip/'):] if arg.startswith('/zip/') else arg
+
+
+def read_args(archive):
+    """The default arguments baked into a llamafile, one per line of its .args member."""
+    try:
+        text = archive.read(ARGS_MEMBER).decode('utf-8')
+    except KeyError:
+        return []
+    return [line for line in text.splitlines() if line and line != '...']
+
+
+def split_llamafile(path, name):
+    """
+        Split the llamafile at path into a runtime binary and its GGUF weights,
+        both stored by content in the model store, and record a manifest for name.
+
+        The runtime keeps every zip member except the weights and .args, so
+        llamafiles built from the same release share one runtime object. The
+        baked-in arguments are kept in the manifest, with references to the
+        weights rewritten at launch time. Returns (manifest, whether an
+        identical runtime was already in the store).
+    """
+    tmp_dir = os.path.join(store_dir(), 'tmp')
+    os.makedirs(tmp_dir, exist_ok=True)
+    with zipfile.ZipFile(path) as archive:
+        members = archive.infolist()
+        weights = [info for info in members if info.filename.endswith('.gguf')]
+        if not weights:
+            raise ValueError(f"{path} has no GGUF weights inside; it may already be a bare runtime")
+        keep = [info for info in members if info not in weights and info.filename != ARGS_MEMBER]
+        args = read_args(archive)
+        # Main weights first: the file passed to -m, else the largest one (a
+        # multimodal projector is much smaller than the model).
+        main = next((_member(value) for flag, value in zip(args, args[1:]) if flag in ('-m', '--model')),
+                    max(weights, key=lambda info: info.file_size).filename)
+        weights.sort(key=lambda info: info.filename != main)
+
+        manifest = {'source': os.path.basename(path), 'weights': {}, 'args': args}
+        for info in weights:
+            tmp_path = os.path.join(tmp_dir, f"{name}.{os.path.basename(info.filename)}")
+            digest = _extract(archive, info, tmp_path)
+            _store(tmp_path, digest)
+            manifest['weights'][info.filename] = digest
+
+        tmp_path = os.path.join(tmp_dir, f"{name}.runtime")
+        digest = _write_runtime(path, archive, keep, tmp_path)
+        shared = os.path.exists(object_path(digest))
+        _store(tmp_path, digest)
+        manifest['runtime'] = digest
+
+    directory = model_dir(name)
+    if os.path.isdir(directory):
+        shutil.rmtree(directory)
+    os.makedirs(directory)
+    link_into(object_path(manifest['runtime']), os.path.join(directory, RUNTIME_NAME))
+    for member, digest in manifest['weights'].items():
+        link_into(object_path(digest), os.path.join(directory, os.path.basename(member)))
+
+    with open(f"{manifest_path(name)}.tmp", 'w') as file:
+        json.dump(manifest, file, indent=2)
+    os.replace(f"{manifest_path(name)}.tmp", manifest_path(name))
+    return manifest, shared
+
+
+def split_weights(name):
+    """Paths of the extracted weight files of a split model, main weights first; [] if not split."""
+    manifest = load_manifest(name)
+    if manifest is None:
+        return []
+    return [os.path.join(model_dir(name), os.path.basename(member)) for member in manifest['weights']]
+
+
+def split_command(name):
+    """
+        The command that runs a split model: the shared runtime, the baked-in
+        arguments with weight references pointing at the extracted files, and
+        -m if the arguments named no weights. None if the model is not split
+        or its files are missing.
+    """
+    manifest = load_manifest(name)
+    if manifest is None:
+        return None
+    directory = model_dir(name)
+    runtime = os.path.join(directory, RUNTIME_NAME)
+    paths = {member: os.path.join(directory, os.path.basename(member)) for member in manifest['weights']}
+    if not all(os.path.exists(path) for path in [runtime, *paths.values()]):
+        return None
+
+    args, named = [], False
+    for arg in manifest['args']:
+        if _member(arg) in paths:
+            arg, named = paths[_member(arg)], True
+        args.append(arg)
+    if not named:
+        args = ['-m', next(iter(paths.values()))] + args
+    return [runtime] + args
+
+
+def _still_used(source, name):
+    """Whether a recorded link of the model, or another ref, still points at the store object."""
+    from solo_cli.utils.cache import load_usage, model_name
+
+    for link in load_usage().get(model_name(name), {}).get('links', []):
+        try:
+            # samefile follows symlinks, which do not show up in st_nlink.
+            if os.path.samefile(link, source):
+                return True
+        except OSError:
+            continue
+    refs = os.path.dirname(ref_path(name))
+    for entry in os.listdir(refs) if os.path.isdir(refs) else []:
+        if entry.endswith('.json') and entry != f"{name}.json" and lookup(entry[:-len('.json')]) == source:
+            return True
+    return False
+
+
+def prune_bundle(path):
+    """
+        Remove a llamafile that has been split, and its store object once
+        nothing else links to it. Returns the bytes freed.
+    """
+    freed = 0
+    name = os.path.basename(path)
+    stat = os.stat(path)
+    os.remove(path)
+    if stat.st_nlink == 1:
+        freed = stat.st_size
+    source = lookup(name)
+    if source is not None and os.stat(source).st_nlink == 1 and not _still_used(source, name):
+        freed = os.path.getsize(source)
+        os.remove(source)
+        os.remove(ref_path(name))
+    return freed
@@ -0,0 +1,194 @@
+import asyncio
+import os
+import time
+
+from solo_cli.config import config_batch, load_config
+from solo_cli.constants import DEFAULT_READY_TIMEOUT
+from solo_cli.utils.metrics import collect_processes
+from solo_cli.utils.proxy import Backend
+
+DRAIN_TIMEOUT = 300  # seconds to let in-flight requests finish on the old model
+MONITOR_INTERVAL = 1.0
+MAX_RESTART_DELAY = 60
+STABLE_TIME = 300  # seconds a restarted replica must stay up before its backoff resets
+
+
+class Supervisor:
+    """
+        Keeps a model served on the proxy's public port.
+
+        A swap loads the new model on the other bank of side ports while the old
+        one keeps serving, flips the proxy's backend list once the new replicas
+        are ready, then stops the old ones after their in-flight requests drain.
+        Replicas that crash are restarted in place with exponential backoff,
+        which resets once a restarted replica has stayed up for STABLE_TIME.
+    """
+
+    def __init__(self, proxy, pool_factory, base_port, replicas=1, timeout=DEFAULT_READY_TIMEOUT,
+                 drain_timeout=DRAIN_TIMEOUT, report=print):
+        self.proxy = proxy
+        self.pool_factory = pool_factory  # (model_name, ports) -> ReplicaPool
+        self.base_port = base_port
+        self.replicas = replicas
+        self.timeout = timeout
+        self.drain_timeout = drain_timeout
+        self.report = report
+        self.model_name = None
+        self.pool = None
+        self.bank = 1
+        self.restarts = 0
+        self._swap_lock = asyncio.Lock()
+        self._restarting = set()
+        self._failures = {}  # port -> (crashes in a row, monotonic time of the last restart)
+        self._monitor_task = None
+        proxy.admin_handlers['/_solo/swap'] = self._handle_swap
+        proxy.admin_handlers['/_solo/supervisor'] = self._handle_status
+        if proxy.metrics is not None:
+            proxy.metrics.add_collector(self._collect_metrics)
+
+    def _ports(self, bank):
+        first = self.base_port + 1 + bank * self.replicas
+        return list(range(first, first + self.replicas))
+
+    async def swap(self, model_name):
+        """Load model_name next to the current model and switch traffic to it."""
+        async with self._swap_lock:
+            loop = asyncio.get_running_loop()
+            bank = 1 - self.bank
+            pool = await loop.run_in_executor(None, self.pool_factory, model_name, self._ports(bank))
+            self.report(f"loading {model_name} on ports {pool.ports[0]}-{pool.ports[-1]}...")
+            ready, first_token = await loop.run_in_executor(None, pool.start, self.timeout)
+
+            old_pool, old_backends = self.pool, list(self.proxy.backends)
+            self.proxy.backends = [Backend('127.0.0.1', port) for port in pool.ports]
+            self.pool, self.bank, self.model_name = pool, bank, model_name
+            self.proxy.model_name = model_name
+            self._failures.clear()
+            self.report(f"{model_name} is serving (ready after {ready:.1f}s, "
+                        f"first token in {first_token * 1000:.0f}ms).")
+
+            if old_pool is not None:
+                await self._drain(old_backends)
+                await loop.run_in_executor(None, old_pool.stop)
+                self.report(f"stopped previous replicas on ports {old_pool.ports[0]}-{old_pool.ports[-1]}.")
+            return ready
+
+    async def _drain(self, backends):
+        deadline = time.monotonic() + self.drain_timeout
+        while any(backend.inflight for backend in backends) and time.monotonic() < deadline:
+            await asyncio.sleep(0.1)
+
+    async def _monitor(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(MONITOR_INTERVAL)
+            pool = self.pool
+            if pool is None:
+                continue
+            for index in pool.exited():
+                if (pool, index) not in self._restarting:
+                    self._restarting.add((pool, index))
+                    loop.create_task(self._restart(pool, index))
+
+    async def _restart(self, pool, index):
+        loop = asyncio.get_running_loop()
+        port = pool.ports[index]
+        backend = next((b for b in self.proxy.backends if b.port == port), None)
+        if backend is not None:
+            backend.healthy = False
+        failures, restarted_at = self._failures.get(port, (0, None))
+        if restarted_at is not None and time.monotonic() - restarted_at >= STABLE_TIME:
+            failures = 0  # it ran fine for a while: a new crash, not a crash loop
+        try:
+            delay = min(2 ** failures - 1, MAX_RESTART_DELAY)
+            self.report(f"replica on port {port} exited; restarting in {delay}s...")
+            await asyncio.sleep(delay)
+            if pool is not self.pool:
+                return
+            await loop.run_in_executor(None, pool.restart, index, self.timeout)
+            self.restarts += 1
+            self._failures[port] = (failures + 1, time.monotonic())
+            if backend is not None:
+                backend.healthy = True
+            self.report(f"replica on port {port} is back.")
+        except Exception as e:
+            self._failures[port] = (failures + 1, None)
+            self.report(f"restarting replica on port {port} failed: {e}")
+        finally:
+            self._restarting.discard((pool, index))
+
+    def _collect_metrics(self, registry):
+        pool = self.pool
+        processes = zip(pool.ports, pool.processes) if pool is not None else ()
+        collect_processes(registry, [({'model': self.model_name, 'port': port}, process)
+                                     for port, process in processes])
+        registry.counter('solo_replica_restarts_total', 'Replicas restarted after crashing.').set(self.restarts)
+
+    async def _handle_swap(self, request):
+        body = request.json() or {}
+        if request.method != 'POST' or not body.get('model'):
+            return 400, {'error': 'POST {"model": name}'}
+        if self._swap_lock.locked():
+            return 409, {'error': 'a swap is already in progress'}
+        try:
+            ready = await self.swap(body['model'])
+        except Exception as e:
+            return 409, {'error': str(e), 'model': self.model_name}
+        return 200, {'model': self.model_name, 'ready_s': ready}
+
+    async def _handle_status(self, request):
+        return 200, {'model': self.model_name, 'ports': self.pool.ports if self.pool else [],
+                     'restarts': self.restarts, 'pid': os.getpid()}
+
+    async def start(self, model_name, host='127.0.0.1'):
+        await self.swap(model_name)
+        server = await self.proxy.start(host, self.base_port)
+        self._monitor_task = asyncio.ensure_future(self._monitor())
+        with config_batch() as config:
+            config['supervisor'] = {'port': self.base_port, 'pid': os.getpid()}
+        return server
+
+    async def stop(self):
+        if self._monitor_task is not None:
+            self._monitor_task.cancel()
+        await self.proxy.stop()
+        if self.pool is not None:
+            await asyncio.get_running_loop().run_in_executor(None, self.pool.stop)
+        with config_batch() as config:
+            if config.get('supervisor', {}).get('pid') == os.getpid():
+                del config['supervisor']
+
+    def run(self, model_name, host='127.0.0.1'):
+        """Serve until interrupted."""
+        async def main():
+            server = await self.start(model_name, host)
+            try:
+                async with server:
+                    await server.serve_forever()
+            finally:
+                await self.stop()
+        try:
+            asyncio.run(main())
+        except KeyboardInterrupt:
+            pass
+
+
+def running_supervisor():
+    """The (port, pid) of a live supervisor recorded in the config, or None."""
+    info = load_config().get('supervisor')
+    if not info:
+        return None
+    try:
+        os.kill(info['pid'], 0)
+    except (OSError, KeyError):
+        return None
+    return info['port'], info['pid']
+
+
+def request_swap(port, model_name, timeout=DEFAULT_READY_TIMEOUT):
+    """Ask the supervisor listening on port to hot-swap to model_name."""
+    import requests
+
+    response = requests.post(f"http://127.0.0.1:{port}/_solo/swap", json={'model': model_name},
+                             timeout=timeout)
+    return response.status_code, response.json()
@@ -0,0 +1,121 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from solo_cli.config import config_batch, load_config
+from solo_cli.utils.profiling import span
+
+
+class Task:
+    def __init__(self, name, fn, deps=(), fingerprint=None):
+        self.name = name
+        self.fn = fn
+        self.deps = tuple(deps)
+        # Returns a string describing the step's finished state, or None when
+        # that cannot be determined; a step whose fingerprint matches the one
+        # saved after its last successful run is skipped.
+        self.fingerprint = fingerprint
+
+
+class TaskGraph:
+    """
+        Runs tasks as soon as their dependencies have finished, in parallel.
+
+        A task whose dependency failed is not run and reported as blocked.
+        Fingerprints of completed tasks are kept in the config under
+        `state_key`, so a rerun skips steps whose result is still in place.
+    """
+
+    def __init__(self, state_key='tasks'):
+        self.tasks = {}
+        self.state_key = state_key
+
+    def add(self, name, fn, deps=(), fingerprint=None):
+        self.tasks[name] = Task(name, fn, deps, fingerprint)
+
+    def order(self):
+        """Task names in a valid execution order; raises ValueError on bad graphs."""
+        ordered, state = [], {}
+
+        def visit(name, path):
+            if name not in self.tasks:
+                raise ValueError(f"{path[-1]} depends on unknown task {name}")
+            if state.get(name) == 'visiting':
+                raise ValueError(f"Dependency cycle: {' -> '.join(path + [name])}")
+            if state.get(name) != 'done':
+                state[name] = 'visiting'
+                for dep in self.tasks[name].deps:
+                    visit(dep, path + [name])
+                state[name] = 'done'
+                ordered.append(name)
+
+        for name in self.tasks:
+            visit(name, [])
+        return ordered
+
+    def _fingerprint(self, task):
+        if task.fingerprint is None:
+            return None
+        try:
+            return task.fingerprint()
+        except Exception:
+            return None
+
+    def _run_one(self, task, saved, force):
+        started = time.monotonic()
+        if not force:
+            current = self._fingerprint(task)
+            if current is not None and current == saved.get(task.name):
+                return 'skipped', time.monotonic() - started
+        with span(task.name, 'task'):
+            task.fn()
+        fingerprint = self._fingerprint(task)
+        if fingerprint is not None:
+            with config_batch() as config:
+                config.setdefault(self.state_key, {})[task.name] = fingerprint
+        return 'ran', time.monotonic() - started
+
+    def run(self, max_workers=None, force=False, report=print):
+        """
+            Run every task and return {name: {'status', 'seconds', 'error'}},
+            where status is ran, skipped, failed or blocked.
+        """
+        self.order()
+        saved = load_config().get(self.state_key, {})
+        results = {}
+        pending = dict(self.tasks)
+        running = {}
+        with ThreadPoolExecutor(max_workers=max_workers or len(self.tasks) or 1) as executor:
+            while pending or running:
+                for name, task in list(pending.items()):
+                    statuses = [results.get(dep, {}).get('status') for dep in task.deps]
+                    if any(status in ('failed', 'blocked') for status in statuses):
+                        del pending[name]
+                        results[name] = {'status': 'blocked', 'seconds': 0.0, 'error': None}
+                        report(f"[{name}] blocked by a failed dependency")
+                    elif all(status in ('ran', 'skipped') for status in statuses):
+                        del pending[name]
+                        running[executor.submit(self._run_one, task, saved, force)] = name
+                if not running:
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        status, seconds = future.result()
+                        results[name] = {'status': status, 'seconds': seconds, 'error': None}
+                        report(f"[{name}] {'up to date' if status == 'skipped' else f'done in {seconds:.1f}s'}")
+                    except Exception as e:
+                        results[name] = {'status': 'failed', 'seconds': 0.0, 'error': str(e) or type(e).__name__}
+                        report(f"[{name}] failed: {results[name]['error']}")
+        return results
+
+
+def format_summary(results, wall):
+    """Per-step timing table plus how much running in parallel saved."""
+    width = max([len(name) for name in results] + [4])
+    lines = [f"{'step'.ljust(width)}  {'status':<8}  time"]
+    for name, result in sorted(results.items(), key=lambda item: -item[1]['seconds']):
+        lines.append(f"{name.ljust(width)}  {result['status']:<8}  {result['seconds']:6.1f}s")
+    serial = sum(result['seconds'] for result in results.values())
+    lines.append(f"wall time {wall:.1f}s (sum of steps {serial:.1f}s)")
+    return '\n'.join(lines)
@@ -0,0 +1,164 @@
+import asyncio
+import os
+import socket
+import subprocess
+import time
+
+from solo_cli.config import config_batch, load_config
+
+# llamafile server flags for each tunable, in the order they are tuned.
+FLAGS = {
+    'threads': '--threads',
+    'batch_size': '--batch-size',
+    'parallel': '--parallel',
+    'ctx_size': '--ctx-size',
+    'mlock': '--mlock',
+}
+DEFAULTS = {'batch_size': 512, 'parallel': 1, 'ctx_size': 2048, 'mlock': False}
+WORKLOAD_PROMPT = "Summarize the plot of a classic novel in three sentences."
+WORKLOAD_TOKENS = 32
+# Every candidate sees the same load, or higher --parallel would win just by being measured under more of it.
+WORKLOAD_CONCURRENCY = 4
+WORKLOAD_REQUESTS = 8
+MIN_SLOT_CTX = 2048  # tokens of context each --parallel slot keeps
+MIN_TRIAL_TIME = 5  # seconds; don't start a trial with less budget left than this
+
+
+def profile_key(model_name, host=None):
+    return f"{model_name}@{host or socket.gethostname()}"
+
+
+def load_profile(model_name):
+    """The tuned launch flags for this model on this host, or None."""
+    profile = load_config().get('launch_profiles', {}).get(profile_key(model_name))
+    return profile['flags'] if profile else None
+
+
+def profile_args(flags, skip=()):
+    """Turn a flags dict into llamafile command-line arguments."""
+    args = []
+    for name, flag in FLAGS.items():
+        if name in skip or name not in (flags or {}):
+            continue
+        value = flags[name]
+        if isinstance(value, bool):
+            if value:
+                args.append(flag)
+        else:
+            args += [flag, str(value)]
+    return args
+
+
+def candidates(cpu_count=None):
+    """Values swept for each parameter on this machine."""
+    cpu_count = cpu_count or os.cpu_count() or 1
+    threads = sorted({max(1, cpu_count // 4), max(1, cpu_count // 2), cpu_count})
+    return {
+        'threads': threads,
+        'batch_size': [256, 512, 1024],
+        'parallel': [1, 2, 4],
+        'mlock': [False, True],
+    }
+
+
+def with_context(flags):
+    """
+        flags with a ctx_size that leaves every slot at least MIN_SLOT_CTX
+        tokens. The context is sized, not tuned: a smaller one only looks
+        faster on a short benchmark prompt.
+    """
+    needed = flags.get('parallel', DEFAULTS['parallel']) * MIN_SLOT_CTX
+    return dict(flags, ctx_size=max(flags.get('ctx_size', DEFAULTS['ctx_size']), needed))
+
+
+def run_trial(command, port, flags, timeout):
+    """Launch the server with flags, run the fixed workload and return its summary."""
+    from solo_cli.utils.bench import run_level
+    from solo_cli.utils.readiness import wait_until_ready
+
+    process = subprocess.Popen(list(command) + ['--port', str(port)] + profile_args(flags),
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                               start_new_session=os.name != 'nt')
+
+    async def trial():
+        await wait_until_ready('127.0.0.1', port, timeout, process)
+        return await run_level('127.0.0.1', port, WORKLOAD_CONCURRENCY, WORKLOAD_REQUESTS,
+                               prompt=WORKLOAD_PROMPT, max_tokens=WORKLOAD_TOKENS)
+
+    try:
+        return asyncio.run(asyncio.wait_for(trial(), timeout))
+    finally:
+        process.terminate()
+        try:
+            process.wait(10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+
+def score(summary):
+    """Higher is better: throughput first, then lower tail latency."""
+    if summary is None or summary['errors'] or not summary['tokens']:
+        return (0.0, 0.0)
+    return (round(summary['tokens_per_s'], 1), -(summary['e2e_p95_s'] or 0.0))
+
+
+def tune(command, model_name, port, budget, sweep=None, report=print):
+    """
+        Coordinate-descent search over launch flags within `budget` seconds.
+
+        Each parameter is swept in turn while the others keep their best value
+        so far, so the number of trials grows with the sum rather than the
+        product of the candidate lists. Every trial runs the same fixed
+        workload, and ctx_size follows from parallel (see with_context).
+        The winner is saved per (model, host).
+    """
+    sweep = sweep or candidates()
+    deadline = time.monotonic() + budget
+    # Start from llamafile's defaults, with every CPU as threads.
+    best = with_context({name: DEFAULTS.get(name, values[-1]) for name, values in sweep.items()})
+    results = {}
+
+    def evaluate(flags):
+        key = tuple(sorted(flags.items()))
+        if key not in results:
+            remaining = deadline - time.monotonic()
+            if remaining < MIN_TRIAL_TIME:
+                return None
+            try:
+                results[key] = run_trial(command, port, flags, remaining)
+            except Exception as e:
+                report(f"  {flags}: failed ({e or type(e).__name__})")
+                results[key] = None
+            else:
+                summary = results[key]
+                report(f"  {flags}: {summary['tokens_per_s']:.1f} tok/s, "
+                       f"p95 {summary['e2e_p95_s'] or 0:.2f}s")
+        return results[key]
+
+    best_summary = evaluate(best)
+    trials = [(name, value) for name, values in sweep.items() for value in values]
+    for name, value in trials:
+        if value == best[name]:
+            continue
+        if deadline - time.monotonic() < MIN_TRIAL_TIME:
+            report("Tuning budget exhausted.")
+            break
+        flags = with_context(dict(best, **{name: value}))
+        summary = evaluate(flags)
+        if score(summary) > score(best_summary):
+            best, best_summary = flags, summary
+
+    if best_summary is None:
+        return None
+    profile = {
+        'flags': best,
+        'tokens_per_s': best_summary['tokens_per_s'],
+        'e2e_p95_s': best_summary['e2e_p95_s'],
+        'ttft_p50_s': best_summary['ttft_p50_s'],
+        'trials': len(results),
+        'tuned_at': time.time(),
+    }
+    with config_batch() as config:
+        config.setdefault('launch_profiles', {})[profile_key(model_name)] = profile
+    return profile
@@ -0,0 +1,143 @@
+import ctypes
+import ctypes.util
+import os
+import time
+
+READ_SIZE = 8 * 1024 * 1024
+PROT_READ = 1
+MAP_SHARED = 1
+MADV_WILLNEED = 3
+# mincore() sets bit 0 for resident pages; macOS uses the other bits for extra flags.
+_RESIDENT_BIT = bytes(value & 1 for value in range(256))
+
+
+def _libc():
+    if os.name == 'nt':
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+    except OSError:
+        return None
+    libc.mmap.restype = ctypes.c_void_p
+    libc.mmap.argtypes = [ctypes.c_void_p, ctypes.c_size_t, ctypes.c_int, ctypes.c_int, ctypes.c_int,
+                          ctypes.c_int64]
+    libc.munmap.argtypes = [ctypes.c_void_p, ctypes.c_size_t]
+    libc.mincore.argtypes = [ctypes.c_void_p, ctypes.c_size_t, ctypes.c_void_p]
+    libc.madvise.argtypes = [ctypes.c_void_p, ctypes.c_size_t, ctypes.c_int]
+    libc.mlock.argtypes = [ctypes.c_void_p, ctypes.c_size_t]
+    libc.munlock.argtypes = [ctypes.c_void_p, ctypes.c_size_t]
+    return libc
+
+
+class Mapping:
+    """
+        Read-only shared mapping of a whole file made through libc, so its
+        address can be handed to mincore/madvise/mlock (Python's mmap object
+        does not expose it for read-only maps).
+    """
+
+    def __init__(self, path):
+        self.libc = _libc()
+        if self.libc is None:
+            raise OSError("memory mapping helpers are not available on this platform")
+        self.size = os.path.getsize(path)
+        self.address = None
+        self.locked = False
+        if self.size == 0:
+            return
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            address = self.libc.mmap(None, self.size, PROT_READ, MAP_SHARED, fd, 0)
+        finally:
+            os.close(fd)  # the mapping keeps its own reference to the file
+        if address in (None, ctypes.c_void_p(-1).value):
+            raise OSError(ctypes.get_errno(), f"mmap failed: {os.strerror(ctypes.get_errno())}")
+        self.address = address
+
+    def resident(self):
+        """Number of bytes of the file currently in the page cache."""
+        if self.address is None:
+            return 0
+        page = os.sysconf('SC_PAGE_SIZE')
+        pages = (self.size + page - 1) // page
+        vector = ctypes.create_string_buffer(pages)
+        if self.libc.mincore(self.address, self.size, vector) != 0:
+            raise OSError(ctypes.get_errno(), f"mincore failed: {os.strerror(ctypes.get_errno())}")
+        resident_pages = vector.raw.translate(_RESIDENT_BIT).count(1)
+        return min(resident_pages * page, self.size)
+
+    def advise_willneed(self):
+        if self.address is not None:
+            self.libc.madvise(self.address, self.size, MADV_WILLNEED)
+
+    def lock(self):
+        if self.address is not None and self.libc.mlock(self.address, self.size) != 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, f"mlock failed: {os.strerror(errno)} "
+                                 f"(raise `ulimit -l` or run llamafile with --mlock instead)")
+        self.locked = True
+
+    def close(self):
+        if self.address is not None:
+            if self.locked:
+                self.libc.munlock(self.address, self.size)
+            self.libc.munmap(self.address, self.size)
+            self.address = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def residency(path):
+    """(resident bytes, file size), or (None, size) where mincore is unavailable."""
+    path = os.path.realpath(path)
+    try:
+        with Mapping(path) as mapping:
+            return mapping.resident(), mapping.size
+    except OSError:
+        return None, os.path.getsize(path)
+
+
+def prefetch(path, progress=None):
+    """
+        Pull a file into the page cache ahead of use.
+
+        The kernel is told the whole file will be needed (fadvise/madvise), so
+        it starts large asynchronous readaheads, then the file is read through
+        sequentially into one reused buffer to wait for them. Pages that are
+        already resident cost a memory copy, not a disk read. progress(n) is
+        called with each chunk size. Returns the seconds taken.
+    """
+    path = os.path.realpath(path)
+    started = time.monotonic()
+    try:
+        with Mapping(path) as mapping:
+            mapping.advise_willneed()
+    except OSError:
+        pass
+    buffer = bytearray(READ_SIZE)
+    with open(path, 'rb', buffering=0) as file:
+        if hasattr(os, 'posix_fadvise'):
+            os.posix_fadvise(file.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+            os.posix_fadvise(file.fileno(), 0, 0, os.POSIX_FADV_WILLNEED)
+        while True:
+            count = file.readinto(buffer)
+            if not count:
+                break
+            if progress is not None:
+                progress(count)
+    return time.monotonic() - started
+
+
+def lock(path):
+    """Map the file and lock it in RAM; the returned Mapping holds it until closed."""
+    mapping = Mapping(os.path.realpath(path))
+    try:
+        mapping.lock()
+    except OSError:
+        mapping.close()
+        raise
+    return mapping
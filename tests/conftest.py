@@ -0,0 +1,136 @@
+import os
+import socket
+import subprocess
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+PAYLOAD = os.urandom(3 * 1024 * 1024 + 17)
+
+
+class RangeHandler(BaseHTTPRequestHandler):
+    """Serves PAYLOAD with Range support and records every range served."""
+    served = []
+
+    def do_GET(self):
+        start, end = 0, len(PAYLOAD) - 1
+        header = self.headers.get('Range')
+        if header:
+            first, last = header.split('=', 1)[1].split('-')
+            start, end = int(first), min(int(last or end), end)
+            self.send_response(206)
+            self.send_header('Content-Range', f"bytes {start}-{end}/{len(PAYLOAD)}")
+        else:
+            self.send_response(200)
+        body = PAYLOAD[start:end + 1]
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', '"v1"')
+        self.end_headers()
+        self.wfile.write(body)
+        self.served.append((start, end))
+
+    def log_message(self, *args):
+        pass
+
+
+class quiet:
+    """A silent stand-in for tqdm, for the progress argument of downloads."""
+
+    def __init__(self, total, initial=0):
+        self.n = initial
+
+    def update(self, n):
+        self.n += n
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+@pytest.fixture
+def range_server():
+    RangeHandler.served = []
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), RangeHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}/model.llamafile"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    path = tmp_path / 'store'
+    monkeypatch.setenv('SOLO_CACHE_DIR', str(path))
+    return path
+
+
+@pytest.fixture(autouse=True)
+def config_dir(tmp_path, monkeypatch):
+    """Keep every test away from the real per-user config."""
+    path = tmp_path / 'config'
+    monkeypatch.setenv('SOLO_CONFIG_DIR', str(path))
+    return path
+
+
+STUB_LLAMAFILE = os.path.join(os.path.dirname(__file__), 'stub_llamafile.py')
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def stub_command(port, *args):
+    """Command line that runs the stub llamafile server on port."""
+    return [sys.executable, STUB_LLAMAFILE, '--port', str(port), *map(str, args)]
+
+
+@pytest.fixture
+def stub_server():
+    """Start stub llamafile processes; every one is killed after the test."""
+    processes = []
+
+    def start(*args, port=None):
+        from solo_cli.utils.readiness import wait_until_ready
+        import asyncio
+
+        port = port or free_port()
+        process = subprocess.Popen(stub_command(port, *args), stdout=subprocess.DEVNULL)
+        processes.append(process)
+        asyncio.run(wait_until_ready('127.0.0.1', port, timeout=10, process=process))
+        return port
+
+    yield start
+    for process in processes:
+        process.kill()
+        process.wait()
+
+
+@pytest.fixture
+def run_proxy():
+    """Run ReverseProxy instances on a background event loop; returns their port."""
+    import asyncio
+
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    proxies = []
+
+    def start(proxy, port=None):
+        port = port or free_port()
+        asyncio.run_coroutine_threadsafe(proxy.start('127.0.0.1', port), loop).result(10)
+        proxies.append(proxy)
+        return port
+
+    start.loop = loop
+    yield start
+    for proxy in proxies:
+        asyncio.run_coroutine_threadsafe(proxy.stop(), loop).result(10)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(10)
@@ -0,0 +1,154 @@
+"""
+A tiny stand-in for a llamafile server, used by tests that need a real process.
+
+Understands the flags the CLI passes (`--port`, `--nobrowser`, ...) and serves
+/health, /completion, /v1/chat/completions, /embedding and /v1/embeddings with
+llama.cpp-shaped responses. Extra flags:
+    --load-delay S   answer /health with 503 for S seconds, like a loading model
+    --token-delay S  sleep S seconds before each streamed token
+    --tokens N       number of tokens per completion
+    --threads N      divides --token-delay, so more threads look faster
+    --drop-after N   hang up every streamed response after N tokens
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def make_handler(options, started):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        requests_seen = 0
+        lock = threading.Lock()
+
+        def log_message(self, *args):
+            pass
+
+        def _send_json(self, status, payload, headers=None):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _loaded(self):
+            return time.monotonic() - started >= options.load_delay
+
+        def do_GET(self):
+            if self.path == '/health':
+                if self._loaded():
+                    self._send_json(200, {'status': 'ok', 'port': options.port})
+                else:
+                    self._send_json(503, {'status': 'loading model'})
+            elif self.path == '/stats':
+                self._send_json(200, {'requests': Handler.requests_seen, 'port': options.port,
+                                      'args': sys.argv[1:]})
+            else:
+                self._send_json(200, {'name': 'stub-llamafile'})
+
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length', 0))
+            body = json.loads(self.rfile.read(length) or b'{}')
+            with Handler.lock:
+                Handler.requests_seen += 1
+            if not self._loaded():
+                self._send_json(503, {'error': 'loading model'})
+            elif self.path in ('/completion', '/v1/chat/completions'):
+                self._complete(body, chat=self.path != '/completion')
+            elif self.path in ('/embedding', '/v1/embeddings'):
+                self._embed(body, openai=self.path == '/v1/embeddings')
+            elif self.path == '/tokenize':
+                self._send_json(200, {'tokens': list(range(len(body.get('content', '').split())))})
+            else:
+                self._send_json(404, {'error': 'not found'})
+
+        def _complete(self, body, chat):
+            count = min(body.get('n_predict', body.get('max_tokens', options.tokens)), options.tokens)
+            if count < 0:
+                count = options.tokens
+            tokens = [f" tok{i}" for i in range(count)]
+            if not body.get('stream'):
+                time.sleep(options.token_delay * count)
+                text = ''.join(tokens)
+                if chat:
+                    payload = {'choices': [{'message': {'role': 'assistant', 'content': text},
+                                            'finish_reason': 'stop'}],
+                               'usage': {'completion_tokens': count}}
+                else:
+                    payload = {'content': text, 'tokens_predicted': count, 'stop': True}
+                payload.update(port=options.port, id_slot=body.get('id_slot'))
+                self._send_json(200, payload)
+                return
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            for index, token in enumerate(tokens):
+                if options.drop_after is not None and index == options.drop_after:
+                    self.close_connection = True
+                    return
+                time.sleep(options.token_delay)
+                if chat:
+                    event = {'choices': [{'delta': {'content': token}, 'finish_reason': None}]}
+                else:
+                    event = {'content': token, 'stop': False}
+                self._chunk(f"data: {json.dumps(event)}\n\n".encode())
+            final = {'choices': [{'delta': {}, 'finish_reason': 'stop'}]} if chat else \
+                {'content': '', 'stop': True, 'tokens_predicted': count}
+            self._chunk(f"data: {json.dumps(final)}\n\n".encode())
+            if chat:
+                self._chunk(b"data: [DONE]\n\n")
+            self._chunk(b'')
+
+        def _chunk(self, data):
+            self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+            self.wfile.flush()
+
+        def _embed(self, body, openai):
+            texts = body.get('input', body.get('content', ''))
+            texts = texts if isinstance(texts, list) else [texts]
+            vectors = [embed(text, options.dim) for text in texts]
+            if openai:
+                self._send_json(200, {'data': [{'index': i, 'embedding': vector}
+                                               for i, vector in enumerate(vectors)]})
+            else:
+                self._send_json(200, {'embedding': vectors[0]})
+
+    return Handler
+
+
+def embed(text, dim):
+    """Deterministic fake embedding derived from the text's hash."""
+    digest = hashlib.sha256(text.encode()).digest()
+    return [digest[i % len(digest)] / 255.0 for i in range(dim)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--load-delay', type=float, default=0.0)
+    parser.add_argument('--token-delay', type=float, default=0.0)
+    parser.add_argument('--tokens', type=int, default=8)
+    parser.add_argument('--dim', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=1)
+    parser.add_argument('--drop-after', type=int, default=None)
+    options, _ = parser.parse_known_args(argv)
+    options.token_delay /= max(options.threads, 1)
+
+    server = ThreadingHTTPServer((options.host, options.port), make_handler(options, time.monotonic()))
+    server.daemon_threads = True
+    print(f"stub llamafile listening on {options.port} (pid {os.getpid()})", flush=True)
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from solo_cli.utils.admission import AdmissionController, Gateway, RateLimiter, Rejected, client_key
+from solo_cli.utils.proxy import Backend, ProxyRequest
+
+
+def test_rate_limiter_allows_burst_then_refills():
+    limiter = RateLimiter(rate=2, burst=3)
+    assert [limiter.check('a', now=0) for _ in range(3)] == [0, 0, 0]
+    assert limiter.check('a', now=0) == 0.5
+    assert limiter.check('b', now=0) == 0  # clients are limited separately
+    assert limiter.check('a', now=1.0) == 0
+
+
+def test_client_key_ignores_spoofable_headers():
+    def key(headers, **options):
+        request = ProxyRequest('POST', '/completion', 'HTTP/1.1', headers, b'{}', ('127.0.0.1', 5000))
+        return client_key(request, **options)
+
+    spoofed = [('X-Forwarded-For', '1.1.1.1, 203.0.113.7'), ('Authorization', 'Bearer made-up')]
+    # ngrok appends the address it saw; what the client sent is to its left.
+    assert key(spoofed, trusted_proxies=1) == '203.0.113.7'
+    assert key(spoofed) == '127.0.0.1'
+    assert key(spoofed, trusted_proxies=3) == '127.0.0.1'
+    assert key(spoofed, trusted_proxies=1, api_keys=True) == 'key:Bearer made-up'
+
+
+def test_interactive_lane_is_served_before_batch():
+    async def scenario():
+        controller = AdmissionController(capacity=1, deadline=5)
+        await controller.acquire()
+        order = []
+
+        async def waiter(name, lane):
+            await controller.acquire(lane)
+            order.append(name)
+
+        tasks = [asyncio.ensure_future(waiter('batch-1', 'batch')),
+                 asyncio.ensure_future(waiter('batch-2', 'batch'))]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.ensure_future(waiter('chat', 'interactive')))
+        await asyncio.sleep(0)
+        for _ in range(3):
+            controller.release(0.1)
+            await asyncio.sleep(0)
+        await asyncio.gather(*tasks)
+        return order
+
+    assert asyncio.run(scenario()) == ['chat', 'batch-1', 'batch-2']
+
+
+def test_rejects_when_expected_wait_exceeds_deadline():
+    async def scenario():
+        controller = AdmissionController(capacity=1, deadline=2)
+        await controller.acquire()
+        controller.release(3.0)  # requests take about 3s
+        await controller.acquire()
+        try:
+            await controller.acquire()
+        except Rejected as e:
+            return e.retry_after
+
+    assert asyncio.run(scenario()) == 3.0
+
+
+def test_gateway_returns_fast_503_and_429(stub_server, run_proxy):
+    backend_port = stub_server('--token-delay', 0.3, '--tokens', 4)
+    port = run_proxy(Gateway([Backend('127.0.0.1', backend_port)], max_inflight=1, deadline=0.5, rate=100))
+    url = f"http://127.0.0.1:{port}/completion"
+
+    def complete(_):
+        return requests.post(url, json={'prompt': 'hi'}, timeout=10)
+
+    with ThreadPoolExecutor(4) as executor:
+        responses = list(executor.map(complete, range(4)))
+    statuses = sorted(response.status_code for response in responses)
+    assert statuses[0] == 200 and 503 in statuses
+    assert all(response.headers['Retry-After'].isdigit() for response in responses if response.status_code == 503)
+
+    # The slot is freed when the backend closes, which may be just after the client has its response.
+    deadline = time.monotonic() + 5
+    status = requests.get(f"http://127.0.0.1:{port}/_solo/admission", timeout=5).json()
+    while status['inflight'] and time.monotonic() < deadline:
+        time.sleep(0.05)
+        status = requests.get(f"http://127.0.0.1:{port}/_solo/admission", timeout=5).json()
+    assert status['inflight'] == 0 and status['rejected']['overloaded'] >= 1
+
+    limited = Gateway([Backend('127.0.0.1', backend_port)], rate=1, burst=1)
+    port = run_proxy(limited)
+    tokenize = f"http://127.0.0.1:{port}/tokenize"
+    first = requests.post(tokenize, json={'content': 'a'}, timeout=5)
+    second = requests.post(tokenize, json={'content': 'a'}, timeout=5)
+    assert first.status_code == 200 and second.status_code == 429
+    assert second.headers['Retry-After'] == '1'
@@ -0,0 +1,110 @@
+import json
+
+import requests
+
+from solo_cli.utils.affinity import PrefixAffinity, prefix_hashes
+from solo_cli.utils.proxy import Backend, ChunkedBody, ProxyRequest, ReverseProxy
+
+SYSTEM = {'role': 'system', 'content': 'You are a helpful assistant. ' * 20}
+
+
+def chat(*turns):
+    return {'messages': [SYSTEM] + [{'role': role, 'content': text} for role, text in turns]}
+
+
+def post(body, path='/v1/chat/completions'):
+    return ProxyRequest('POST', path, 'HTTP/1.1', [], json.dumps(body).encode(), None)
+
+
+def test_prefix_hashes_grow_with_the_conversation():
+    first = prefix_hashes(chat(('user', 'hi')))
+    second = prefix_hashes(chat(('user', 'hi'), ('assistant', 'hello'), ('user', 'how are you?')))
+    assert second[:len(first)] == first and len(second) == len(first) + 2
+    prompt = prefix_hashes({'prompt': 'x' * 600})
+    assert len(prompt) == 3 and prefix_hashes({'prompt': 'x' * 600 + 'y'})[:2] == prompt[:2]
+    assert prefix_hashes({'input': 'embed me'}) == []
+
+
+def test_routes_to_owner_and_spills_when_overloaded():
+    backends = [Backend('127.0.0.1', 1), Backend('127.0.0.1', 2)]
+    affinity = PrefixAffinity()
+    backends[0].served = 1
+    first = affinity.route(post(chat(('user', 'a'))), backends)
+    assert first is backends[1] and affinity.stats['misses'] == 1
+
+    follow_up = post(chat(('user', 'a'), ('assistant', 'b'), ('user', 'c')))
+    assert affinity.route(follow_up, backends) is backends[1]
+    assert affinity.stats['hits'] == 1 and follow_up.json()['cache_prompt'] is True
+
+    backends[1].inflight = 2
+    assert affinity.route(post(chat(('user', 'a'))), backends) is backends[0]
+    assert affinity.stats['spills'] == 1
+
+
+def test_leaves_other_endpoints_alone():
+    affinity = PrefixAffinity(slots=2)
+    request = post({'prompt': 'tokenize me'}, '/tokenize')
+    affinity.route(request, [Backend('127.0.0.1', 1)])
+    assert request.json() == {'prompt': 'tokenize me'} and request.slot is None
+    assert not affinity.table and affinity.stats['misses'] == 0
+
+
+def test_chunked_body_ends_on_the_last_chunk_only():
+    # A chunk whose data ends in what looks like the terminal chunk.
+    data = b'0\r\n\r\n'
+    body = ChunkedBody()
+    assert not body.feed(b'%x\r\n' % len(data) + data)
+    assert not body.feed(b'\r\n')
+    # The real terminator, split across reads.
+    assert not body.feed(b'0\r')
+    assert not body.feed(b'\n\r')
+    assert body.feed(b'\n')
+
+    whole = ChunkedBody()
+    assert whole.feed(b'5;ext=1\r\nhello\r\n0\r\nTrailer: x\r\n\r\n')
+
+
+def test_table_is_bounded():
+    affinity = PrefixAffinity(max_entries=10)
+    backends = [Backend('127.0.0.1', 1)]
+    for i in range(20):
+        affinity.route(post(chat(('user', f"question {i}"))), backends)
+    assert len(affinity.table) == 10
+
+
+def test_pins_slots_and_releases_them():
+    backend = Backend('127.0.0.1', 1)
+    affinity = PrefixAffinity(slots=2)
+    a, b = post(chat(('user', 'a'))), post(chat(('user', 'b')))
+    affinity.route(a, [backend])
+    affinity.route(b, [backend])
+    # b shares a's system prompt, but a still holds that slot.
+    assert {a.json()['id_slot'], b.json()['id_slot']} == {0, 1} and affinity.stats['spills'] == 1
+
+    # The slot holding a's conversation is busy, so its follow-up may not wait for it.
+    follow_up = post(chat(('user', 'a'), ('assistant', 'x'), ('user', 'y')))
+    affinity.route(follow_up, [backend])
+    assert affinity.stats['spills'] == 2
+    affinity.done(follow_up)
+    affinity.done(a)
+    again = post(chat(('user', 'a'), ('assistant', 'x'), ('user', 'y')))
+    affinity.route(again, [backend])
+    assert again.json()['id_slot'] == follow_up.json()['id_slot'] and affinity.stats['hits'] == 1
+
+
+def test_proxy_keeps_conversations_on_one_backend(stub_server, run_proxy):
+    backends = [Backend('127.0.0.1', stub_server()) for _ in range(2)]
+    port = run_proxy(ReverseProxy(backends, affinity=PrefixAffinity(slots=4)))
+    url = f"http://127.0.0.1:{port}/v1/chat/completions"
+
+    for name in ('alice', 'bob', 'carol'):
+        turns = [('user', f"hello from {name}")]
+        served = set()
+        for turn in range(3):
+            reply = requests.post(url, json=chat(*turns), timeout=5).json()
+            served.add((reply['port'], reply['id_slot']))
+            turns += [('assistant', reply['choices'][0]['message']['content']), ('user', f"turn {turn}")]
+        assert len(served) == 1
+
+    status = requests.get(f"http://127.0.0.1:{port}/_solo/status", timeout=5).json()['affinity']
+    assert status['hits'] >= 6 and status['slots'] == 4
@@ -0,0 +1,157 @@
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from solo_cli.utils.batch import BatchError, Tracker, checkpoint_path, run_batch
+
+
+def write_input(path, count):
+    with open(path, 'w') as file:
+        for i in range(count):
+            if i % 3 == 0:
+                file.write(json.dumps({'id': f"q{i}", 'prompt': f"question {i}", 'n_predict': 2}) + '\n')
+            elif i % 3 == 1:
+                file.write(json.dumps({'id': f"q{i}", 'messages': [{'role': 'user', 'content': f"hi {i}"}]}) + '\n')
+            else:
+                file.write(f"bare prompt {i}\n\n")
+
+
+def read_output(path):
+    with open(path) as file:
+        return [json.loads(line) for line in file]
+
+
+def test_tracker_watermark_and_offset():
+    tracker = Tracker()
+    for index, end in enumerate([10, 25, 40, 52]):
+        tracker.seen(index, end)
+    tracker.complete(2)
+    tracker.complete(1)
+    assert (tracker.watermark, tracker.done, tracker.offset) == (0, {1, 2}, 0)
+    tracker.complete(0)
+    assert (tracker.watermark, tracker.done, tracker.offset) == (3, set(), 40)
+    assert tracker.is_done(2) and not tracker.is_done(3)
+
+
+def test_batch_writes_every_result(stub_server, tmp_path):
+    port = stub_server()
+    source, output = tmp_path / 'in.jsonl', tmp_path / 'out.jsonl'
+    write_input(source, 30)
+
+    summary = run_batch(str(source), str(output), port=port, concurrency=4)
+
+    results = read_output(output)
+    assert summary['completed'] == 30 and summary['errors'] == 0
+    assert sorted(result['index'] for result in results) == list(range(30))
+    by_index = {result['index']: result for result in results}
+    assert by_index[0]['id'] == 'q0' and 'content' in by_index[0]['response']
+    assert 'choices' in by_index[1]['response']
+    assert by_index[2]['id'] is None
+    assert os.path.exists(checkpoint_path(str(output)))
+
+
+def test_finished_batch_is_not_redone(stub_server, tmp_path):
+    port = stub_server()
+    source, output = tmp_path / 'in.jsonl', tmp_path / 'out.jsonl'
+    write_input(source, 10)
+    run_batch(str(source), str(output), port=port, concurrency=4)
+    before = requests.get(f"http://127.0.0.1:{port}/stats", timeout=5).json()['requests']
+    written = output.read_bytes()
+
+    summary = run_batch(str(source), str(output), port=port, concurrency=4)
+
+    assert summary['completed'] == 0 and summary['skipped'] == 10
+    assert output.read_bytes() == written
+    assert requests.get(f"http://127.0.0.1:{port}/stats", timeout=5).json()['requests'] == before
+
+    # Without its checkpoint the output is only overwritten on request.
+    os.remove(checkpoint_path(str(output)))
+    with pytest.raises(BatchError):
+        run_batch(str(source), str(output), port=port)
+    assert output.read_bytes() == written
+    assert run_batch(str(source), str(output), port=port, restart=True)['completed'] == 10
+
+
+def test_interrupted_batch_resumes_without_redoing_work(stub_server, tmp_path):
+    port = stub_server()
+    source, output = tmp_path / 'in.jsonl', tmp_path / 'out.jsonl'
+    write_input(source, 40)
+    finished = []
+
+    def interrupt_after_25(size, result):
+        if result is not None:
+            finished.append(result['index'])
+            if len(finished) == 25:
+                raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        run_batch(str(source), str(output), port=port, concurrency=4, progress=interrupt_after_25)
+    assert os.path.exists(checkpoint_path(str(output)))
+    before = requests.get(f"http://127.0.0.1:{port}/stats", timeout=5).json()['requests']
+
+    summary = run_batch(str(source), str(output), port=port, concurrency=4)
+
+    results = read_output(output)
+    assert sorted(result['index'] for result in results) == list(range(40))
+    assert summary['skipped'] == 25 and summary['completed'] == 15
+    after = requests.get(f"http://127.0.0.1:{port}/stats", timeout=5).json()['requests']
+    assert after - before == 15
+
+
+class FlakyHandler(BaseHTTPRequestHandler):
+    """Answers 200 with a non-JSON body for the prompt 'bad', sleeps on 'slow', and echoes JSON otherwise."""
+
+    def do_POST(self):
+        prompt = json.loads(self.rfile.read(int(self.headers['Content-Length'])))['prompt']
+        if prompt == 'slow':
+            time.sleep(3)
+        body = b'<html>upstream error</html>' if prompt == 'bad' else json.dumps({'content': prompt}).encode()
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def flaky_server():
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), FlakyHandler)
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield httpd.server_address[1]
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_non_json_response_fails_only_its_line(flaky_server, tmp_path):
+    source, output = tmp_path / 'in.jsonl', tmp_path / 'out.jsonl'
+    source.write_text('good\nbad\nalso good\n')
+
+    summary = run_batch(str(source), str(output), port=flaky_server, concurrency=2)
+
+    assert summary['completed'] == 2 and summary['errors'] == 1
+    by_index = {result['index']: result for result in read_output(output)}
+    assert by_index[1]['error'].startswith('invalid JSON response') and by_index[2]['response']['content'] == 'also good'
+
+
+def test_interrupt_does_not_wait_for_running_requests(flaky_server, tmp_path):
+    source, output = tmp_path / 'in.jsonl', tmp_path / 'out.jsonl'
+    source.write_text('good\n' + 'slow\n' * 4)
+
+    def interrupt(size, result):
+        if result is not None:
+            raise KeyboardInterrupt
+
+    started = time.monotonic()
+    with pytest.raises(KeyboardInterrupt):
+        run_batch(str(source), str(output), port=flaky_server, concurrency=2, progress=interrupt)
+    assert time.monotonic() - started < 2
+    with open(checkpoint_path(str(output))) as file:
+        assert json.load(file)['watermark'] == 1
@@ -0,0 +1,52 @@
+import json
+
+from typer.testing import CliRunner
+
+from solo_cli.main import app
+from solo_cli.utils.bench import percentile, run_bench
+
+runner = CliRunner()
+
+
+def test_percentile():
+    assert percentile([], 50) is None
+    assert percentile([1, 2, 3, 4], 50) == 2.5
+    assert percentile([5], 99) == 5
+
+
+def test_bench_against_stub(stub_server):
+    port = stub_server('--tokens', 5, '--token-delay', 0.01)
+    summaries = run_bench('127.0.0.1', port, [1, 3], 6, max_tokens=5)
+
+    assert [s['concurrency'] for s in summaries] == [1, 3]
+    for summary in summaries:
+        assert summary['errors'] == 0
+        assert summary['tokens'] == 30
+        assert summary['ttft_p50_s'] > 0
+        assert summary['itl_p50_s'] >= 0.005
+        assert summary['e2e_p99_s'] >= summary['e2e_p50_s']
+
+
+def test_dropped_streams_count_as_errors(stub_server):
+    port = stub_server('--tokens', 5, '--drop-after', 2)
+    summary = run_bench('127.0.0.1', port, [2], 4, max_tokens=5)[0]
+    assert summary['errors'] == 4 and summary['requests'] == 4
+
+
+def test_bench_command_json_and_threshold(stub_server):
+    port = stub_server('--tokens', 3)
+    result = runner.invoke(app, ['bench', '--port', str(port), '--concurrency', '2', '--requests', '4',
+                                 '--endpoint', 'chat', '--json', '-'])
+    assert result.exit_code == 0
+    assert json.loads(result.output)[0]['tokens'] == 12
+
+    result = runner.invoke(app, ['bench', '--port', str(port), '--concurrency', '1', '--requests', '1',
+                                 '--min-tokens-per-s', '1e9'])
+    assert result.exit_code == 1
+    assert 'tok/s' in result.output
+
+
+def test_bench_rejects_bad_concurrency():
+    for levels in ('0', 'a,b', '4,-1', ','):
+        result = runner.invoke(app, ['bench', '--port', '1', '--concurrency', levels])
+        assert result.exit_code == 1 and '--concurrency must be positive integers' in result.output
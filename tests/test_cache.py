@@ -0,0 +1,121 @@
+import hashlib
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+from typer.testing import CliRunner
+
+from solo_cli.config import update_config
+from solo_cli.main import app
+from solo_cli.utils.cache import cached_models, evict, load_usage, make_room, record_use, store_usage, usage_path
+from solo_cli.utils.downloader import DownloadError
+from solo_cli.utils.model_store import fetch, link_into, object_path, write_ref
+from tests.conftest import PAYLOAD, quiet
+
+runner = CliRunner()
+MB = 1000 ** 2
+
+
+def add_model(directory, name, size, last_used):
+    """Put a model of size bytes in the store, linked into directory, last used at last_used."""
+    data = (name.encode() * size)[:size]
+    digest = hashlib.sha256(data).hexdigest()
+    os.makedirs(os.path.dirname(object_path(digest)), exist_ok=True)
+    with open(object_path(digest), 'wb') as file:
+        file.write(data)
+    write_ref(f"{name}.llamafile", f"https://example.com/{name}.llamafile", digest, len(data))
+    dest = os.path.join(directory, f"{name}.llamafile")
+    link_into(object_path(digest), dest)
+    record_use(name, dest)
+    usage = load_usage()
+    usage[name]['last_used'] = last_used
+    with open(usage_path(), 'w') as file:
+        json.dump(usage, file)
+    return dest
+
+
+def test_evicts_least_recently_used_first(store, tmp_path):
+    paths = {name: add_model(str(tmp_path), name, MB, last_used)
+             for name, last_used in (('old', 100), ('newest', 300), ('middle', 200))}
+    assert [model['name'] for model in cached_models()] == ['old', 'middle', 'newest']
+
+    assert evict(2 * MB, dry_run=True) == [('old', 1 * MB)] and os.path.exists(paths['old'])
+    assert evict(1 * MB) == [('old', MB), ('middle', MB)]
+    assert [model['name'] for model in cached_models()] == ['newest']
+    # The copies linked into the working directory go too, or no space would be freed.
+    assert not os.path.exists(paths['old']) and os.path.exists(paths['newest'])
+    assert store_usage() == MB and set(load_usage()) == {'newest'}
+
+
+def test_evicts_copies_but_not_files_that_replaced_them(store, tmp_path):
+    copied = add_model(str(tmp_path), 'copied', MB, 100)
+    replaced = add_model(str(tmp_path), 'replaced', MB, 200)
+    # A copy made where hardlinks are not possible, as link_into falls back to.
+    with open(copied, 'rb') as file:
+        data = file.read()
+    os.remove(copied)
+    with open(copied, 'wb') as file:
+        file.write(data)
+    record_use('copied', copied)
+    # The user put another model of the same size where the cached one was linked.
+    os.remove(replaced)
+    with open(replaced, 'wb') as file:
+        file.write(b'x' * MB)
+
+    assert sorted(evict(0)) == [('copied', MB), ('replaced', MB)]
+    assert not os.path.exists(copied)
+    with open(replaced, 'rb') as file:
+        assert file.read() == b'x' * MB
+
+
+def test_never_evicts_running_or_kept_models(store, tmp_path):
+    running = add_model(str(tmp_path), 'running', MB, 100)
+    add_model(str(tmp_path), 'kept', MB, 150)
+    add_model(str(tmp_path), 'idle', MB, 200)
+    # A process started with a hardlink of the model, under another name.
+    alias = str(tmp_path / 'alias')
+    os.link(running, alias)
+    process = subprocess.Popen([sys.executable, '-c', 'import time; print("up", flush=True); time.sleep(60)', alias],
+                               stdout=subprocess.PIPE)
+    try:
+        process.stdout.readline()  # only now has the child exec'd with alias in its arguments
+        assert evict(0, keep=['kept']) == [('idle', MB)]
+    finally:
+        process.kill()
+        process.wait()
+    assert {model['name'] for model in cached_models()} == {'running', 'kept'}
+
+
+def test_make_room_before_download(store, tmp_path, range_server):
+    add_model(str(tmp_path), 'stale', 2 * MB, 100)
+    add_model(str(tmp_path), 'recent', 2 * MB, 200)
+    update_config('cache_quota', 6 * MB)
+    fetch(range_server, str(tmp_path / 'fresh.llamafile'), progress=quiet)
+    names = [model['name'] for model in cached_models()]
+    assert 'stale' not in names and 'recent' in names and names[-1] == 'fresh'
+    assert store_usage() == 2 * MB + len(PAYLOAD)
+
+    with pytest.raises(DownloadError):
+        make_room(7 * MB)
+
+
+def test_cache_command(store, tmp_path):
+    add_model(str(tmp_path), 'first', MB, 100)
+    add_model(str(tmp_path), 'second', MB, 200)
+    result = runner.invoke(app, ['cache', '--quota', '1.5M', '--evict'])
+    assert result.exit_code == 0, result.output
+    assert 'Evicted first (1.0 MB).' in result.output
+    assert '1.0 MB used of a 1.5 MB quota.' in result.output and '- second  1.0 MB' in result.output
+
+
+def test_invalid_sizes_are_usage_errors(store):
+    for args in (['cache', '--quota', 'lots'], ['cache', '--quota', '1.2.3G'],
+                 ['pull', 'x', '--max-bandwidth', '5 mbit'], ['list-models', '--max-size', 'big']):
+        result = runner.invoke(app, args)
+        assert result.exit_code == 2 and 'Invalid size' in result.output, args
+        assert not isinstance(result.exception, ValueError)
+    assert runner.invoke(app, ['cache', '--quota', '2G']).exit_code == 0
+    assert runner.invoke(app, ['cache', '--quota', 'None']).exit_code == 0
+    assert 'no quota' in runner.invoke(app, ['cache']).output
@@ -0,0 +1,93 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from solo_cli.utils import catalog
+from solo_cli.utils.model_store import resolve_model
+
+LISTING = [{'id': 'Mozilla/demo-llamafile', 'sha': 'rev1'}]
+DETAIL = {'id': 'Mozilla/demo-llamafile', 'siblings': [
+    {'rfilename': 'README.md'},
+    {'rfilename': 'demo-7b.Q4_K_M.llamafile', 'size': 4_000_000_000,
+     'lfs': {'sha256': 'a' * 64, 'size': 4_000_000_000}},
+    {'rfilename': 'demo-7b.F16.llamafile', 'size': 14_000_000_000},
+    {'rfilename': 'demo-embed-v1.Q8_0.llamafile', 'size': 300_000_000},
+]}
+
+
+class HubHandler(BaseHTTPRequestHandler):
+    seen = []
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        HubHandler.seen.append((self.path, self.headers.get('If-None-Match')))
+        if self.path.startswith('/api/models?'):
+            if self.headers.get('If-None-Match') == '"v1"':
+                self.send_response(304)
+                self.end_headers()
+                return
+            body, headers = LISTING, {'ETag': '"v1"'}
+        else:
+            body, headers = DETAIL, {}
+        data = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(data)))
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+
+@pytest.fixture
+def hub():
+    HubHandler.seen = []
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), HubHandler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}/api/models?author=Mozilla"
+    httpd.shutdown()
+
+
+def test_parse_name_metadata():
+    assert catalog.parse_quant('Meta-Llama-3-8B-Instruct.Q5_K_M') == 'Q5_K_M'
+    assert catalog.parse_quant('TinyLlama-1.1B-Chat-v1.0.F16') == 'F16'
+    assert catalog.parse_quant('wizardcoder-python-13b') is None
+    assert catalog.model_kind('mxbai-embed-large-v1-f16') == 'embedding'
+    assert catalog.model_kind('e5-mistral-7b-instruct-Q5_K_M') == 'embedding'
+    assert catalog.model_kind('mistral-7b-instruct-v0.2.Q4_0') == 'chat'
+
+
+def test_refresh_is_conditional_and_incremental(hub, store):
+    first = catalog.get_catalog(url=hub)
+    assert first['models']['demo-7b.Q4_K_M']['sha256'] == 'a' * 64
+    assert first['models']['demo-7b.Q4_K_M']['url'].endswith(
+        '/Mozilla/demo-llamafile/resolve/main/demo-7b.Q4_K_M.llamafile?download=true')
+    assert len(HubHandler.seen) == 2
+
+    # Fresh enough: answered from disk without touching the hub.
+    catalog.get_catalog(url=hub)
+    assert len(HubHandler.seen) == 2
+
+    # Stale: one conditional request answered with 304.
+    catalog.get_catalog(max_age=0, url=hub)
+    assert HubHandler.seen[-1] == (HubHandler.seen[0][0], '"v1"')
+    assert len(HubHandler.seen) == 3
+    assert resolve_model('demo-7b.Q4_K_M') == (first['models']['demo-7b.Q4_K_M']['url'], 'a' * 64)
+
+
+def test_search_filters_and_offline_fallback(hub, store):
+    catalog.refresh(url=hub)
+    offline = catalog.get_catalog(max_age=0, url='http://127.0.0.1:1/api/models')
+    assert 'stale' in offline
+
+    names = [entry['id'] for entry in catalog.search(offline, max_size=5_000_000_000)]
+    assert names == ['demo-7b.Q4_K_M', 'demo-embed-v1.Q8_0']
+    assert [entry['id'] for entry in catalog.search(offline, query='demo', quant='q4')] == ['demo-7b.Q4_K_M']
+    assert [entry['id'] for entry in catalog.search(offline, query='demo', kind='embedding')] == \
+        ['demo-embed-v1.Q8_0']
+    # Built-in models stay resolvable next to the hub's.
+    assert catalog.known_model('rocket-3b.Q5_K_M')
+    assert not catalog.known_model('no-such-model')
@@ -0,0 +1,51 @@
+from typer.testing import CliRunner
+
+from solo_cli.main import app
+from solo_cli.utils.chat import ChatSession, trim_history
+
+runner = CliRunner()
+
+
+def history(*roles):
+    return [{'role': role, 'content': f"{role} {i}"} for i, role in enumerate(roles)]
+
+
+def test_trim_history_keeps_system_and_latest():
+    messages = history('system', 'user', 'assistant', 'user', 'assistant', 'user')
+    counts = [10] * 6
+    assert trim_history(messages, counts, budget=60) == [0, 1, 2, 3, 4, 5]
+    # Over budget: cut to the target, and never open with an assistant reply.
+    assert trim_history(messages, counts, budget=50, target=40) == [0, 3, 4, 5]
+    assert trim_history(messages, counts, budget=5) == [0, 5]
+
+
+def test_streams_reply_over_one_connection(stub_server):
+    port = stub_server('--tokens', 5)
+    session = ChatSession(port=port, system='Be brief.', max_tokens=16, context=1000)
+    assert ''.join(session.send('hello there')) == ' tok0 tok1 tok2 tok3 tok4'
+    assert session.last['tokens'] == 5 and session.last['ttft'] is not None
+    assert session.last['tokens_per_s'] > 0
+
+    assert list(session.send('again'))
+    assert [message['role'] for message in session.messages] == ['system', 'user', 'assistant', 'user', 'assistant']
+    # Token counting and both replies all went over a single keep-alive connection.
+    pools = session.http.get_adapter(session.base).poolmanager.pools
+    [pool] = [pools[key] for key in pools.keys()]
+    assert pool.num_connections == 1 and pool.num_requests > 2
+
+
+def test_long_sessions_stay_within_budget(stub_server):
+    port = stub_server('--tokens', 3)
+    session = ChatSession(port=port, max_tokens=10, context=60)
+    for turn in range(10):
+        list(session.send(f"question number {turn} with a few more words"))
+        assert session.context_tokens() <= session.budget
+    assert session.sent[-1] == len(session.messages) - 2 and len(session.sent) < len(session.messages) - 1
+
+
+def test_chat_command(stub_server):
+    port = stub_server('--tokens', 3)
+    result = runner.invoke(app, ['chat', '--port', str(port), '--context', '512'], input='hi\n/reset\nbye\n/exit\n')
+    assert result.exit_code == 0, result.output
+    assert result.output.count(' tok0 tok1 tok2') == 2
+    assert 'History cleared.' in result.output and 'tok/s' in result.output
@@ -0,0 +1,69 @@
+import json
+import multiprocessing
+import threading
+
+from solo_cli.config import ConfigStore, config_batch, load_config, update_config
+
+
+def _increment(path, times):
+    store = ConfigStore(str(path))
+    for _ in range(times):
+        with store.batch() as config:
+            config['count'] = config.get('count', 0) + 1
+
+
+def test_update_uses_per_user_path(config_dir):
+    update_config('model_name', 'rocket-3b.Q5_K_M')
+
+    assert json.loads((config_dir / 'config.json').read_text()) == {'model_name': 'rocket-3b.Q5_K_M'}
+    assert load_config() == {'model_name': 'rocket-3b.Q5_K_M'}
+
+
+def test_cache_invalidated_by_external_write(tmp_path):
+    path = tmp_path / 'config.json'
+    store = ConfigStore(str(path))
+    store.update({'a': 1})
+    assert store.get('a') == 1
+
+    path.write_text(json.dumps({'a': 2, 'extra': True}))
+
+    assert store.load() == {'a': 2, 'extra': True}
+
+
+def test_batch_writes_once(tmp_path):
+    path = tmp_path / 'config.json'
+    store = ConfigStore(str(path))
+    with store.batch() as config:
+        config['a'] = 1
+        with store.batch() as inner:
+            inner['b'] = 2
+        assert not path.exists()
+
+    assert json.loads(path.read_text()) == {'a': 1, 'b': 2}
+
+
+def test_concurrent_threads_do_not_lose_updates():
+    threads = [threading.Thread(target=_increment_default, args=(25,)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert load_config()['count'] == 100
+
+
+def _increment_default(times):
+    for _ in range(times):
+        with config_batch() as config:
+            config['count'] = config.get('count', 0) + 1
+
+
+def test_concurrent_processes_do_not_lose_updates(tmp_path):
+    path = tmp_path / 'config.json'
+    processes = [multiprocessing.Process(target=_increment, args=(path, 20)) for _ in range(3)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+    assert json.loads(path.read_text())['count'] == 60
@@ -0,0 +1,68 @@
+import json
+import os
+
+import pytest
+
+from solo_cli.utils import downloader
+from tests.conftest import PAYLOAD, RangeHandler
+
+
+@pytest.fixture
+def small_segments(monkeypatch):
+    monkeypatch.setattr(downloader, 'MIN_SEGMENT_SIZE', 512 * 1024)
+
+
+def test_parallel_download(range_server, small_segments, tmp_path):
+    target = str(tmp_path / 'model.llamafile')
+    transferred = downloader.download(range_server, target, connections=4)
+
+    assert transferred == len(PAYLOAD)
+    assert open(target, 'rb').read() == PAYLOAD
+    assert not os.path.exists(downloader.part_path(target))
+    assert not os.path.exists(downloader.checkpoint_path(target))
+    assert len([r for r in RangeHandler.served if r != (0, 0)]) == 4
+
+
+def test_resume_from_checkpoint(range_server, small_segments, tmp_path):
+    target = str(tmp_path / 'model.llamafile')
+    segments = downloader.plan_segments(len(PAYLOAD), 2)
+    # Pretend the first segment finished before the process was killed.
+    downloader.preallocate(downloader.part_path(target), len(PAYLOAD))
+    with open(downloader.part_path(target), 'r+b') as file:
+        file.write(PAYLOAD[:segments[0][1] + 1])
+    segments[0][2] = segments[0][1] + 1
+    downloader.save_checkpoint(target, {'url': range_server, 'size': len(PAYLOAD),
+                                        'validator': '"v1"', 'segments': segments})
+
+    transferred = downloader.download(range_server, target, connections=2)
+
+    assert transferred == len(PAYLOAD) - (segments[0][1] + 1)
+    assert open(target, 'rb').read() == PAYLOAD
+    assert (segments[1][0], segments[1][1]) in RangeHandler.served
+    assert all(start > segments[0][1] for start, _ in RangeHandler.served if (start, _) != (0, 0))
+
+
+def test_stale_checkpoint_restarts(range_server, small_segments, tmp_path):
+    target = str(tmp_path / 'model.llamafile')
+    downloader.preallocate(downloader.part_path(target), len(PAYLOAD))
+    with open(downloader.checkpoint_path(target), 'w') as file:
+        json.dump({'size': len(PAYLOAD), 'validator': '"old"', 'segments': []}, file)
+
+    downloader.download(range_server, target, connections=2)
+
+    assert open(target, 'rb').read() == PAYLOAD
+
+
+def test_checkpoint_from_another_source_restarts(range_server, small_segments, tmp_path):
+    target = str(tmp_path / 'model.llamafile')
+    segments = downloader.plan_segments(len(PAYLOAD), 2)
+    # Same size and validator, but the finished half came from somewhere else.
+    downloader.preallocate(downloader.part_path(target), len(PAYLOAD))
+    with open(downloader.part_path(target), 'r+b') as file:
+        file.write(b'x' * (segments[0][1] + 1))
+    segments[0][2] = segments[0][1] + 1
+    downloader.save_checkpoint(target, {'url': 'http://mirror.invalid/model.llamafile', 'size': len(PAYLOAD),
+                                        'validator': '"v1"', 'segments': segments})
+
+    assert downloader.download(range_server, target, connections=2) == len(PAYLOAD)
+    assert open(target, 'rb').read() == PAYLOAD
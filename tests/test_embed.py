@@ -0,0 +1,71 @@
+import ast
+import io
+import json
+from array import array
+
+import pytest
+import requests
+
+from solo_cli.utils.embed import NPY_HEADER_SIZE, embed_file, npy_header
+from tests.stub_llamafile import embed
+
+
+def load_npy(path):
+    with open(path, 'rb') as file:
+        data = file.read()
+    assert data[:8] == b'\x93NUMPY\x01\x00'
+    header = ast.literal_eval(data[10:NPY_HEADER_SIZE].decode('latin-1'))
+    rows, dim = header['shape']
+    values = array('f', data[NPY_HEADER_SIZE:])
+    assert header['descr'] == '<f4' and len(values) == rows * dim
+    return [list(values[i * dim:(i + 1) * dim]) for i in range(rows)]
+
+
+def close(a, b):
+    return all(abs(x - y) < 1e-6 for x, y in zip(a, b))
+
+
+def test_npy_header_is_aligned():
+    header = npy_header(123456789, 4096)
+    assert len(header) == NPY_HEADER_SIZE and header.endswith(b'\n')
+
+
+def test_embed_in_order_and_reuse_cache(stub_server, tmp_path):
+    port = stub_server('--dim', 8)
+    texts = [f"document {i}" for i in range(50)] + ['document 3']
+    source = '\n'.join(texts[:10] + [json.dumps({'text': texts[10]})] + texts[11:]).encode()
+    cache = str(tmp_path / 'cache.sqlite')
+    output = str(tmp_path / 'vectors.npy')
+
+    summary = embed_file(io.BytesIO(source), output, port=port, model='m', batch_size=8,
+                         connections=3, cache_path=cache)
+    rows = load_npy(output)
+    assert summary['rows'] == len(rows) == 51 and summary['dim'] == 8
+    assert all(close(row, embed(text, 8)) for row, text in zip(rows, texts))
+    # The repeated text is either served from the cache or computed again.
+    assert summary['computed'] + summary['cached'] == 51
+    first_requests = requests.get(f"http://127.0.0.1:{port}/stats", timeout=5).json()['requests']
+
+    # An updated corpus only sends the new texts.
+    updated = texts[:50] + ['a brand new text']
+    summary = embed_file(io.BytesIO('\n'.join(updated).encode()), output, port=port, model='m',
+                         batch_size=8, cache_path=cache)
+    rows = load_npy(output)
+    assert summary['cached'] == 50 and summary['computed'] == 1
+    assert close(rows[-1], embed('a brand new text', 8))
+    assert requests.get(f"http://127.0.0.1:{port}/stats", timeout=5).json()['requests'] == first_requests + 1
+
+
+def test_failed_run_leaves_no_output(stub_server, tmp_path):
+    port = stub_server('--dim', 8)
+    output = tmp_path / 'vectors.npy'
+    output.write_bytes(b'previous run')
+
+    def broken_source():
+        yield from (f"document {i}\n".encode() for i in range(20))
+        raise OSError('input went away')
+
+    with pytest.raises(OSError):
+        embed_file(broken_source(), str(output), port=port, batch_size=8)
+    assert output.read_bytes() == b'previous run'
+    assert [path.name for path in tmp_path.iterdir()] == ['vectors.npy']
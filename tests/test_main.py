@@ -1,3 +1,4 @@
+import typer
 from typer.testing import CliRunner
 from solo_cli.main import app
 
@@ -11,3 +12,31 @@ def test_init():
 def test_quickstart():
     result = runner.invoke(app, ["quickstart"])
     assert result.exit_code == 0
+
+def test_unexpected_init_errors_are_reported(monkeypatch):
+    def disk_full(*args, **kwargs):
+        raise OSError(28, 'No space left on device')
+    monkeypatch.setattr('solo_cli.utils.llama_server.download_file', disk_full)
+    result = runner.invoke(app, ["init"])
+    assert result.exit_code == 1
+    assert "No space left on device" in result.output
+
+def test_app_setup_stops_when_the_model_step_fails(monkeypatch):
+    from solo_cli.utils import chat_ui
+    started = []
+    for name in ('install_node', 'clone_repo', 'run_npm_install', 'run_docker_mongodb',
+                 'prompt_huggingface_token', 'create_env_file'):
+        monkeypatch.setattr(chat_ui, name, lambda: None)
+    for name in ('node_fingerprint', 'repo_fingerprint', 'npm_fingerprint', 'mongodb_fingerprint'):
+        monkeypatch.setattr(chat_ui, name, lambda: None)
+    monkeypatch.setattr(chat_ui, 'check_node_installed', lambda: True)
+    monkeypatch.setattr(chat_ui, 'run_solo_chat_ui', lambda: started.append(True))
+
+    def failing_init(connections):
+        raise typer.Exit(code=1)
+    monkeypatch.setattr('solo_cli.main.init', failing_init)
+
+    result = runner.invoke(app, ["initapp"])
+    assert result.exit_code == 1
+    assert "solo-cli init exited with code 1" in result.output
+    assert "blocked" in result.output and not started
@@ -0,0 +1,79 @@
+import json
+import os
+import threading
+
+import requests
+
+from solo_cli.config import update_config
+from solo_cli.utils.metrics import Registry, collect_recorded, process_stats
+from solo_cli.utils.profiling import Tracer
+from solo_cli.utils.proxy import Backend, ReverseProxy
+
+
+def test_render_prometheus_text():
+    registry = Registry()
+    registry.counter('jobs_total', 'Jobs run.', ('kind',)).inc(kind='a "quoted"')
+    latency = registry.histogram('latency_seconds', 'Latency.', buckets=(0.1, 1))
+    latency.observe(0.05)
+    latency.observe(0.5)
+
+    text = registry.render()
+    assert '# TYPE jobs_total counter' in text
+    assert 'jobs_total{kind="a \\"quoted\\""} 1' in text
+    assert 'latency_seconds_bucket{le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{le="+Inf"} 2' in text
+    assert 'latency_seconds_sum 0.55' in text
+    assert 'latency_seconds_count 2' in text
+
+
+def test_recorded_samples_and_process_stats():
+    update_config('downloads', {'m.llamafile': {'bytes': 2000, 'seconds': 2.0, 'timestamp': 0}})
+    update_config('load_times', {'m': [{'spawn_to_ready_s': 1.5, 'first_token_s': 0.25}]})
+    registry = Registry()
+    registry.add_collector(collect_recorded)
+    text = registry.render()
+    assert 'solo_download_throughput_bytes_per_second{file="m.llamafile"} 1000.0' in text
+    assert 'solo_model_ready_seconds{model="m"} 1.5' in text
+
+    rss, cpu = process_stats(os.getpid())
+    assert rss > 0 and cpu > 0
+
+
+def test_tracer_records_spans(tmp_path):
+    tracer = Tracer()
+    with tracer.span('off'):
+        pass
+    assert tracer.events == []
+
+    tracer.enable()
+    with tracer.span('outer', file='x'):
+        with tracer.span('inner'):
+            pass
+    tracer.dump(tmp_path / 'trace.json')
+
+    events = json.loads((tmp_path / 'trace.json').read_text())['traceEvents']
+    assert [event['name'] for event in events] == ['inner', 'outer']
+    assert events[0]['tid'] == events[1]['tid'] == threading.get_ident()
+    assert events[1]['ph'] == 'X' and events[1]['args'] == {'file': 'x'}
+    assert events[1]['dur'] >= events[0]['dur']
+    assert tracer.summary()['inner'][0] == 1
+
+
+def test_proxy_metrics_endpoint(run_proxy, stub_server):
+    backend = stub_server()
+    registry = Registry()
+    proxy = ReverseProxy([Backend('127.0.0.1', backend)], metrics=registry)
+    port = run_proxy(proxy)
+
+    with requests.Session() as session:
+        for _ in range(3):
+            session.post(f"http://127.0.0.1:{port}/completion", json={'prompt': 'hi'}, timeout=10)
+        session.get(f"http://127.0.0.1:{port}/nowhere", timeout=10)
+        response = session.get(f"http://127.0.0.1:{port}/metrics", timeout=10)
+
+    assert response.headers['Content-Type'].startswith('text/plain')
+    assert 'solo_proxy_requests_total{path="/completion",status="200"} 3' in response.text
+    assert 'solo_proxy_requests_total{path="other",status="200"} 1' in response.text
+    assert 'solo_proxy_request_seconds_count{path="/completion"} 3' in response.text
+    assert f'solo_backend_served_total{{backend="127.0.0.1:{backend}"}} 4' in response.text
+    assert '# TYPE solo_backend_served_total counter' in response.text
@@ -0,0 +1,92 @@
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import requests
+
+from solo_cli.utils.catalog import make_entry
+from solo_cli.utils.downloader import download
+from solo_cli.utils.mirror import parse_range
+from solo_cli.utils.model_store import fetch, mirror_url
+from tests.conftest import PAYLOAD, RangeHandler, free_port, quiet
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def mirror(tmp_path, range_server):
+    """A `solo-cli mirror` process with its own store whose catalog knows `tiny` at range_server."""
+    store = tmp_path / 'mirror-store'
+    store.mkdir()
+    catalog = {'models': {'tiny': make_entry('tiny', range_server)}, 'repos': {}, 'fetched_at': time.time()}
+    (store / 'catalog.json').write_text(json.dumps(catalog))
+    port = free_port()
+    env = dict(os.environ, SOLO_CACHE_DIR=str(store), SOLO_CONFIG_DIR=str(tmp_path / 'mirror-config'))
+    process = subprocess.Popen([sys.executable, '-m', 'solo_cli.main', 'mirror', '--host', '127.0.0.1',
+                                '--port', str(port)], cwd=ROOT, env=env, stdout=subprocess.DEVNULL)
+    deadline = time.monotonic() + 20
+    while True:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            break
+        except OSError:
+            assert process.poll() is None and time.monotonic() < deadline, "mirror did not start"
+            time.sleep(0.1)
+    yield f"http://127.0.0.1:{port}"
+    process.kill()
+    process.wait()
+
+
+def upstream_bytes():
+    return sum(end - start + 1 for start, end in RangeHandler.served)
+
+
+def test_parse_range():
+    assert parse_range(None, 100) is None
+    assert parse_range('bytes=10-19', 100) == (10, 19)
+    assert parse_range('bytes=90-', 100) == (90, 99)
+    assert parse_range('bytes=-10', 100) == (90, 99)
+    assert parse_range('bytes=50-500', 100) == (50, 99)
+    with pytest.raises(ValueError):
+        parse_range('bytes=100-', 100)
+
+
+def test_fills_once_for_concurrent_clients(mirror, tmp_path, range_server):
+    url = mirror_url(mirror, 'tiny.llamafile', range_server)
+    with ThreadPoolExecutor(3) as executor:
+        paths = [str(tmp_path / f"client{i}") for i in range(3)]
+        list(executor.map(lambda path: download(url, path, connections=4, progress=quiet), paths))
+    for path in paths:
+        with open(path, 'rb') as file:
+            assert file.read() == PAYLOAD
+    # One probe byte plus the file itself, however many clients asked.
+    assert upstream_bytes() == len(PAYLOAD) + 1
+
+    listing = requests.get(f"{mirror}/models/", timeout=5).json()
+    assert listing['tiny.llamafile']['size'] == len(PAYLOAD)
+    partial = requests.get(url, headers={'Range': 'bytes=100-199'}, timeout=5)
+    assert partial.status_code == 206 and partial.content == PAYLOAD[100:200]
+    assert requests.get(mirror_url(mirror, 'unknown.llamafile'), timeout=5).status_code == 404
+    # Same name, different origin: the mirror's copy is not that file.
+    elsewhere = mirror_url(mirror, 'tiny.llamafile', 'https://example.com/tiny.llamafile')
+    assert requests.get(elsewhere, timeout=5).status_code == 404
+
+
+def test_fetch_prefers_mirror_and_falls_back(mirror, store, tmp_path, range_server):
+    dest = str(tmp_path / 'tiny.llamafile')
+    dead = f"http://127.0.0.1:{free_port()}"
+    stored = fetch(range_server, dest, mirrors=[dead, mirror], progress=quiet)
+    with open(dest, 'rb') as file:
+        assert file.read() == PAYLOAD
+    mirrored = upstream_bytes()
+
+    # Without a working mirror the upstream URL is used.
+    os.remove(dest)
+    os.remove(stored)
+    fetch(range_server, dest, mirrors=[dead], progress=quiet)
+    assert upstream_bytes() > mirrored
@@ -0,0 +1,48 @@
+import hashlib
+import os
+
+import pytest
+
+from solo_cli.utils import downloader, model_store
+from tests.conftest import PAYLOAD, RangeHandler
+
+DIGEST = hashlib.sha256(PAYLOAD).hexdigest()
+
+
+def test_streaming_hasher_out_of_order(tmp_path):
+    path = tmp_path / 'blob'
+    path.write_bytes(PAYLOAD)
+    hasher = model_store.StreamingHasher(str(path))
+    middle = len(PAYLOAD) // 2
+    # The second half lands first and must be picked up from disk later.
+    hasher.update_at(middle, PAYLOAD[middle:])
+    hasher.update_at(0, PAYLOAD[:1000])
+    hasher.update_at(1000, PAYLOAD[1000:middle])
+
+    assert hasher.offset == len(PAYLOAD)
+    assert hasher.hexdigest() == DIGEST
+
+
+def test_fetch_dedups_across_directories(range_server, store, tmp_path, monkeypatch):
+    monkeypatch.setattr(downloader, 'MIN_SEGMENT_SIZE', 512 * 1024)
+    first = tmp_path / 'a' / 'model.llamafile'
+    second = tmp_path / 'b' / 'model.llamafile'
+    first.parent.mkdir()
+    second.parent.mkdir()
+
+    source = model_store.fetch(range_server, str(first), sha256=DIGEST, connections=4)
+    requests_made = len(RangeHandler.served)
+    model_store.fetch(range_server, str(second), sha256=DIGEST)
+
+    assert source == model_store.object_path(DIGEST)
+    assert len(RangeHandler.served) == requests_made
+    assert first.read_bytes() == second.read_bytes() == PAYLOAD
+    assert os.path.samefile(first, second)
+
+
+def test_fetch_rejects_bad_digest(range_server, store, tmp_path):
+    with pytest.raises(downloader.DownloadError):
+        model_store.fetch(range_server, str(tmp_path / 'model.llamafile'), sha256='0' * 64)
+
+    assert not (tmp_path / 'model.llamafile').exists()
+    assert not os.path.exists(model_store.object_path('0' * 64))
@@ -0,0 +1,106 @@
+import struct
+import zipfile
+
+from solo_cli.utils.gguf import model_info, read_info
+from solo_cli.utils.planner import estimate, kv_cache_bytes, plan, smaller_quants
+
+GIB = 1024 ** 3
+
+
+def gguf_string(text):
+    data = text.encode()
+    return struct.pack('<Q', len(data)) + data
+
+
+def gguf_value(value):
+    if isinstance(value, str):
+        return struct.pack('<I', 8) + gguf_string(value)
+    if isinstance(value, list):
+        return (struct.pack('<IIQ', 9, 8, len(value))
+                + b''.join(gguf_string(item) for item in value))
+    return struct.pack('<II', 4, value)
+
+
+def make_gguf(metadata, tensors, padding=0):
+    """A GGUF header with the given metadata and (name, dims) tensor table."""
+    data = b'GGUF' + struct.pack('<IQQ', 3, len(tensors), len(metadata))
+    for key, value in metadata.items():
+        data += gguf_string(key) + gguf_value(value)
+    for name, dims in tensors:
+        data += gguf_string(name) + struct.pack('<I', len(dims))
+        data += b''.join(struct.pack('<Q', dim) for dim in dims) + struct.pack('<IQ', 2, 0)
+    return data + b'\0' * padding
+
+
+LLAMA = {
+    'general.architecture': 'llama',
+    'general.name': 'Tiny Llama',
+    'general.file_type': 15,
+    'llama.block_count': 32,
+    'llama.context_length': 8192,
+    'llama.embedding_length': 4096,
+    'llama.attention.head_count': 32,
+    'llama.attention.head_count_kv': 8,
+    'tokenizer.ggml.tokens': [f"t{i}" for i in range(100)],
+}
+TENSORS = [('token_embd.weight', [4096, 100]), ('blk.0.attn_q.weight', [4096, 4096])]
+
+
+def test_reads_header_from_llamafile(tmp_path):
+    path = tmp_path / 'tiny.llamafile'
+    path.write_bytes(b'#!/bin/sh\n')
+    with zipfile.ZipFile(path, 'a') as archive:
+        archive.writestr('model.gguf', make_gguf(LLAMA, TENSORS, padding=1000))
+        archive.writestr('mmproj.gguf', make_gguf({'general.architecture': 'clip'}, []))
+
+    info = read_info(str(path))
+    assert info['name'] == 'Tiny Llama' and info['quant'] == 'Q4_K_M'
+    assert info['parameters'] == 4096 * 100 + 4096 * 4096
+    assert (info['layers'], info['context_length'], info['head_count_kv']) == (32, 8192, 8)
+    assert info['key_length'] == info['value_length'] == 128
+    assert info['vocab_size'] == 100
+    assert info['weights_bytes'] == len(make_gguf(LLAMA, TENSORS, padding=1000))
+
+
+def test_model_info_is_cached(store, tmp_path):
+    path = tmp_path / 'tiny.gguf'
+    path.write_bytes(make_gguf(LLAMA, TENSORS))
+    first = model_info(str(path))
+    assert model_info(str(path)) == first
+    path.write_bytes(make_gguf(dict(LLAMA, **{'llama.block_count': 16}), TENSORS))
+    assert model_info(str(path))['layers'] == 16
+
+
+def info(weights):
+    return {'weights_bytes': weights, 'layers': 32, 'context_length': 8192, 'embedding_length': 4096,
+            'head_count_kv': 8, 'key_length': 128, 'value_length': 128}
+
+
+def test_kv_cache_matches_llama3_8b():
+    # 8192 tokens x 32 layers x 8 KV heads x 128 x (K + V) x f16 = 1 GiB
+    assert kv_cache_bytes(info(0), 8192) == GIB
+
+
+def test_plan_fits_shrinks_or_refuses():
+    model = info(5 * GIB)
+    assert plan(model, 64 * GIB)['action'] == 'ok'
+    assert plan(model, None)['action'] == 'ok'
+
+    shrunk = plan(model, 7 * GIB)
+    assert shrunk['action'] == 'shrink' and shrunk['requested_ctx'] == 8192
+    assert shrunk['ctx_size'] < 8192 and shrunk['estimate']['total'] <= 7 * GIB * 0.9
+    assert estimate(model, shrunk['ctx_size'] * 2)['total'] > 7 * GIB * 0.9
+
+    assert plan(model, 4 * GIB)['action'] == 'refuse'
+    # Replicas share the weights but not the KV cache.
+    assert estimate(model, 8192, replicas=2)['total'] - estimate(model, 8192)['total'] < 2 * GIB
+
+
+def test_smaller_quants_from_catalog():
+    catalog = {'models': {name: {'id': name, 'size': size} for name, size in [
+        ('Llama-70B.Q8_0', 70 * GIB), ('Llama-70B.Q4_0', 38 * GIB), ('Llama-70B.Q2_K', 24 * GIB),
+        ('Llama-8B.Q4_0', 5 * GIB)]}}
+    suggestions = smaller_quants('Llama-70B.Q8_0', info(70 * GIB), 32 * GIB, catalog)
+    assert [entry['id'] for entry in suggestions] == ['Llama-70B.Q2_K']
+    assert [entry['id'] for entry in smaller_quants('Llama-70B.Q8_0', info(70 * GIB), 64 * GIB, catalog)] == \
+        ['Llama-70B.Q4_0', 'Llama-70B.Q2_K']
@@ -0,0 +1,118 @@
+import socket
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from solo_cli.utils.pool import ReplicaPool, parse_cpulist, partition_cpus
+from solo_cli.utils.proxy import Backend, ReverseProxy
+from tests.conftest import STUB_LLAMAFILE, free_port
+
+
+def test_parse_cpulist():
+    assert parse_cpulist('0-3,8,10-11\n') == [0, 1, 2, 3, 8, 10, 11]
+
+
+def test_partition_whole_numa_nodes():
+    nodes = [[0, 1, 2, 3], [4, 5, 6, 7]]
+    assert partition_cpus(2, cpus=list(range(8)), nodes=nodes) == [[0, 1, 2, 3], [4, 5, 6, 7]]
+
+
+def test_partition_within_nodes_is_disjoint():
+    nodes = [[0, 1, 2, 3], [4, 5, 6, 7]]
+    sets = partition_cpus(3, cpus=list(range(8)), nodes=nodes)
+    assert sets == [[0, 1, 2], [3, 4, 5], [6, 7]]
+    assert partition_cpus(3, cpus=[0, 1], nodes=[]) == [[0], [1], [0]]
+
+
+def test_pool_and_proxy_spread_load(run_proxy, tmp_path):
+    ports = [free_port(), free_port()]
+    pool = ReplicaPool([sys.executable, STUB_LLAMAFILE, '--token-delay', '0.05'], 'stub', ports,
+                       log_dir=str(tmp_path))
+    pool.start(timeout=10)
+    try:
+        assert pool.processes[0].args[-2:] == ['--port', str(ports[0])]
+        proxy = ReverseProxy([Backend('127.0.0.1', port) for port in ports])
+        port = run_proxy(proxy)
+
+        def complete(_):
+            response = requests.post(f"http://127.0.0.1:{port}/completion",
+                                     json={'prompt': 'hi', 'n_predict': 4}, timeout=10)
+            return response.json()['port']
+
+        with ThreadPoolExecutor(4) as executor:
+            served_by = list(executor.map(complete, range(8)))
+
+        assert set(served_by) == set(ports)
+        assert sum(backend.served for backend in proxy.backends) == 8
+    finally:
+        pool.stop()
+
+
+def test_proxy_skips_dead_backend(run_proxy, stub_server):
+    live = stub_server()
+    proxy = ReverseProxy([Backend('127.0.0.1', free_port()), Backend('127.0.0.1', live)])
+    port = run_proxy(proxy)
+
+    with requests.Session() as session:
+        for _ in range(3):
+            response = session.post(f"http://127.0.0.1:{port}/completion", json={'prompt': 'hi'}, timeout=10)
+            assert response.json()['port'] == live
+        streamed = session.post(f"http://127.0.0.1:{port}/completion",
+                                json={'prompt': 'hi', 'stream': True}, stream=True, timeout=10)
+        assert sum(1 for line in streamed.iter_lines() if line.startswith(b'data:')) == 9
+
+    assert not proxy.backends[0].healthy
+
+
+def test_proxy_without_backends_returns_503(run_proxy):
+    port = run_proxy(ReverseProxy([Backend('127.0.0.1', free_port())]))
+    response = requests.get(f"http://127.0.0.1:{port}/health", timeout=10)
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '1'
+
+
+def raw_request(port, data):
+    with socket.create_connection(('127.0.0.1', port), timeout=10) as sock:
+        sock.sendall(data)
+        return sock.recv(65536)
+
+
+def test_proxy_rejects_malformed_bodies(run_proxy):
+    port = run_proxy(ReverseProxy([Backend('127.0.0.1', free_port())]))
+    head = b'POST /completion HTTP/1.1\r\nHost: x\r\n'
+    assert raw_request(port, head + b'Content-Length: abc\r\n\r\n').startswith(b'HTTP/1.1 400 ')
+    assert raw_request(port, head + b'Transfer-Encoding: chunked\r\n\r\nzz\r\n').startswith(b'HTTP/1.1 400 ')
+    assert raw_request(port, head + b'Content-Length: 999999999999\r\n\r\n').startswith(b'HTTP/1.1 413 ')
+
+
+class HangUpHandler(BaseHTTPRequestHandler):
+    """Healthy, but hangs up on every POST without answering."""
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'{}')
+
+    def do_POST(self):
+        self.close_connection = True
+
+    def log_message(self, *args):
+        pass
+
+
+def test_proxy_answers_502_when_backend_hangs_up(run_proxy):
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), HangUpHandler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    try:
+        proxy = ReverseProxy([Backend('127.0.0.1', httpd.server_address[1])])
+        port = run_proxy(proxy)
+        response = requests.post(f"http://127.0.0.1:{port}/completion", json={'prompt': 'hi'}, timeout=10)
+        assert response.status_code == 502
+        assert not proxy.backends[0].healthy
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
@@ -0,0 +1,57 @@
+import asyncio
+import subprocess
+import sys
+
+import pytest
+
+from solo_cli.config import load_config
+from solo_cli.utils.http_client import Response
+from solo_cli.utils.llama_server import launch_server
+from solo_cli.utils.readiness import LaunchError, wait_until_ready
+from tests.conftest import free_port, stub_command
+
+
+def test_launch_waits_for_model_load_and_records_timing(tmp_path):
+    port = free_port()
+    process, ready, first_token = launch_server(stub_command(port, '--load-delay', 0.5), 'stub-model',
+                                                port=port, timeout=10, log_path=str(tmp_path / 'stub.log'))
+    try:
+        assert process.poll() is None
+        assert ready >= 0.5
+        assert first_token > 0
+        samples = load_config()['load_times']['stub-model']
+        assert samples[-1]['spawn_to_ready_s'] == round(ready, 3)
+        assert samples[-1]['first_token_s'] == round(first_token, 3)
+    finally:
+        process.kill()
+        process.wait()
+
+
+def test_wait_fails_fast_when_process_exits():
+    process = subprocess.Popen([sys.executable, '-c', 'raise SystemExit(3)'])
+    with pytest.raises(LaunchError, match='code 3'):
+        asyncio.run(wait_until_ready('127.0.0.1', free_port(), timeout=10, process=process))
+
+
+def test_wait_respects_deadline():
+    with pytest.raises(LaunchError, match='not ready'):
+        asyncio.run(wait_until_ready('127.0.0.1', free_port(), timeout=0.3))
+
+
+def read_body(headers, data):
+    async def read():
+        reader = asyncio.StreamReader()
+        reader.feed_data(data)
+        reader.feed_eof()
+        return await Response(200, 'OK', headers, reader, None).read()
+    return asyncio.run(read())
+
+
+def test_truncated_bodies_are_errors():
+    chunked = {'transfer-encoding': 'chunked'}
+    assert read_body(chunked, b'5\r\nhello\r\n0\r\n\r\n') == b'hello'
+    for data in (b'5\r\nhello\r\n', b'5\r\nhel'):
+        with pytest.raises(ConnectionError):
+            read_body(chunked, data)
+    with pytest.raises(ConnectionError, match='5 bytes'):
+        read_body({'content-length': '10'}, b'hello')
@@ -0,0 +1,89 @@
+import asyncio
+import time
+
+import requests
+
+from solo_cli.utils.proxy import Backend, ReverseProxy
+from solo_cli.utils.response_cache import ResponseCache, cache_key
+
+
+def get(cache, key):
+    return asyncio.run(cache.lookup(key))
+
+
+def put(cache, key, data):
+    asyncio.run(cache.store(key, data))
+
+
+def test_cache_key_normalizes_and_skips_sampling():
+    greedy = {'prompt': 'hi', 'temperature': 0, 'n_predict': 8}
+    assert cache_key('/completion', greedy) == cache_key('/completion', dict(reversed(greedy.items())))
+    assert cache_key('/completion', dict(greedy, cache_prompt=True)) == cache_key('/completion', greedy)
+    assert cache_key('/completion', greedy, 'a') != cache_key('/completion', greedy, 'b')
+    # The client's model field does not name the model that answers.
+    named = dict(greedy, model='gpt-3.5-turbo')
+    assert cache_key('/completion', named, 'a') != cache_key('/completion', named, 'b')
+    assert cache_key('/completion', {'prompt': 'hi', 'temperature': 0.7}) is None
+    assert cache_key('/completion', {'prompt': 'hi'}) is None
+    assert cache_key('/embedding', greedy) is None
+
+
+def test_lru_bounds_and_ttl(monkeypatch):
+    cache = ResponseCache(max_entries=2, ttl=10)
+    for key in 'abc':
+        put(cache, key, key.encode())
+    assert get(cache, 'a') is None
+    assert get(cache, 'c') == b'c'
+
+    now = time.time()
+    monkeypatch.setattr(time, 'time', lambda: now + 11)
+    assert get(cache, 'c') is None
+    assert cache.stats()['misses'] == 2
+
+
+def test_disk_tier_survives_restart(tmp_path):
+    put(ResponseCache(disk_dir=str(tmp_path)), 'k' * 64, b'payload')
+    cache = ResponseCache(disk_dir=str(tmp_path))
+    assert get(cache, 'k' * 64) == b'payload'
+    assert cache.stats()['disk_hits'] == 1
+
+
+def test_disk_tier_is_bounded(tmp_path):
+    cache = ResponseCache(max_entries=1, disk_dir=str(tmp_path), max_disk_bytes=250)
+    for key in ('a' * 64, 'b' * 64, 'c' * 64):
+        put(cache, key, b'x' * 100)
+    assert get(cache, 'a' * 64) is None
+    assert get(cache, 'b' * 64) == b'x' * 100 and get(cache, 'c' * 64) == b'x' * 100
+    # A fresh cache finds the files left on disk and keeps within the bound.
+    cache = ResponseCache(disk_dir=str(tmp_path), max_disk_bytes=250)
+    put(cache, 'd' * 64, b'x' * 100)
+    assert get(cache, 'b' * 64) is None and get(cache, 'd' * 64) == b'x' * 100
+
+
+def test_proxy_replays_cached_responses(run_proxy, stub_server):
+    backend = stub_server('--tokens', 4)
+    proxy = ReverseProxy([Backend('127.0.0.1', backend)], cache=ResponseCache(), model_name='stub')
+    port = run_proxy(proxy)
+    url = f"http://127.0.0.1:{port}/completion"
+
+    def stats():
+        return requests.get(f"http://127.0.0.1:{backend}/stats", timeout=10).json()['requests']
+
+    with requests.Session() as session:
+        body = {'prompt': 'classify me', 'temperature': 0, 'stream': True}
+        first = session.post(url, json=body, timeout=10)
+        second = session.post(url, json=body, timeout=10)
+        assert second.headers['X-Solo-Cache'] == 'HIT'
+        assert first.content == second.content
+        assert first.content.count(b'data:') == 5
+
+        sampled = {'prompt': 'classify me', 'temperature': 0.8}
+        session.post(url, json=sampled, timeout=10)
+        third = session.post(url, json=sampled, timeout=10)
+        assert 'X-Solo-Cache' not in third.headers
+
+        status = session.get(f"http://127.0.0.1:{port}/_solo/status", timeout=10).json()
+
+    assert stats() == 3
+    assert status['cache']['hits'] == 1
+    assert status['cache']['misses'] == 1
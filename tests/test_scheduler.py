@@ -0,0 +1,59 @@
+import threading
+import time
+
+import pytest
+
+from solo_cli.utils import downloader, model_store
+from solo_cli.utils.scheduler import TransferScheduler
+from solo_cli.utils.sizes import parse_size
+from tests.conftest import PAYLOAD
+
+
+def test_connections_go_to_lowest_priority_first():
+    scheduler = TransferScheduler(max_connections=1)
+    order = []
+
+    def worker(priority):
+        with scheduler.connection(priority):
+            order.append(priority)
+
+    with scheduler.connection(0):
+        threads = [threading.Thread(target=worker, args=(p,)) for p in (30, 10, 20)]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.1)
+    for thread in threads:
+        thread.join()
+
+    assert order == [10, 20, 30]
+
+
+def test_bandwidth_cap():
+    scheduler = TransferScheduler(max_connections=4, max_bandwidth=1000000)
+    started = time.monotonic()
+    for _ in range(3):
+        scheduler.throttle(500000)
+    assert time.monotonic() - started >= 0.4
+
+
+def test_parse_size():
+    assert parse_size('512') == 512
+    assert parse_size('50M') == 50000000
+    assert parse_size('8GiB') == 8 * 1024 ** 3
+    assert parse_size('.5K') == 500
+    with pytest.raises(ValueError):
+        parse_size('1.2.3')
+
+
+def test_fetch_many(range_server, store, tmp_path, monkeypatch):
+    monkeypatch.setattr(downloader, 'MIN_SEGMENT_SIZE', 512 * 1024)
+    base = range_server.rsplit('/', 1)[0]
+    items = [(f"{base}/{name}.llamafile", str(tmp_path / f"{name}.llamafile"), None) for name in ('a', 'b')]
+    ready = []
+
+    failures = model_store.fetch_many(items, connections=2, on_ready=ready.append)
+
+    assert failures == {}
+    assert sorted(ready) == sorted(dest for _, dest, _ in items)
+    for _, dest, _ in items:
+        assert open(dest, 'rb').read() == PAYLOAD
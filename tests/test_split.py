@@ -0,0 +1,91 @@
+import os
+import zipfile
+
+import pytest
+
+from solo_cli.utils.cache import record_use
+from solo_cli.utils.model_store import object_path, write_ref
+from solo_cli.utils.split import prune_bundle, split_command, split_llamafile, split_weights
+
+RUNTIME = b"MZqFpD='\n#!/bin/sh\nexec runtime \"$@\"\n" + b'\0' * 4000
+
+
+def make_llamafile(path, weights, args="-m\nmodel.gguf\n--host\n0.0.0.0\n...\n"):
+    with open(path, 'wb') as file:
+        file.write(RUNTIME)
+    with zipfile.ZipFile(path, 'a') as archive:
+        archive.writestr(zipfile.ZipInfo('www/index.html', (2024, 1, 1, 0, 0, 0)), '<html></html>')
+        if args is not None:
+            archive.writestr(zipfile.ZipInfo('.args', (2024, 1, 1, 0, 0, 0)), args)
+        archive.writestr(zipfile.ZipInfo('model.gguf', (2024, 1, 1, 0, 0, 0)), weights)
+    return str(path)
+
+
+def test_split_extracts_weights_and_strips_runtime(store, tmp_path):
+    weights = b'GGUF' + os.urandom(10000)
+    manifest, shared = split_llamafile(make_llamafile(tmp_path / 'a.llamafile', weights), 'a')
+    assert not shared
+
+    with open(object_path(manifest['weights']['model.gguf']), 'rb') as file:
+        assert file.read() == weights
+    runtime = object_path(manifest['runtime'])
+    with open(runtime, 'rb') as file:
+        assert file.read(len(RUNTIME)) == RUNTIME
+    with zipfile.ZipFile(runtime) as archive:
+        assert archive.namelist() == ['www/index.html']
+        assert archive.read('www/index.html') == b'<html></html>'
+    assert os.access(runtime, os.X_OK)
+
+    command = split_command('a')
+    assert command == [command[0], '-m', split_weights('a')[0], '--host', '0.0.0.0']
+    assert os.path.basename(command[0]) == 'llamafile' and split_weights('a')[0].endswith('model.gguf')
+
+
+def test_llamafiles_of_one_release_share_the_runtime(store, tmp_path):
+    first, _ = split_llamafile(make_llamafile(tmp_path / 'a.llamafile', b'GGUF-a'), 'a')
+    second, shared = split_llamafile(make_llamafile(tmp_path / 'b.llamafile', b'GGUF-b', args=None), 'b')
+    assert shared and first['runtime'] == second['runtime']
+    assert first['weights'] != second['weights']
+    # Without baked-in arguments the weights are passed with -m.
+    assert split_command('b')[1:] == ['-m', split_weights('b')[0]]
+
+
+def test_not_a_split_model(store, tmp_path):
+    assert split_command('missing') is None and split_weights('missing') == []
+    plain = tmp_path / 'plain.llamafile'
+    with zipfile.ZipFile(plain, 'w') as archive:
+        archive.writestr('readme.txt', 'no weights')
+    with pytest.raises(ValueError):
+        split_llamafile(str(plain), 'plain')
+
+
+def test_prune_removes_bundle_and_store_object(store, tmp_path):
+    path = make_llamafile(tmp_path / 'a.llamafile', b'GGUF' + b'x' * 5000)
+    source = object_path('0' * 64)
+    os.makedirs(os.path.dirname(source), exist_ok=True)
+    os.link(path, source)
+    write_ref('a.llamafile', 'http://example/a', '0' * 64, os.path.getsize(path))
+    split_llamafile(path, 'a')
+
+    size = os.path.getsize(path)
+    assert prune_bundle(path) == size
+    assert not os.path.exists(path) and not os.path.exists(source)
+    assert split_command('a') is not None
+
+
+def test_prune_keeps_store_object_other_links_use(store, tmp_path):
+    path = make_llamafile(tmp_path / 'a.llamafile', b'GGUF' + b'x' * 5000)
+    source = object_path('0' * 64)
+    os.makedirs(os.path.dirname(source), exist_ok=True)
+    os.link(path, source)
+    write_ref('a.llamafile', 'http://example/a', '0' * 64, os.path.getsize(path))
+    # Another project got the model as a symlink, which does not raise st_nlink.
+    os.makedirs(tmp_path / 'other')
+    other = str(tmp_path / 'other' / 'a.llamafile')
+    os.symlink(source, other)
+    record_use('a.llamafile', other)
+    split_llamafile(path, 'a')
+
+    prune_bundle(path)
+    assert not os.path.exists(path) and os.path.exists(source)
+    assert os.path.exists(other)
@@ -0,0 +1,35 @@
+import subprocess
+import sys
+
+# Cumulative import time budget for `solo_cli.main`, in microseconds. Typer
+# accounts for most of it; everything else must be imported lazily.
+IMPORT_BUDGET_US = 100000
+
+# Modules that only specific commands need and must not load at startup.
+LAZY_MODULES = ['requests', 'urllib3', 'tqdm', 'concurrent.futures',
+                'solo_cli.utils.chat_ui', 'solo_cli.utils.llama_server', 'solo_cli.utils.downloader']
+
+
+def import_times(module):
+    """Return {module: cumulative_us} from a cold `python -X importtime` run."""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f"import {module}"],
+                            capture_output=True, text=True, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, cumulative, name = line.split('|')
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative)
+    return times
+
+
+def test_heavy_modules_are_lazy():
+    times = import_times('solo_cli.main')
+    assert [module for module in LAZY_MODULES if module in times] == []
+
+
+def test_import_time_budget():
+    # Take the best of a few runs to keep the check stable on noisy machines.
+    best = min(import_times('solo_cli.main')['solo_cli.main'] for _ in range(3))
+    assert best < IMPORT_BUDGET_US, f"solo_cli.main took {best / 1000:.1f}ms to import"
@@ -0,0 +1,90 @@
+import asyncio
+import sys
+import threading
+import time
+
+import requests
+
+from solo_cli.utils import supervisor as supervisor_module
+from solo_cli.utils.pool import ReplicaPool
+from solo_cli.utils.proxy import ReverseProxy
+from solo_cli.utils.supervisor import Supervisor
+from tests.conftest import STUB_LLAMAFILE, free_port
+
+
+def run_supervisor(supervisor, model_name):
+    """Start the supervisor on a background loop; returns the loop and a stop function."""
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    asyncio.run_coroutine_threadsafe(supervisor.start(model_name), loop).result(30)
+
+    def stop():
+        asyncio.run_coroutine_threadsafe(supervisor.stop(), loop).result(30)
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(5)
+    return loop, stop
+
+
+def make_supervisor(tmp_path, replicas=1):
+    port = free_port()
+
+    def pool_factory(model_name, ports):
+        delay = '0.05' if model_name == 'old' else '0'
+        return ReplicaPool([sys.executable, STUB_LLAMAFILE, '--token-delay', delay, '--tokens', '20'],
+                           model_name, ports, log_dir=str(tmp_path))
+    return Supervisor(ReverseProxy([]), pool_factory, port, replicas, timeout=10, report=lambda _: None)
+
+
+def test_swap_keeps_serving_and_drains(tmp_path):
+    supervisor = make_supervisor(tmp_path)
+    _, stop = run_supervisor(supervisor, 'old')
+    port = supervisor.base_port
+    try:
+        old_pool = supervisor.pool
+        # A slow streamed request that is still running while the swap happens.
+        streamed = requests.post(f"http://127.0.0.1:{port}/completion",
+                                 json={'prompt': 'hi', 'stream': True}, stream=True, timeout=10)
+        swap = requests.post(f"http://127.0.0.1:{port}/_solo/swap", json={'model': 'new'}, timeout=30)
+        assert swap.status_code == 200
+        assert swap.json()['model'] == 'new'
+
+        body = b''.join(streamed.iter_content(None))
+        assert body.count(b'data: ') == 21
+
+        response = requests.post(f"http://127.0.0.1:{port}/completion", json={'prompt': 'hi'}, timeout=10)
+        assert response.json()['port'] == supervisor.pool.ports[0]
+        assert supervisor.pool.ports != old_pool.ports
+        assert all(process.poll() is not None for process in old_pool.processes)
+    finally:
+        stop()
+
+
+def test_crashed_replica_is_restarted(tmp_path, monkeypatch):
+    monkeypatch.setattr(supervisor_module, 'MONITOR_INTERVAL', 0.1)
+    supervisor = make_supervisor(tmp_path)
+    _, stop = run_supervisor(supervisor, 'old')
+    port = supervisor.base_port
+    try:
+        victim = supervisor.pool.processes[0]
+        victim.kill()
+        victim.wait()
+        deadline = time.monotonic() + 20
+        while supervisor.restarts == 0 and time.monotonic() < deadline:
+            time.sleep(0.1)
+        assert supervisor.restarts == 1
+        assert supervisor.pool.processes[0] is not victim
+        response = requests.post(f"http://127.0.0.1:{port}/completion", json={'prompt': 'hi'}, timeout=10)
+        assert response.status_code == 200
+
+        # Once it has stayed up for STABLE_TIME, the next crash restarts without backoff again.
+        monkeypatch.setattr(supervisor_module, 'STABLE_TIME', 0)
+        lines = []
+        supervisor.report = lines.append
+        supervisor.pool.processes[0].kill()
+        while supervisor.restarts == 1 and time.monotonic() < deadline + 20:
+            time.sleep(0.1)
+        assert supervisor.restarts == 2
+        assert any('restarting in 0s' in line for line in lines)
+    finally:
+        stop()
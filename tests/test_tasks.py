@@ -0,0 +1,87 @@
+import threading
+import time
+
+import pytest
+
+from solo_cli.config import load_config
+from solo_cli.utils.tasks import TaskGraph, format_summary
+
+
+def test_independent_chains_run_concurrently():
+    started = {}
+    log = []
+
+    def step(name, seconds=0.2):
+        def run():
+            started[name] = time.monotonic()
+            time.sleep(seconds)
+            log.append(name)
+        return run
+
+    graph = TaskGraph()
+    graph.add('clone', step('clone'))
+    graph.add('npm_install', step('npm_install'), deps=['clone'])
+    graph.add('download', step('download', 0.4))
+    graph.add('quickstart', step('quickstart', 0.0), deps=['download'])
+
+    began = time.monotonic()
+    results = graph.run()
+    wall = time.monotonic() - began
+
+    assert all(result['status'] == 'ran' for result in results.values())
+    assert abs(started['clone'] - started['download']) < 0.1
+    assert log.index('clone') < log.index('npm_install')
+    assert log.index('download') < log.index('quickstart')
+    assert wall < 0.55  # serial would take 0.8s
+    assert 'wall time' in format_summary(results, wall)
+
+
+def test_fingerprinted_steps_are_skipped_on_rerun():
+    runs = []
+    state = {'lock': None}
+
+    def install():
+        runs.append('install')
+        state['lock'] = 'abc'
+
+    graph = TaskGraph(state_key='steps')
+    graph.add('install', install, fingerprint=lambda: state['lock'])
+    graph.add('always', lambda: runs.append('always'))
+
+    assert graph.run()['install']['status'] == 'ran'
+    assert load_config()['steps'] == {'install': 'abc'}
+    assert graph.run()['install']['status'] == 'skipped'
+    assert runs == ['install', 'always', 'always']
+
+    state['lock'] = 'changed'
+    assert graph.run()['install']['status'] == 'ran'
+    assert graph.run(force=True)['install']['status'] == 'ran'
+
+
+def test_failure_blocks_dependents_only():
+    ran = threading.Event()
+
+    def broken():
+        raise RuntimeError('npm exploded')
+
+    graph = TaskGraph()
+    graph.add('npm_install', broken)
+    graph.add('chat_ui', lambda: None, deps=['npm_install'])
+    graph.add('download', ran.set)
+    results = graph.run(report=lambda _: None)
+
+    assert results['npm_install'] == {'status': 'failed', 'seconds': 0.0, 'error': 'npm exploded'}
+    assert results['chat_ui']['status'] == 'blocked'
+    assert results['download']['status'] == 'ran' and ran.is_set()
+
+
+def test_bad_graphs_are_rejected():
+    graph = TaskGraph()
+    graph.add('a', lambda: None, deps=['b'])
+    graph.add('b', lambda: None, deps=['a'])
+    with pytest.raises(ValueError, match='cycle'):
+        graph.run()
+    graph = TaskGraph()
+    graph.add('a', lambda: None, deps=['missing'])
+    with pytest.raises(ValueError, match='unknown'):
+        graph.order()
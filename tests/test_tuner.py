@@ -0,0 +1,41 @@
+import sys
+
+from solo_cli.config import load_config
+from solo_cli.utils.tuner import MIN_SLOT_CTX, load_profile, profile_args, profile_key, tune, with_context
+from tests.conftest import STUB_LLAMAFILE, free_port
+
+
+def test_profile_args():
+    flags = {'threads': 8, 'batch_size': 512, 'parallel': 2, 'ctx_size': 4096, 'mlock': True}
+    assert profile_args(flags) == ['--threads', '8', '--batch-size', '512', '--parallel', '2',
+                                   '--ctx-size', '4096', '--mlock']
+    assert profile_args(dict(flags, mlock=False), skip=('threads',)) == \
+        ['--batch-size', '512', '--parallel', '2', '--ctx-size', '4096']
+    assert profile_args(None) == []
+
+
+def test_context_leaves_every_slot_enough():
+    assert with_context({'parallel': 4})['ctx_size'] == 4 * MIN_SLOT_CTX
+    assert with_context({'parallel': 1, 'ctx_size': 8192})['ctx_size'] == 8192
+    assert with_context({'parallel': 2, 'ctx_size': 512})['ctx_size'] == 2 * MIN_SLOT_CTX
+
+
+def test_tune_picks_fastest_and_persists(monkeypatch):
+    monkeypatch.setattr('solo_cli.utils.tuner.WORKLOAD_TOKENS', 4)
+    sweep = {'threads': [1, 4], 'mlock': [False, True]}
+    command = [sys.executable, STUB_LLAMAFILE, '--token-delay', '0.02']
+    lines = []
+
+    profile = tune(command, 'stub-model', free_port(), budget=60, sweep=sweep, report=lines.append)
+
+    assert profile['flags']['threads'] == 4
+    assert profile['trials'] == 3
+    assert len(lines) == 3
+    assert load_profile('stub-model') == profile['flags']
+    assert profile_key('stub-model') in load_config()['launch_profiles']
+
+
+def test_tune_respects_budget():
+    assert tune([sys.executable, STUB_LLAMAFILE], 'stub-model', free_port(), budget=1,
+                sweep={'threads': [1, 2]}) is None
+    assert load_profile('stub-model') is None
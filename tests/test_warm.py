@@ -0,0 +1,46 @@
+import os
+
+import pytest
+
+from solo_cli.utils import warm
+
+SIZE = 3 * 1024 * 1024 + 123
+
+
+@pytest.fixture
+def model_file(tmp_path):
+    path = tmp_path / 'model.llamafile'
+    path.write_bytes(os.urandom(SIZE))
+    return str(path)
+
+
+def test_prefetch_reads_whole_file_and_reports_residency(model_file):
+    seen = []
+    warm.prefetch(model_file, progress=seen.append)
+    assert sum(seen) == SIZE
+
+    resident, size = warm.residency(model_file)
+    assert size == SIZE
+    if resident is None:
+        pytest.skip("mincore is not available here")
+    assert resident == SIZE
+
+
+def test_residency_of_empty_file(tmp_path):
+    path = tmp_path / 'empty'
+    path.write_bytes(b'')
+    resident, size = warm.residency(str(path))
+    assert size == 0 and resident in (0, None)
+
+
+def test_lock_and_release(model_file):
+    try:
+        mapping = warm.lock(model_file)
+    except OSError as e:
+        pytest.skip(f"cannot mlock here: {e}")
+    try:
+        assert mapping.locked
+        assert mapping.resident() == SIZE
+    finally:
+        mapping.close()
+    assert mapping.address is None